@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Incremental aggregation of player statistics from per-round match data.
+
+Rounds written by match_pipeline are folded into running sums per
+(player, agent, map_id) and day. Aggregating a new match only reads that
+match's rounds and touches the sums of its ten players, and the per-round
+and ratio columns of 'players' are derived from the sums of those players
+alone. Summing the daily buckets over a range gives time-windowed stats.
+
+Usage:
+    python aggregation.py data/matches/game.json --db_file valorant_players.db
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+import match_pipeline
+from snapshot import snapshot_path, write_snapshot
+from sqllite import (
+    CREATE_TABLE_QUERY,
+    NATURAL_KEY,
+    bump_data_version,
+    ensure_natural_key,
+    link_player_rows,
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+MILLIS_PER_DAY = 24 * 60 * 60 * 1000
+
+# Least seconds between rewrites of an existing players snapshot. Rewriting
+# reads the whole table, so it is not done per ingest; until the next
+# rewrite the app sees a stale data version and queries SQLite instead.
+SNAPSHOT_INTERVAL = 300
+
+# Running sums kept per (player, agent, map_id, day)
+SUM_COLUMNS = (
+    "rounds",
+    "kills",
+    "deaths",
+    "assists",
+    "first_kills",
+    "first_deaths",
+    "damage",
+    "headshots",
+    "bodyshots",
+    "legshots",
+    "score",
+    "clutches_played",
+    "clutches_won",
+)
+
+# Columns of 'players' and the SQL deriving each one from the sums
+DERIVED_COLUMNS = {
+    "rds": "rounds",
+    "average_combat_score": "ROUND(1.0 * score / rounds, 1)",
+    "kill_deaths": "ROUND(1.0 * kills / MAX(deaths, 1), 2)",
+    "average_damage_per_round": "ROUND(1.0 * damage / rounds, 1)",
+    "kills_per_round": "ROUND(1.0 * kills / rounds, 2)",
+    "assists_per_round": "ROUND(1.0 * assists / rounds, 2)",
+    "first_kills_per_round": "ROUND(1.0 * first_kills / rounds, 2)",
+    "first_deaths_per_round": "ROUND(1.0 * first_deaths / rounds, 2)",
+    "headshot_percentage": (
+        "ROUND(100.0 * headshots / MAX(headshots + bodyshots + legshots, 1), 1)"
+    ),
+    "clutch_success_percentage": (
+        "ROUND(100.0 * clutches_won / MAX(clutches_played, 1), 1)"
+    ),
+    "clutch_won_played": "ROUND(1.0 * clutches_won / MAX(clutches_played, 1), 2)",
+    "total_kills": "kills",
+    "total_deaths": "deaths",
+    "total_assists": "assists",
+    "total_first_kills": "first_kills",
+    "total_first_deaths": "first_deaths",
+}
+
+CREATE_TABLES = (
+    f"""
+    CREATE TABLE IF NOT EXISTS player_stat_sums (
+        player TEXT NOT NULL,
+        agent TEXT NOT NULL,
+        map_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        {", ".join(f"{column} INTEGER NOT NULL" for column in SUM_COLUMNS)},
+        PRIMARY KEY (player, agent, map_id, day)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS aggregated_matches (
+        match_id TEXT PRIMARY KEY
+    ) WITHOUT ROWID
+    """,
+)
+
+# Adds the rounds of one match to the sums. Players are named by gameName
+# when players.json knows them; unknown maps are grouped under map_id 0.
+AGGREGATE_MATCH = f"""
+INSERT INTO player_stat_sums (player, agent, map_id, day, {", ".join(SUM_COLUMNS)})
+SELECT
+    COALESCE(match_players.game_name, round_stats.puuid),
+    COALESCE(match_players.agent, 'Unknown'),
+    COALESCE(matches.map_id, 0),
+    COALESCE(matches.game_start_millis, 0) / {MILLIS_PER_DAY},
+    COUNT(*),
+    {", ".join(f"SUM(round_stats.{column})" for column in SUM_COLUMNS[1:])}
+FROM round_player_stats AS round_stats
+JOIN matches ON matches.match_id = round_stats.match_id
+LEFT JOIN match_players
+    ON match_players.match_id = round_stats.match_id
+    AND match_players.puuid = round_stats.puuid
+WHERE round_stats.match_id = ?
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (player, agent, map_id, day) DO UPDATE SET
+    {", ".join(f"{column} = {column} + excluded.{column}" for column in SUM_COLUMNS)}
+"""
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments containing the match files and database.
+    """
+    parser = argparse.ArgumentParser(
+        description="Ingest matches and update the aggregated player stats."
+    )
+    parser.add_argument(
+        "match_files", nargs="*", help="Match JSON documents to ingest first."
+    )
+    parser.add_argument(
+        "--db_file",
+        type=str,
+        default="valorant_players.db",
+        help="Path to the SQLite database.",
+    )
+    parser.add_argument(
+        "--players_file",
+        type=str,
+        default=match_pipeline.PLAYERS_FILE,
+        help="JSON list of puuid, gameName and tagLine.",
+    )
+    parser.add_argument(
+        "--snapshot_interval",
+        type=float,
+        default=SNAPSHOT_INTERVAL,
+        help="Least seconds between rewrites of an existing players snapshot; "
+        "0 rewrites it on every run with changes, a negative value never.",
+    )
+    return parser.parse_args()
+
+
+def create_tables(conn):
+    """
+    Creates the per-round, aggregate and players tables if they do not exist.
+    """
+    match_pipeline.create_tables(conn)
+    for statement in CREATE_TABLES:
+        conn.execute(statement)
+    conn.execute(CREATE_TABLE_QUERY)
+    ensure_natural_key(conn.cursor())
+    conn.commit()
+
+
+def _derived_stats(where="", params=()):
+    """
+    Builds the query deriving the 'players' columns from summed buckets.
+    """
+    sums = ", ".join(f"SUM({column}) AS {column}" for column in SUM_COLUMNS)
+    derived = ", ".join(
+        f"{expression} AS {column}" for column, expression in DERIVED_COLUMNS.items()
+    )
+    sql = (
+        f"SELECT player, agent, map_id, {derived} FROM ("
+        f"SELECT player, agent, map_id, {sums} FROM player_stat_sums {where} "
+        f"GROUP BY player, agent, map_id)"
+    )
+    return sql, params
+
+
+def aggregate_match(conn, match_id):
+    """
+    Adds an ingested match to the running sums, once.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+        match_id (str): Id of a match written by match_pipeline.
+
+    Returns:
+        list of tuple: (player, agent, map_id) of the sums that changed;
+        empty if the match was aggregated before.
+    """
+    cursor = conn.execute(
+        "INSERT OR IGNORE INTO aggregated_matches (match_id) VALUES (?)", (match_id,)
+    )
+    if not cursor.rowcount:
+        return []
+    conn.execute(AGGREGATE_MATCH, (match_id,))
+    return conn.execute(
+        """
+        SELECT DISTINCT COALESCE(match_players.game_name, match_players.puuid),
+            COALESCE(match_players.agent, 'Unknown'), COALESCE(matches.map_id, 0)
+        FROM match_players JOIN matches ON matches.match_id = match_players.match_id
+        WHERE match_players.match_id = ?
+        """,
+        (match_id,),
+    ).fetchall()
+
+
+def refresh_players(conn, keys):
+    """
+    Rewrites the derived columns of 'players' for the given sums.
+
+    Rows are upserted on the natural key; rows created here have no org
+    and an 'UNKNOWN' region until a CSV load provides them.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+        keys (list of tuple): (player, agent, map_id) to refresh.
+
+    Returns:
+        list of int: Ids of the 'players' rows written.
+    """
+    if not keys:
+        return []
+    columns = list(DERIVED_COLUMNS)
+    rows = []
+    for key in keys:
+        sql, params = _derived_stats(
+            "WHERE " + " AND ".join(f"{column} = ?" for column in NATURAL_KEY), key
+        )
+        rows.extend(conn.execute(sql, params).fetchall())
+
+    conn.executemany(
+        f"""
+        INSERT INTO players (player, agent, map_id, region, {", ".join(columns)})
+        VALUES (?, ?, ?, 'UNKNOWN', {", ".join("?" for _ in columns)})
+        ON CONFLICT ({", ".join(NATURAL_KEY)}) DO UPDATE SET
+            {", ".join(f"{column} = excluded.{column}" for column in columns)}
+        """,
+        rows,
+    )
+
+    ids = [
+        row[0]
+        for key in keys
+        for row in conn.execute(
+            "SELECT id FROM players WHERE player = ? AND agent = ? AND map_id = ?",
+            key,
+        )
+    ]
+    # Link new rows to the lookup and role tables if the schema is migrated
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'player_roles'"
+    ).fetchone():
+        link_player_rows(conn, ids)
+    return ids
+
+
+def aggregate_pending(conn):
+    """
+    Aggregates every ingested match that is not in the sums yet and
+    refreshes the affected 'players' rows.
+
+    The data version is bumped when rows change, so cached rosters built
+    from the old stats are dropped, and the changed rows are logged for
+    readers that update incrementally.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+
+    Returns:
+        int: Number of 'players' rows written.
+    """
+    pending = [
+        row[0]
+        for row in conn.execute(
+            "SELECT match_id FROM matches WHERE match_id NOT IN "
+            "(SELECT match_id FROM aggregated_matches)"
+        )
+    ]
+    keys = {key for match_id in pending for key in aggregate_match(conn, match_id)}
+    ids = refresh_players(conn, sorted(keys))
+    if ids:
+        bump_data_version(conn, ids)
+    conn.commit()
+    return len(ids)
+
+
+def refresh_snapshot(conn, path, interval=SNAPSHOT_INTERVAL):
+    """
+    Rewrites an existing players snapshot once it is older than interval.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+        path (str): Snapshot file; a missing file is not created.
+        interval (float): Least seconds between rewrites; negative never
+            rewrites.
+
+    Returns:
+        int: The new generation, or None when the snapshot was left as is.
+    """
+    if interval < 0 or not os.path.exists(path):
+        return None
+    if time.time() - os.path.getmtime(path) < interval:
+        return None
+    return write_snapshot(conn, path)
+
+
+def window_stats(conn, days, now_millis=None):
+    """
+    Derives the 'players' columns from the matches of the last days only.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+        days (int): Length of the window, e.g. 30.
+        now_millis (int): End of the window; defaults to the current time.
+
+    Returns:
+        list of dict: One entry per (player, agent, map_id) active in the
+        window, with the columns of DERIVED_COLUMNS.
+    """
+    if now_millis is None:
+        now_millis = int(time.time() * 1000)
+    first_day = now_millis // MILLIS_PER_DAY - days + 1
+    sql, params = _derived_stats("WHERE day >= ?", (first_day,))
+    cursor = conn.execute(sql, params)
+    names = [description[0] for description in cursor.description]
+    return [dict(zip(names, row)) for row in cursor]
+
+
+def main():
+    args = parse_arguments()
+    conn = sqlite3.connect(args.db_file)
+    try:
+        create_tables(conn)
+        names = match_pipeline.load_player_names(args.players_file)
+        for path in args.match_files:
+            with open(path, "rb") as f:
+                match_pipeline.ingest_match(
+                    conn, match_pipeline.iter_match_sections(f), names
+                )
+            conn.commit()
+        start = time.perf_counter()
+        written = aggregate_pending(conn)
+        logging.info(
+            f"Updated {written} 'players' rows in {time.perf_counter() - start:.3f}s."
+        )
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        logging.error(f"Error aggregating matches: {e}")
+        conn.close()
+        sys.exit(1)
+
+    # The aggregation is committed; a snapshot that cannot be written only
+    # stays stale, and the app reads SQLite until it is rewritten
+    path = snapshot_path(args.db_file)
+    try:
+        if written:
+            generation = refresh_snapshot(conn, path, args.snapshot_interval)
+            if generation is not None:
+                logging.info(f"Snapshot '{path}' is now at generation {generation}.")
+    except Exception as e:
+        logging.warning(f"Snapshot '{path}' not refreshed: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,138 @@
 # app.py
 
+import json
+import logging
+import multiprocessing
 import os
-from flask import Flask, render_template, request, redirect, flash
-import openai
 import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import (
+    Flask,
+    Response,
+    render_template,
+    request,
+    redirect,
+    flash,
+    jsonify,
+    url_for,
+)
 from dotenv import load_dotenv
 
+from candidate_index import CandidateIndex
+from db import DATABASE, TEAM_FILTERS, TEAM_QUERIES, ConnectionPool
+from jobs import DONE, FAILED, JobQueue, QueueFull
+from metrics import (
+    LLM_ERRORS,
+    LLM_TOKENS,
+    PROMPT_CHARS,
+    PROMPT_TOKENS,
+    REGISTRY,
+    annotate,
+    finish_trace,
+    log_event,
+    span,
+    start_trace,
+)
+from pareto import objective_names, pareto_front, start_pool
+from player_store import PlayerStore
+from prompt_encoding import encode_players, estimate_tokens
+from ratings import RatingEngine
+from similarity import SimilarityIndex, split_names
+from snapshot import SnapshotReader, snapshot_path
+from submission_rules import RULES
+from synergy import SynergyModel
+from team_cache import TeamCache
+from team_optimizer import describe_team, optimize_store
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Configure logging; request log lines are sampled (see metrics.finish_trace)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s [%(levelname)s] %(message)s",
+)
+
 app = Flask(__name__)
 app.secret_key = os.getenv(
     "FLASK_SECRET_KEY", "your_default_secret_key"
 )  # Replace with your own secret key
 
-# Configure OpenAI API Key
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# The openai package (and the pandas it pulls in) takes most of the import
+# time of this module, so it is imported on first use; see get_openai
+_openai = None
+_openai_lock = threading.Lock()
 
-# Database configuration
-DATABASE = "valorant_players.db"
+# Per-worker pool of read-only connections to the players database
+db_pool = ConnectionPool(DATABASE, size=int(os.getenv("DB_POOL_SIZE", "8")))
 
+# Memory-mapped copy of 'players' written by sqllite.py; every worker maps
+# the same file and picks up a swapped-in file on its next request. It is
+# only used while its data version matches the database.
+player_snapshot = SnapshotReader(os.getenv("PLAYER_SNAPSHOT", snapshot_path(DATABASE)))
 
-def get_db_connection():
-    """
-    Establishes a connection to the SQLite database.
+# Player data encoding sent to OpenAI (see prompt_encoding.PROMPT_ENCODINGS)
+PROMPT_ENCODING = os.getenv("PROMPT_ENCODING", "csv")
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "0")) or None
 
-    Returns:
-        conn (sqlite3.Connection): SQLite database connection.
-    """
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
-    return conn
+# Response cache; set TEAM_CACHE_DB to keep entries across worker restarts
+team_cache = TeamCache(
+    maxsize=int(os.getenv("TEAM_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("TEAM_CACHE_TTL", "3600")),
+    disk_path=os.getenv("TEAM_CACHE_DB"),
+)
 
+# Weight of real team strength (Elo over data/results.csv) in player
+# ratings; 0 keeps rosters purely stat-based
+ORG_STRENGTH_WEIGHT = float(os.getenv("ORG_STRENGTH_WEIGHT", "0"))
+rating_engine = None
 
-# Define role categories
-ROLE_CATEGORIES = {
-    "Duelist": ["Jett", "Phoenix", "Reyna", "Raze", "Yoru", "Neon"],
-    "Sentinel": ["Sage", "Cypher", "Killjoy", "Viper"],
-    "Controller": ["Omen", "Astra", "Brimstone", "Viper"],
-    "Initiator": ["Sova", "Breach", "Skye", "KAY/O", "Fade"],
-}
+# Pick rosters from per-role ranked lists kept in memory instead of
+# fetching every matching player (see candidate_index.CandidateIndex); one
+# index per team type, rated over that type's pool like optimize_store
+USE_CANDIDATE_INDEX = os.getenv("CANDIDATE_INDEX", "0") == "1"
+candidate_indexes = {}
+candidate_index_lock = threading.Lock()
 
+# Batch endpoint: worker processes and maximum number of requests per call
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "500"))
 
-def assign_role(agent):
-    """
-    Assigns a role based on the agent name.
+# Pareto search: islands searched in parallel (default: one per CPU) and
+# the longest time budget a request may ask for
+PARETO_WORKERS = int(os.getenv("PARETO_WORKERS", "0")) or None
+PARETO_MAX_BUDGET = float(os.getenv("PARETO_MAX_BUDGET", "5"))
 
-    Args:
-        agent (str): Name of the agent.
+# Similar-player search: largest k a request may ask for
+SIMILAR_MAX_K = int(os.getenv("SIMILAR_MAX_K", "100"))
+similarity_index = None
+similarity_index_lock = threading.Lock()
 
-    Returns:
-        str: Assigned role (Duelist, Sentinel, Controller, Initiator, or Undefined).
-    """
-    for role, agents in ROLE_CATEGORIES.items():
-        if agent in agents:
-            return role
-    return "Undefined"
+# Agent-composition synergy tables, estimated once per data version
+synergy_model = None
+synergy_version = None
+synergy_lock = threading.Lock()
 
+# Background generation jobs; their state is shared by all workers through SQLite
+job_queue = JobQueue(
+    os.getenv("JOBS_DATABASE", "jobs.db"),
+    max_workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_pending=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+)
 
-def build_prompt(team_type, additional_constraints, players):
+
+def build_prompt(
+    team_type,
+    additional_constraints,
+    players,
+    preselected=False,
+    encoding="verbose",
+    top_n_per_role=None,
+    token_budget=None,
+):
     """
     Builds the prompt to send to OpenAI based on the team type and constraints.
 
@@ -66,46 +140,57 @@ def build_prompt(team_type, additional_constraints, players):
         team_type (str): Description of the team submission type.
         additional_constraints (str): Any additional constraints provided by the user.
         players (list of dict): List of player data dictionaries.
+        preselected (bool): Whether the players already form the final roster,
+            in which case the model only analyses it.
+        encoding (str): Player data encoding, a key of PROMPT_ENCODINGS.
+        top_n_per_role (int): Send only the best rated players of each role.
+        token_budget (int): Maximum estimated tokens for the player data;
+            only candidates beyond a preselected roster are trimmed to fit.
 
     Returns:
         str: The constructed prompt.
     """
-    # Convert player data to a readable format
-    player_info = ""
-    for player in players:
-        role = assign_role(player["agent"])
-        player_info += (
-            f"Player Name: {player['player']}\n"
-            f"Organization: {player['org']}\n"
-            f"Rounds Played: {player['rds']}\n"
-            f"Average Combat Score: {player['average_combat_score']}\n"
-            f"Kill/Death Ratio: {player['kill_deaths']}\n"
-            f"Average Damage Per Round: {player['average_damage_per_round']}\n"
-            f"Kills Per Round: {player['kills_per_round']}\n"
-            f"Assists Per Round: {player['assists_per_round']}\n"
-            f"First Kills Per Round: {player['first_kills_per_round']}\n"
-            f"First Deaths Per Round: {player['first_deaths_per_round']}\n"
-            f"Headshot Percentage: {player['headshot_percentage']}%\n"
-            f"Clutch Success Percentage: {player['clutch_success_percentage']}%\n"
-            f"Clutches Won/Played: {player['clutch_won_played']:.2f}\n"
-            f"Total Kills: {player['total_kills']}\n"
-            f"Total Deaths: {player['total_deaths']}\n"
-            f"Total Assists: {player['total_assists']}\n"
-            f"Total First Kills: {player['total_first_kills']}\n"
-            f"Total First Deaths: {player['total_first_deaths']}\n"
-            f"Map ID: {player['map_id']}\n"
-            f"Agent: {player['agent']} ({role})\n"
-            # f"Region: {player['region'].upper()}\n"
-            f"Region: {player['region']}\n"
-            "-----\n"
+    with span("build_prompt"):
+        prompt = _build_prompt(
+            team_type,
+            additional_constraints,
+            players,
+            preselected,
+            encoding,
+            top_n_per_role,
+            token_budget,
         )
+    PROMPT_CHARS.observe(len(prompt))
+    PROMPT_TOKENS.observe(estimate_tokens(prompt))
+    return prompt
+
 
-    prompt = (
-        f"Build a team for a VALORANT esports team based on the following player data:\n\n"
-        f"{player_info}\n\n"
-        f"Team Submission Type: {team_type}\n"
+def _build_prompt(
+    team_type,
+    additional_constraints,
+    players,
+    preselected,
+    encoding,
+    top_n_per_role,
+    token_budget,
+):
+    # Convert player data to a readable format
+    # A preselected roster is sent whole, whatever the budget
+    player_info = encode_players(
+        players,
+        encoding,
+        top_n_per_role,
+        token_budget,
+        selected=players if preselected else None,
     )
 
+    if preselected:
+        header = "The following players have already been selected for a VALORANT esports team. Do not change the roster:\n\n"
+    else:
+        header = "Build a team for a VALORANT esports team based on the following player data:\n\n"
+
+    prompt = f"{header}{player_info}\n\nTeam Submission Type: {team_type}\n"
+
     if additional_constraints:
         prompt += f"Additional Constraints: {additional_constraints}\n\n"
 
@@ -121,6 +206,707 @@ def build_prompt(team_type, additional_constraints, players):
     return prompt
 
 
+class TeamGenerationError(Exception):
+    """
+    Raised when a team cannot be generated. The message is shown to the user.
+    """
+
+
+def get_data_version():
+    """
+    Reads the version stamp of the players data.
+
+    sqllite.create_database bumps the SQLite user_version on every load, so
+    cached rosters built from older data are never served.
+
+    Returns:
+        int: Current data version.
+    """
+    return db_pool.data_version()
+
+
+def fetch_players(team_type):
+    """
+    Fetches the candidate players for a team submission type.
+
+    Players come from the mapped snapshot when it is current, otherwise
+    from the team type's query.
+
+    Args:
+        team_type (str): Description of the team submission type.
+
+    Returns:
+        PlayerStore: Columnar store of the matching players.
+
+    Raises:
+        TeamGenerationError: If the type is unknown, the query fails or no
+            player matches.
+    """
+    if team_type not in TEAM_QUERIES:
+        raise TeamGenerationError("Invalid team submission type selected.")
+
+    snapshot = player_snapshot.current()
+    if snapshot is not None and snapshot.data_version == get_data_version():
+        with span("snapshot_select"):
+            players = snapshot.store.select(
+                snapshot.store.mask(**TEAM_FILTERS[team_type])
+            )
+        if not len(players):
+            raise TeamGenerationError(
+                "No players found matching the selected criteria."
+            )
+        return players
+
+    try:
+        rows = db_pool.fetch_team_players(team_type)
+    except Exception as e:
+        raise TeamGenerationError(
+            f"An error occurred while querying the database: {e}"
+        ) from e
+
+    if not rows:
+        raise TeamGenerationError("No players found matching the selected criteria.")
+
+    # Convert rows to a columnar store
+    with span("rows_to_store"):
+        return PlayerStore.from_rows(rows)
+
+
+def get_org_bonus(orgs):
+    """
+    Rating bonus of each organization in the player pool, from the Elo
+    rating of the team of the same name.
+
+    Args:
+        orgs (Iterable of str): Organizations of the candidate players.
+
+    Returns:
+        dict: Org -> bonus, or None when team strength is not used.
+    """
+    global rating_engine
+    if not ORG_STRENGTH_WEIGHT:
+        return None
+    if rating_engine is None:
+        try:
+            rating_engine = RatingEngine.from_results()
+        except OSError as e:
+            logging.warning(f"Team ratings unavailable: {e}")
+            return None
+    strength = rating_engine.org_strength(orgs)
+    return {org: ORG_STRENGTH_WEIGHT * value for org, value in strength.items()}
+
+
+def region_mask(players, region):
+    """
+    Selects the players of one region, ignoring case.
+
+    Args:
+        players (PlayerStore): Candidate players.
+        region (str): Region name, e.g. "na"; None selects every player.
+
+    Returns:
+        np.ndarray: Boolean mask over the players, or None for no region.
+    """
+    if not region:
+        return None
+    names = [
+        name for name in players.categories["region"] if name.upper() == region.upper()
+    ]
+    return players.mask(region=names)
+
+
+def select_roster(team_type, players, mask=None):
+    """
+    Picks the roster for a team submission type.
+
+    Args:
+        team_type (str): Description of the team submission type.
+        players (PlayerStore): Candidate players.
+        mask (np.ndarray): Rows of players eligible for the roster, e.g.
+            from region_mask. Defaults to all rows.
+
+    Returns:
+        list of dict: The selected players.
+
+    Raises:
+        TeamGenerationError: If the candidates cannot satisfy the constraints.
+    """
+    # Reject requests whose quotas the candidates cannot meet
+    rule = RULES.get(team_type)
+    problem = rule.check(players, mask) if rule is not None else None
+    if problem:
+        raise TeamGenerationError(problem)
+
+    # Pick the roster locally; the LLM only writes the analysis
+    roster = optimize_store(
+        players,
+        team_type,
+        mask=mask,
+        org_bonus=get_org_bonus(players.categories["org"]),
+    )
+    if roster is None:
+        raise TeamGenerationError(
+            "Not enough players to build a team satisfying the selected criteria."
+        )
+    return roster
+
+
+def get_candidate_index(team_type):
+    """
+    Returns this process's candidate index of a team type's pool, up to
+    date with the database.
+
+    The index is built on first use and afterwards only reloads the rows
+    logged as changed since its data version.
+
+    Args:
+        team_type (str): Team submission type with filters in TEAM_FILTERS.
+
+    Returns:
+        CandidateIndex: The index.
+    """
+    with candidate_index_lock, db_pool.connection() as conn:
+        index = candidate_indexes.get(team_type)
+        if index is None:
+            index = candidate_indexes[team_type] = CandidateIndex.from_database(
+                conn, filters=TEAM_FILTERS[team_type]
+            )
+        else:
+            index.refresh(conn)
+        return index
+
+
+def get_similarity_index():
+    """
+    Returns this process's similar-player index, up to date with the
+    database (see get_candidate_index).
+
+    Returns:
+        SimilarityIndex: The index.
+    """
+    global similarity_index
+    with similarity_index_lock, db_pool.connection() as conn:
+        if similarity_index is None:
+            similarity_index = SimilarityIndex.from_database(conn)
+        else:
+            similarity_index.refresh(conn)
+        return similarity_index
+
+
+def get_synergy_model():
+    """
+    Returns the synergy model of the current data version, estimating it
+    from the database when the data changed.
+
+    Returns:
+        SynergyModel: The model.
+    """
+    global synergy_model, synergy_version
+    with synergy_lock, db_pool.connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if synergy_model is None or synergy_version != version:
+            synergy_model = SynergyModel.from_database(conn)
+            synergy_version = version
+        return synergy_model
+
+
+def fetch_rows(ids):
+    """
+    Reads 'players' rows by id.
+    """
+    if not ids:
+        return []
+    return db_pool.query(
+        f"SELECT * FROM players WHERE id IN ({', '.join('?' for _ in ids)})", ids
+    )
+
+
+def select_indexed_roster(team_type):
+    """
+    Picks the roster for a team submission type from the candidate index,
+    without fetching every matching player.
+
+    Args:
+        team_type (str): Description of the team submission type.
+
+    Returns:
+        list of dict: The selected players.
+
+    Raises:
+        TeamGenerationError: If the type is unknown, the database cannot be
+            read or no roster satisfies the constraints.
+    """
+    if team_type not in TEAM_FILTERS:
+        raise TeamGenerationError("Invalid team submission type selected.")
+    try:
+        index = get_candidate_index(team_type)
+        roster = index.optimize(
+            fetch_rows,
+            team_type,
+            TEAM_FILTERS[team_type],
+            org_bonus=get_org_bonus(index.orgs()),
+        )
+    except Exception as e:
+        raise TeamGenerationError(
+            f"An error occurred while querying the database: {e}"
+        ) from e
+    if roster is None:
+        raise TeamGenerationError(
+            "Not enough players to build a team satisfying the selected criteria."
+        )
+    return roster
+
+
+def get_openai():
+    """
+    Imports and configures the openai package on first use.
+
+    Returns:
+        module: The openai module.
+    """
+    global _openai
+    if _openai is None:
+        with _openai_lock:
+            if _openai is None:
+                import openai
+
+                # Configure OpenAI API Key
+                openai.api_key = os.getenv("OPENAI_API_KEY")
+                _openai = openai
+    return _openai
+
+
+def warm_up():
+    """
+    Prepares a freshly started worker: compiles every template, opens a
+    database connection, and imports openai and starts the Pareto search
+    workers in the background, so the first requests do not pay for them
+    and the worker still boots quickly.
+
+    Called by gunicorn after a worker loads the app (see gunicorn.conf.py).
+    """
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    try:
+        with db_pool.connection():
+            pass
+    except sqlite3.Error as e:
+        logging.warning(f"Database not ready: {e}")
+    threading.Thread(target=get_openai, daemon=True).start()
+    threading.Thread(target=start_pool, args=(PARETO_WORKERS,), daemon=True).start()
+
+
+def _chat_completion(prompt, stream=False):
+    return get_openai().ChatCompletion.create(
+        model="gpt-4",  # or "gpt-3.5-turbo"
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an expert in VALORANT team compositions and strategies.",
+            },
+            {"role": "user", "content": prompt},
+        ],
+        max_tokens=1500,  # Adjust based on desired response length
+        temperature=0.7,
+        stream=stream,
+    )
+
+
+def request_analysis(prompt):
+    """
+    Asks OpenAI for the team analysis.
+
+    Args:
+        prompt (str): The prompt built by build_prompt.
+
+    Returns:
+        str: The generated report.
+
+    Raises:
+        TeamGenerationError: If the API call fails.
+    """
+    try:
+        with span("llm"):
+            response = _chat_completion(prompt)
+    except Exception as e:
+        LLM_ERRORS.inc(call="complete")
+        raise TeamGenerationError(
+            f"An error occurred while generating the team: {e}"
+        ) from e
+    usage = response.get("usage") or {}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if kind in usage:
+            LLM_TOKENS.observe(usage[kind], kind=kind)
+    return response["choices"][0]["message"]["content"].strip()
+
+
+def stream_analysis(prompt):
+    """
+    Asks OpenAI for the team analysis and yields it as it is generated.
+
+    Args:
+        prompt (str): The prompt built by build_prompt.
+
+    Yields:
+        str: Chunks of the report, in order.
+
+    Raises:
+        TeamGenerationError: If the API call fails, possibly after some
+            chunks were already yielded.
+    """
+    try:
+        # Includes the time the consumer spends between chunks
+        with span("llm_stream"):
+            for chunk in _chat_completion(prompt, stream=True):
+                content = chunk["choices"][0]["delta"].get("content")
+                if content:
+                    yield content
+    except Exception as e:
+        LLM_ERRORS.inc(call="stream")
+        raise TeamGenerationError(
+            f"An error occurred while generating the team: {e}"
+        ) from e
+
+
+def write_report(team_type, additional_constraints, roster, fast_mode=False):
+    """
+    Writes the report about a selected roster.
+
+    Args:
+        team_type (str): Description of the team submission type.
+        additional_constraints (str): Any additional constraints provided by the user.
+        roster (list of dict): Players returned by select_roster.
+        fast_mode (bool): Write the report locally instead of calling OpenAI.
+
+    Returns:
+        str: The team report.
+
+    Raises:
+        TeamGenerationError: If the OpenAI call fails.
+    """
+    if fast_mode:
+        return describe_team(team_type, roster)
+
+    # Build the prompt for OpenAI
+    prompt = build_prompt(
+        team_type,
+        additional_constraints,
+        roster,
+        preselected=True,
+        encoding=PROMPT_ENCODING,
+        token_budget=PROMPT_TOKEN_BUDGET,
+    )
+    report_text = request_analysis(prompt)
+    annotate(
+        team_type=team_type,
+        roster=[player["player"] for player in roster],
+        prompt_chars=len(prompt),
+        report_chars=len(report_text),
+    )
+    log_event("report", logging.DEBUG, prompt=prompt, report=report_text)
+    return report_text
+
+
+def generate_team(team_type, additional_constraints, fast_mode=False, progress=None):
+    """
+    Runs the full generation path: fetch players, pick a roster, write the report.
+
+    Args:
+        team_type (str): Description of the team submission type.
+        additional_constraints (str): Any additional constraints provided by the user.
+        fast_mode (bool): Write the report locally instead of calling OpenAI.
+        progress (callable): Called with a short message before each step.
+
+    Returns:
+        str: The team report.
+
+    Raises:
+        TeamGenerationError: If any step fails.
+    """
+    progress = progress or (lambda message: None)
+
+    if USE_CANDIDATE_INDEX:
+        progress("Selecting roster")
+        with span("select_roster"):
+            roster = select_indexed_roster(team_type)
+    else:
+        progress("Fetching players")
+        players = fetch_players(team_type)
+        progress("Selecting roster")
+        with span("select_roster"):
+            roster = select_roster(team_type, players)
+
+    if not fast_mode:
+        progress("Writing team analysis")
+    return write_report(team_type, additional_constraints, roster, fast_mode)
+
+
+def get_team_report(team_type, additional_constraints, fast_mode=False, progress=None):
+    """
+    Returns the team report, served from the response cache when possible.
+
+    Args:
+        team_type (str): Description of the team submission type.
+        additional_constraints (str): Any additional constraints provided by the user.
+        fast_mode (bool): Write the report locally instead of calling OpenAI.
+        progress (callable): Called with a short message before each step.
+
+    Returns:
+        str: The team report.
+
+    Raises:
+        TeamGenerationError: If the team type is unknown, or the report is
+            not cached and generation fails.
+    """
+    if team_type not in TEAM_QUERIES:
+        raise TeamGenerationError("Invalid team submission type selected.")
+    key = team_cache.make_key(
+        team_type,
+        additional_constraints,
+        get_data_version(),
+        "fast" if fast_mode else "full",
+    )
+    report_text = team_cache.get(key)
+    if report_text is None:
+        start = time.perf_counter()
+        report_text = generate_team(
+            team_type, additional_constraints, fast_mode, progress
+        )
+        team_cache.set(key, report_text, time.perf_counter() - start)
+    return report_text
+
+
+def parse_batch_request(item):
+    """
+    Validates one entry of a batch and fills in its defaults.
+
+    Args:
+        item (dict): team_type, and optionally additional_constraints,
+            region and mode ("fast" or "full").
+
+    Returns:
+        dict: The request with every field set.
+
+    Raises:
+        TeamGenerationError: If the entry is malformed.
+    """
+    if not isinstance(item, dict) or not item.get("team_type"):
+        raise TeamGenerationError("team_type is required.")
+    mode = item.get("mode") or "full"
+    if mode not in ("fast", "full"):
+        raise TeamGenerationError(f"Unknown mode: {mode}.")
+    return {
+        "team_type": item["team_type"],
+        "additional_constraints": (item.get("additional_constraints") or "").strip(),
+        "region": (item.get("region") or "").strip() or None,
+        "mode": mode,
+    }
+
+
+# Batch workers of this process, started by a fork server like the Pareto
+# islands (see pareto.get_pool): forking a threaded gunicorn worker could
+# copy a lock another thread holds into the child.
+_batch_pool = None
+_batch_pool_size = 0
+_batch_pool_pid = None
+_batch_pool_lock = threading.Lock()
+
+
+def get_batch_pool(workers=BATCH_WORKERS):
+    """
+    Returns this process's pool of batch workers, starting it on first use.
+
+    The pool lives as long as the process; it is replaced when more workers
+    are asked for, after a fork and after a worker died.
+
+    Args:
+        workers (int): Workers the pool needs at least.
+
+    Returns:
+        ProcessPoolExecutor: The pool.
+    """
+    global _batch_pool, _batch_pool_size, _batch_pool_pid
+    with _batch_pool_lock:
+        if (
+            _batch_pool is None
+            or _batch_pool_pid != os.getpid()
+            or _batch_pool_size < workers
+        ):
+            if _batch_pool is not None and _batch_pool_pid == os.getpid():
+                _batch_pool.shutdown(wait=False)
+            _batch_pool = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("forkserver")
+            )
+            _batch_pool_size = workers
+            _batch_pool_pid = os.getpid()
+        return _batch_pool
+
+
+def _discard_batch_pool(pool):
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is pool:
+            _batch_pool = None
+
+
+def generate_batch_request(batch_request, players):
+    """
+    Generates one parsed batch request from the batch's player snapshot.
+
+    Args:
+        batch_request (dict): Request returned by parse_batch_request.
+        players (PlayerStore): Players of the request's team type in the
+            snapshot, or None if it has none.
+
+    Returns:
+        tuple: The report and the seconds it took, or None and the error
+        message.
+    """
+    start = time.perf_counter()
+    team_type = batch_request["team_type"]
+    try:
+        if team_type not in TEAM_QUERIES:
+            raise TeamGenerationError("Invalid team submission type selected.")
+        if players is None:
+            raise TeamGenerationError(
+                "No players found matching the selected criteria."
+            )
+        roster = select_roster(
+            team_type, players, region_mask(players, batch_request["region"])
+        )
+        report_text = write_report(
+            team_type,
+            batch_request["additional_constraints"],
+            roster,
+            batch_request["mode"] == "fast",
+        )
+    except TeamGenerationError as e:
+        return None, str(e)
+    return report_text, time.perf_counter() - start
+
+
+def run_batch(items, workers=BATCH_WORKERS):
+    """
+    Generates many team requests against one snapshot of the players data.
+
+    The players of every requested team type are read in a single
+    transaction. Identical requests (after normalising their text) are
+    generated once, cached reports are reused, and the rest are spread
+    over the batch worker processes, each sent the players of its
+    request's team type.
+
+    Args:
+        items (list of dict): Requests, see parse_batch_request.
+        workers (int): Worker processes; 1 generates in this process.
+
+    Yields:
+        dict: One result per request, in input order, with the request
+        fields, "status" ("done" or "failed"), "report" or "error",
+        "cached" and "data_version".
+    """
+    requests, keys, distinct = [], [], {}
+    for item in items:
+        try:
+            batch_request = parse_batch_request(item)
+        except TeamGenerationError as e:
+            batch_request = {"error": str(e)}
+        requests.append(batch_request)
+
+    team_types = {
+        batch_request["team_type"]
+        for batch_request in requests
+        if batch_request.get("team_type") in TEAM_QUERIES
+    }
+    try:
+        data_version, rows = db_pool.fetch_snapshot(sorted(team_types))
+    except Exception as e:
+        raise TeamGenerationError(
+            f"An error occurred while querying the database: {e}"
+        ) from e
+    players = {
+        team_type: PlayerStore.from_rows(team_rows)
+        for team_type, team_rows in rows.items()
+        if team_rows
+    }
+
+    results = {}
+    for batch_request in requests:
+        if "error" in batch_request:
+            keys.append(None)
+            continue
+        key = team_cache.make_key(
+            batch_request["team_type"],
+            batch_request["additional_constraints"],
+            data_version,
+            batch_request["mode"],
+            batch_request["region"],
+        )
+        keys.append(key)
+        if key in distinct or key in results:
+            continue
+        report_text = team_cache.get(key)
+        if report_text is None:
+            distinct[key] = batch_request
+        else:
+            results[key] = {"status": "done", "report": report_text, "cached": True}
+
+    def result(index):
+        output = dict(requests[index], index=index, data_version=data_version)
+        if keys[index] is None:
+            return dict(output, status="failed", cached=False)
+        return dict(output, **results[keys[index]])
+
+    pending = list(distinct)
+    stores = [
+        players.get(batch_request["team_type"]) for batch_request in distinct.values()
+    ]
+    pool = None
+    if workers > 1 and len(pending) > 1:
+        pool = get_batch_pool(workers)
+        generated = pool.map(generate_batch_request, distinct.values(), stores)
+    else:
+        generated = map(generate_batch_request, distinct.values(), stores)
+
+    try:
+        next_index = 0
+        for key, (report_text, outcome) in zip(pending, generated):
+            if report_text is None:
+                results[key] = {"status": "failed", "error": outcome, "cached": False}
+            else:
+                team_cache.set(key, report_text, outcome)
+                results[key] = {
+                    "status": "done",
+                    "report": report_text,
+                    "cached": False,
+                }
+            # Emit every request whose result is known, keeping input order
+            while next_index < len(requests) and (
+                keys[next_index] is None or keys[next_index] in results
+            ):
+                yield result(next_index)
+                next_index += 1
+        for index in range(next_index, len(requests)):
+            yield result(index)
+    except BrokenProcessPool as e:
+        _discard_batch_pool(pool)
+        raise TeamGenerationError("A batch worker stopped unexpectedly.") from e
+    finally:
+        # Cancels the requests not started yet when the caller stops early
+        if pool is not None:
+            generated.close()
+
+
+@app.before_request
+def begin_request_trace():
+    start_trace(method=request.method, path=request.path)
+
+
+@app.after_request
+def end_request_trace(response):
+    finish_trace(request.endpoint or "unknown", response.status_code)
+    return response
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     """
@@ -132,126 +918,350 @@ def index():
     if request.method == "POST":
         team_type = request.form.get("team_type")
         additional_constraints = request.form.get("additional_constraints", "").strip()
+        fast_mode = request.form.get("mode") == "fast"
 
         if not team_type:
             flash("Please select a team submission type.")
             return redirect(request.url)
 
-        # Connect to the database and fetch relevant players based on team_type
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        try:
+            report_text = get_team_report(team_type, additional_constraints, fast_mode)
+        except TeamGenerationError as e:
+            flash(str(e))
+            return redirect(request.url)
+
+        with span("render"):
+            return render_template("result.html", team_composition=report_text)
+
+    with span("render"):
+        return render_template("index.html", submission_rules=RULES.values())
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    Queues a team generation job.
+
+    Accepts the homepage form or a JSON body with the same fields. Form
+    submissions are redirected to the job page; JSON clients get the job id
+    and its URLs.
+
+    Returns:
+        Redirect or JSON response (202), or 503 when the queue is full.
+    """
+    data = request.get_json(silent=True) if request.is_json else request.form
+    data = data or {}
+    team_type = data.get("team_type")
+    additional_constraints = (data.get("additional_constraints") or "").strip()
+    fast_mode = data.get("mode") == "fast"
+
+    if not team_type:
+        if request.is_json:
+            return jsonify(error="team_type is required."), 400
+        flash("Please select a team submission type.")
+        return redirect(url_for("index"))
+
+    if data.get("mode") == "stream" and not request.is_json:
+        return redirect(
+            url_for(
+                "stream_page",
+                team_type=team_type,
+                additional_constraints=additional_constraints,
+            )
+        )
+
+    try:
+        job_id = job_queue.submit(
+            get_team_report,
+            {"team_type": team_type, "additional_constraints": additional_constraints},
+            team_type,
+            additional_constraints,
+            fast_mode,
+        )
+    except QueueFull as e:
+        if request.is_json:
+            return jsonify(error=str(e)), 503, {"Retry-After": "5"}
+        flash(f"{e} Please try again in a few seconds.")
+        return redirect(url_for("index"))
+
+    if not request.is_json:
+        return redirect(url_for("job_status", job_id=job_id))
+    return (
+        jsonify(
+            job_id=job_id,
+            status_url=url_for("job_status", job_id=job_id),
+            events_url=url_for("job_events", job_id=job_id),
+        ),
+        202,
+    )
+
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """
+    Generates a list of team requests in one call.
+
+    Takes a JSON list of requests, or an object with a "requests" list;
+    each request has team_type and optionally additional_constraints,
+    region and mode. Results are streamed back as JSON lines in the order
+    of the requests.
+
+    Returns:
+        application/x-ndjson response, or a JSON error (400/413).
+    """
+    data = request.get_json(silent=True)
+    items = data.get("requests") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify(error="Expected a non-empty list of team requests."), 400
+    if len(items) > BATCH_MAX_REQUESTS:
+        return (
+            jsonify(error=f"At most {BATCH_MAX_REQUESTS} requests per batch."),
+            413,
+        )
 
+    def stream():
         try:
-            if team_type == "Professional Team Submission":
-                # All existing organizations
-                query = """
-                SELECT * FROM players
-                WHERE org IN ('Ascend', 'Mystic', 'Legion', 'Phantom', 'Rising', 'Nebula', 'OrgZ', 'T1A')
-                """
-
-                # query = """
-                # SELECT * FROM players
-                # """
-            elif team_type == "Semi-Professional Team Submission":
-                # Modify or remove this if no semi-professional orgs exist
-                # For example, target 'Rising' as semi-professional
-                query = """
-                SELECT * FROM players
-                WHERE org = 'Rising'
-                """
-            elif team_type == "Game Changers Team Submission":
-                # If 'Game Changers' orgs exist, list them; else, adjust accordingly
-                # Assuming 'OrgZ' represents 'Game Changers'
-                query = """
-                SELECT * FROM players
-                WHERE org = 'OrgZ'
-                """
-            elif team_type == "Mixed-Gender Team Submission":
-                # With only one player from 'OrgZ', adjust constraint to at least one
-                query = """
-                SELECT * FROM players
-                WHERE org = 'OrgZ'
-                LIMIT 1
-                """
-            elif team_type == "Cross-Regional Team Submission":
-                # Adjust regions to match your data: 'Japan', 'Russia', 'China', 'ME', 'LATAM'
-                query = """
-                SELECT * FROM players
-                WHERE region IN ('Japan', 'Russia', 'China', 'ME', 'LATAM')
-                LIMIT 3
-                """
-            elif team_type == "Rising Star Team Submission":
-                # Targeting 'Rising' organization
-                query = """
-                SELECT * FROM players
-                WHERE org = 'Rising'
-                """
+            for output in run_batch(items):
+                yield json.dumps(output) + "\n"
+        except TeamGenerationError as e:
+            yield json.dumps({"status": "failed", "error": str(e)}) + "\n"
+
+    return Response(stream(), mimetype="application/x-ndjson")
+
+
+@app.route("/pareto", methods=["POST"])
+def pareto():
+    """
+    Searches the trade-offs between rosters of a team submission type.
+
+    Takes a JSON body with team_type and optionally time_budget in
+    seconds and synergy. Returns the Pareto front over mean ACS, FK - FD,
+    role balance and region diversity, plus the agent-composition synergy
+    when synergy is true (see pareto.pareto_front). Every roster on the
+    front meets the quotas of the team type.
+
+    Returns:
+        JSON response with the front, or an error (400/422).
+    """
+    data = request.get_json(silent=True) or {}
+    team_type = data.get("team_type")
+    if not team_type:
+        return jsonify(error="team_type is required."), 400
+    try:
+        time_budget = min(float(data.get("time_budget", 0.5)), PARETO_MAX_BUDGET)
+    except (TypeError, ValueError):
+        return jsonify(error="time_budget must be a number of seconds."), 400
+
+    try:
+        players = fetch_players(team_type)
+    except TeamGenerationError as e:
+        return jsonify(error=str(e)), 422
+    problem = RULES[team_type].check(players)
+    if problem:
+        return jsonify(error=problem), 422
+    synergy = get_synergy_model() if data.get("synergy") else None
+    front = pareto_front(
+        players, time_budget, PARETO_WORKERS, synergy=synergy, team_type=team_type
+    )
+    return jsonify(
+        team_type=team_type, objectives=objective_names(synergy), front=front
+    )
+
+
+@app.route("/similar")
+def similar():
+    """
+    Finds the players whose stats are most like a player's.
+
+    Takes the query parameters player, and optionally k and comma-separated
+    role and region filters (see similarity.SimilarityIndex.similar).
+
+    Returns:
+        JSON response with the similar players' rows and their distance,
+        nearest first, or an error (400/404).
+    """
+    player = request.args.get("player", "").strip()
+    if not player:
+        return jsonify(error="player is required."), 400
+    try:
+        k = min(int(request.args.get("k", 10)), SIMILAR_MAX_K)
+    except ValueError:
+        return jsonify(error="k must be a whole number."), 400
+    if k < 1:
+        return jsonify(error="k must be at least 1."), 400
+
+    try:
+        matches = get_similarity_index().similar(
+            player,
+            k,
+            split_names(request.args.get("role")),
+            split_names(request.args.get("region")),
+        )
+    except KeyError:
+        return jsonify(error=f"Unknown player: {player}"), 404
+    rows = {row["id"]: dict(row) for row in fetch_rows([m.id for m in matches])}
+    return jsonify(
+        player=player,
+        similar=[
+            dict(rows[match.id], distance=match.distance)
+            for match in matches
+            if match.id in rows
+        ],
+    )
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """
+    Shows a job: the result page once it is done, a progress page before.
+
+    Returns:
+        Rendered HTML template, or a redirect home if the job failed.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        flash("Unknown or expired job.")
+        return redirect(url_for("index"))
+    if job["status"] == DONE:
+        return render_template("result.html", team_composition=job["result"])
+    if job["status"] == FAILED:
+        flash(job["error"])
+        return redirect(url_for("index"))
+    return render_template("job.html", job=job)
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    """
+    Streams a job's progress as Server-Sent Events until it finishes.
+
+    Returns:
+        text/event-stream response.
+    """
+
+    def stream():
+        for job in job_queue.events(job_id):
+            payload = json.dumps({"status": job["status"], "progress": job["progress"]})
+            yield f"event: {job['status']}\ndata: {payload}\n\n"
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/stream")
+def stream_page():
+    """
+    Shows a result page that fills in the team analysis as it is generated.
+
+    Returns:
+        Rendered HTML template.
+    """
+    team_type = request.args.get("team_type")
+    if not team_type:
+        flash("Please select a team submission type.")
+        return redirect(url_for("index"))
+    return render_template(
+        "result_stream.html",
+        team_type=team_type,
+        additional_constraints=request.args.get("additional_constraints", ""),
+    )
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/stream/events")
+def stream_events():
+    """
+    Streams the team analysis token by token as Server-Sent Events.
+
+    Sends "status" events while the roster is selected, then "token" events
+    with report text, and finally "done", or "failed" with the error
+    message. Text already sent stays valid when the stream fails.
+
+    Returns:
+        text/event-stream response.
+    """
+    team_type = request.args.get("team_type")
+    additional_constraints = request.args.get("additional_constraints", "").strip()
+
+    def stream():
+        parts = []
+        try:
+            if team_type not in TEAM_QUERIES:
+                raise TeamGenerationError("Invalid team submission type selected.")
+            key = team_cache.make_key(
+                team_type, additional_constraints, get_data_version(), "full"
+            )
+            report_text = team_cache.get(key)
+            if report_text is not None:
+                yield _sse("token", report_text)
+                yield _sse("done", {})
+                return
+
+            start = time.perf_counter()
+            yield _sse("status", "Selecting roster")
+            if USE_CANDIDATE_INDEX:
+                with span("select_roster"):
+                    roster = select_indexed_roster(team_type)
             else:
-                flash("Invalid team submission type selected.")
-                return redirect(request.url)
-
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            conn.close()
-
-            if not rows:
-                flash("No players found matching the selected criteria.")
-                return redirect(request.url)
-
-            # Convert rows to list of dicts
-            players = [dict(row) for row in rows]
-
-            # If Mixed-Gender Team Submission or Cross-Regional Team Submission, ensure constraints
-            if team_type == "Mixed-Gender Team Submission":
-                # Ensure at least one player from OrgZ
-                orgZ_players = [p for p in players if p["org"] == "OrgZ"]
-                if len(orgZ_players) < 1:
-                    flash(
-                        "Not enough players from underrepresented groups (OrgZ) to build a Mixed-Gender team."
-                    )
-                    return redirect(request.url)
-            elif team_type == "Cross-Regional Team Submission":
-                # Ensure players are from at least three different regions
-                print("xyz")
-                regions = set(p["region"].upper() for p in players if p["region"])
-                print("xyz")
-                if len(regions) < 3:
-                    flash(
-                        "Not enough players from different regions to build a Cross-Regional team."
-                    )
-                    return redirect(request.url)
-
-            # Build the prompt for OpenAI
-            prompt = build_prompt(team_type, additional_constraints, players)
-            print(players)
-            print(prompt)
-            try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-4",  # or "gpt-3.5-turbo"
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert in VALORANT team compositions and strategies.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    max_tokens=1500,  # Adjust based on desired response length
-                    temperature=0.7,
-                )
-                report_text = response["choices"][0]["message"]["content"].strip()
-                print(report_text)
-                return render_template("result.html", team_composition=report_text)
-
-            except Exception as e:
-                flash(f"An error occurred while generating the team: {e}")
-                return redirect(request.url)
-
-        except Exception as e:
-            conn.close()
-            flash(f"An error occurred while querying the database: {e}")
-            return redirect(request.url)
+                players = fetch_players(team_type)
+                with span("select_roster"):
+                    roster = select_roster(team_type, players)
+            prompt = build_prompt(
+                team_type,
+                additional_constraints,
+                roster,
+                preselected=True,
+                encoding=PROMPT_ENCODING,
+                token_budget=PROMPT_TOKEN_BUDGET,
+            )
+
+            yield _sse("status", "Writing team analysis")
+            for text in stream_analysis(prompt):
+                parts.append(text)
+                yield _sse("token", text)
+        except TeamGenerationError as e:
+            if parts:
+                logging.warning(f"Stream failed after {len(parts)} chunks: {e}")
+            yield _sse("failed", str(e))
+            return
+
+        team_cache.set(key, "".join(parts).strip(), time.perf_counter() - start)
+        yield _sse("done", {})
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
-    return render_template("index.html")
+@app.route("/metrics")
+def metrics():
+    """
+    Exposes this worker's timing spans, prompt sizes and token usage in
+    the Prometheus text format (see metrics.REGISTRY).
+
+    Returns:
+        text/plain response.
+    """
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/cache/stats")
+def cache_stats():
+    """
+    Reports the response cache counters.
+
+    Returns:
+        JSON with hits, misses and the generation time saved by hits.
+    """
+    return jsonify(team_cache.stats())
 
 
 if __name__ == "__main__":
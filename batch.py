@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Generates rosters for many team requests at once and writes them as JSON lines.
+
+Requests come from a file holding a JSON list or one JSON object per line,
+each with team_type and optionally additional_constraints, region and mode,
+or from the combinations of --team_types, --regions and --constraints.
+All requests share one snapshot of the players data; identical requests
+are generated once.
+
+Usage:
+    python batch.py requests.jsonl --workers 4 --output rosters.jsonl
+    python batch.py --team_types all --regions NA,EU,Japan --mode fast
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import sys
+import time
+
+from app import BATCH_WORKERS, TeamGenerationError, run_batch
+from db import TEAM_QUERIES
+
+# Configure logging; stdout carries the results
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stderr)],
+)
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate team rosters for a batch of requests."
+    )
+    parser.add_argument(
+        "requests_file",
+        nargs="?",
+        help="JSON list or JSON lines of requests; '-' reads standard input.",
+    )
+    parser.add_argument(
+        "--team_types",
+        type=str,
+        help="Comma-separated team submission types to combine, or 'all'.",
+    )
+    parser.add_argument(
+        "--regions",
+        type=str,
+        default="",
+        help="Comma-separated regions to combine with every team type.",
+    )
+    parser.add_argument(
+        "--constraints",
+        action="append",
+        default=None,
+        help="Additional constraints to combine; may be given several times.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("fast", "full"),
+        default="full",
+        help="Mode of the combined requests.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BATCH_WORKERS,
+        help="Worker processes generating requests in parallel.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="-",
+        help="File to write the JSON lines to; '-' writes standard output.",
+    )
+    return parser.parse_args()
+
+
+def read_requests(f):
+    """
+    Reads requests from a JSON list or from JSON lines.
+
+    Args:
+        f (file): Open text file.
+
+    Returns:
+        list of dict: The requests.
+
+    Raises:
+        ValueError: If the content is not valid JSON.
+    """
+    text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def combine_requests(team_types, regions=(), constraints=(), mode="full"):
+    """
+    Builds one request per team type x region x constraint set.
+
+    Args:
+        team_types (Iterable of str): Team submission types.
+        regions (Iterable of str): Regions; empty for no region filter.
+        constraints (Iterable of str): Additional constraints; empty for none.
+        mode (str): "fast" or "full".
+
+    Returns:
+        list of dict: The requests.
+    """
+    return [
+        {
+            "team_type": team_type,
+            "region": region,
+            "additional_constraints": constraint,
+            "mode": mode,
+        }
+        for team_type, region, constraint in itertools.product(
+            team_types, list(regions) or [None], list(constraints) or [""]
+        )
+    ]
+
+
+def main():
+    args = parse_arguments()
+
+    if args.team_types:
+        team_types = (
+            list(TEAM_QUERIES)
+            if args.team_types == "all"
+            else [name.strip() for name in args.team_types.split(",")]
+        )
+        requests = combine_requests(
+            team_types,
+            [region.strip() for region in args.regions.split(",") if region.strip()],
+            args.constraints or (),
+            args.mode,
+        )
+    elif args.requests_file:
+        try:
+            if args.requests_file == "-":
+                requests = read_requests(sys.stdin)
+            else:
+                with open(args.requests_file) as f:
+                    requests = read_requests(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading requests: {e}")
+            sys.exit(1)
+    else:
+        logging.error("Give a requests file or --team_types.")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    counts = {"done": 0, "failed": 0, "cached": 0}
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        # Reports printed while generating must not mix with the results
+        with contextlib.redirect_stdout(sys.stderr):
+            for result in run_batch(requests, workers=args.workers):
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                counts[result["status"]] += 1
+                counts["cached"] += result["cached"]
+    except TeamGenerationError as e:
+        logging.error(str(e))
+        sys.exit(1)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    logging.info(
+        f"{len(requests)} requests in {elapsed:.2f}s "
+        f"({len(requests) / elapsed:.1f}/s): {counts['done']} done, "
+        f"{counts['failed']} failed, {counts['cached']} from cache."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the team generation endpoint under load.
+
+For every table size, generates synthetic players with
+synthetic_data.write_player_data, loads them with sqllite.create_database,
+starts the app under gunicorn against a local stand-in for the OpenAI
+ChatCompletion API with a configurable latency, and drives POST / for
+every team submission type from concurrent clients. Reports p50/p95/p99
+latency, throughput and the peak RSS of the gunicorn processes, and writes
+the results as JSON; --compare checks them against an earlier run.
+
+Usage (from the repository root):
+    python -m benchmarks.harness --sizes 1000,100000,1000000 --workers 2
+    python -m benchmarks.harness --output_json after.json --compare before.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import http.server
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from db import TEAM_QUERIES
+from sqllite import create_database
+from synthetic_data import write_player_data
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Reply of the OpenAI stand-in, sent whole or in one chunk per word
+MOCK_REPORT = (
+    "Duelist: entry fragger. Controller: smokes and pacing. Initiator: "
+    "information and flashes. Sentinel: flank watch. IGL: the controller."
+)
+
+# Relative change of a metric reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.1
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark team generation end to end under concurrent load."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default="1000,100000,1000000",
+        help="Comma-separated players table sizes to benchmark.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=2, help="Gunicorn worker processes."
+    )
+    parser.add_argument(
+        "--threads", type=int, default=8, help="Threads per gunicorn worker."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Clients sending requests at the same time.",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=120,
+        help="Requests per table size, spread over the team types.",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Unmeasured requests per team type before measuring.",
+    )
+    parser.add_argument(
+        "--llm_latency",
+        type=float,
+        default=0.2,
+        help="Seconds the OpenAI stand-in waits before replying.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("fast", "full"),
+        default="full",
+        help="Generation mode; fast skips the OpenAI call.",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep the response cache on; by default every request generates.",
+    )
+    parser.add_argument(
+        "--data_dir",
+        type=str,
+        default=None,
+        help="Directory keeping the generated databases between runs.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed.")
+    parser.add_argument(
+        "--output_json",
+        type=str,
+        default=None,
+        help="Optional path to write the results as JSON.",
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="Results JSON of an earlier run to compare against.",
+    )
+    return parser.parse_args()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockOpenAIHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers POST /v1/chat/completions like the ChatCompletion API, after
+    the server's latency, with or without streaming.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+        prompt_tokens = sum(
+            len(message["content"].split()) for message in body["messages"]
+        )
+        if not body.get("stream"):
+            self._send(
+                "application/json",
+                json.dumps(
+                    {
+                        "id": "chatcmpl-benchmark",
+                        "object": "chat.completion",
+                        "model": body.get("model"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {
+                                    "role": "assistant",
+                                    "content": MOCK_REPORT,
+                                },
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": len(MOCK_REPORT.split()),
+                            "total_tokens": prompt_tokens + len(MOCK_REPORT.split()),
+                        },
+                    }
+                ),
+            )
+            return
+
+        events = [
+            {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": word + " "}}],
+            }
+            for word in MOCK_REPORT.split()
+        ]
+        self._send(
+            "text/event-stream",
+            "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+            + "data: [DONE]\n\n",
+        )
+
+    def _send(self, content_type, text):
+        data = text.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def mock_openai(latency):
+    """
+    Runs the OpenAI stand-in on a free local port.
+
+    Args:
+        latency (float): Seconds to wait before every reply.
+
+    Yields:
+        str: The API base URL to set as OPENAI_API_BASE.
+    """
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def build_database(directory, size, seed):
+    """
+    Generates and loads a players table, reusing it when it already exists.
+
+    Returns:
+        str: Path of the database file.
+    """
+    db_file = os.path.join(directory, f"players_{size}_{seed}.db")
+    if os.path.exists(db_file):
+        return db_file
+    csv_file = os.path.join(directory, f"players_{size}_{seed}.csv")
+    write_player_data(csv_file, size, chunk_size=min(size, 100000), seed=seed)
+    # create_database reports its progress on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        create_database(csv_file, db_file + ".tmp")
+    os.replace(db_file + ".tmp", db_file)
+    os.remove(csv_file)
+    return db_file
+
+
+def _rss_bytes(pid):
+    """
+    Resident set size of a process and of its children, from /proc.
+    """
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pids += [int(child) for child in f.read().split()]
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+class RssSampler(threading.Thread):
+    """
+    Samples the RSS of a process tree until stopped, keeping the peak.
+    """
+
+    def __init__(self, pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, _rss_bytes(self.pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+@contextlib.contextmanager
+def gunicorn_server(db_file, api_base, workers, threads, cache):
+    """
+    Starts the app under gunicorn in a scratch directory holding the database.
+
+    Yields:
+        tuple: (base URL of the app, gunicorn master process).
+    """
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        os.symlink(db_file, os.path.join(directory, "valorant_players.db"))
+        env = dict(
+            os.environ,
+            PYTHONPATH=REPOSITORY + os.pathsep + os.environ.get("PYTHONPATH", ""),
+            OPENAI_API_BASE=api_base,
+            OPENAI_API_KEY="benchmark",
+            JOBS_DATABASE=os.path.join(directory, "jobs.db"),
+            LOG_SAMPLE_RATE="0",
+            LOG_LEVEL="WARNING",
+        )
+        if not cache:
+            env["TEAM_CACHE_TTL"] = "-1"
+            env.pop("TEAM_CACHE_DB", None)
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "--config",
+                os.path.join(REPOSITORY, "gunicorn.conf.py"),
+                "--bind",
+                f"127.0.0.1:{port}",
+                "--workers",
+                str(workers),
+                "--threads",
+                str(threads),
+                "--timeout",
+                "300",
+                "app:app",
+            ],
+            cwd=directory,
+            env=env,
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + 60
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError("gunicorn exited during startup")
+                try:
+                    urllib.request.urlopen(url + "/cache/stats", timeout=1).close()
+                    break
+                except (urllib.error.URLError, OSError):
+                    if time.monotonic() > deadline:
+                        raise RuntimeError("gunicorn did not start within 60s")
+                    time.sleep(0.2)
+            yield url, process
+        finally:
+            process.terminate()
+            process.wait(30)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def post_index(url, team_type, mode):
+    """
+    Sends one team generation request like the index form does.
+
+    Returns:
+        tuple: (latency in seconds, True if a report page was returned).
+    """
+    data = urllib.parse.urlencode({"team_type": team_type, "mode": mode}).encode()
+    start = time.perf_counter()
+    try:
+        with _opener.open(url + "/", data=data, timeout=300) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, OSError):
+        # Failures redirect back to the form with a flashed message
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def summarise(latencies):
+    """
+    Returns p50/p95/p99 and mean of latencies in milliseconds.
+    """
+    if not latencies:
+        return {}
+    if len(latencies) == 1:
+        cuts = latencies * 99
+    else:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+    }
+
+
+def run_load(url, team_types, requests, concurrency, mode, warmup):
+    """
+    Sends requests over the team types from concurrent clients.
+
+    Returns:
+        dict: Overall and per team type latencies, throughput and errors.
+    """
+    for team_type in team_types:
+        for _ in range(warmup):
+            post_index(url, team_type, mode)
+
+    plan = [team_types[i % len(team_types)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(
+            executor.map(lambda team_type: post_index(url, team_type, mode), plan)
+        )
+    elapsed = time.perf_counter() - start
+
+    per_type = {}
+    for team_type, (latency, ok) in zip(plan, results):
+        entry = per_type.setdefault(team_type, {"latencies": [], "errors": 0})
+        entry["latencies"].append(latency)
+        entry["errors"] += not ok
+    return {
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "errors": sum(entry["errors"] for entry in per_type.values()),
+        **summarise([latency for latency, _ in results]),
+        "team_types": {
+            team_type: {"errors": entry["errors"], **summarise(entry["latencies"])}
+            for team_type, entry in per_type.items()
+        },
+    }
+
+
+def git_commit():
+    """
+    Returns the commit of the working tree, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPOSITORY,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    Compares p95 latency and throughput per table size with a baseline run.
+
+    Returns:
+        list of str: Descriptions of the regressions beyond REGRESSION_THRESHOLD.
+    """
+    before = {entry["size"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results["results"]:
+        old = before.get(entry["size"])
+        if old is None:
+            continue
+        p95 = entry["p95_ms"] / max(old["p95_ms"], 1e-9) - 1
+        throughput = entry["throughput_rps"] / max(old["throughput_rps"], 1e-9) - 1
+        rss = entry["peak_rss_mb"] / max(old["peak_rss_mb"], 1e-9) - 1
+        logging.info(
+            f"{entry['size']:>8} rows: p95 {p95:+.1%}, throughput "
+            f"{throughput:+.1%}, peak RSS {rss:+.1%} vs {baseline.get('commit')}"
+        )
+        if p95 > REGRESSION_THRESHOLD:
+            regressions.append(f"{entry['size']} rows: p95 latency {p95:+.1%}")
+        if throughput < -REGRESSION_THRESHOLD:
+            regressions.append(f"{entry['size']} rows: throughput {throughput:+.1%}")
+        if rss > REGRESSION_THRESHOLD:
+            regressions.append(f"{entry['size']} rows: peak RSS {rss:+.1%}")
+    return regressions
+
+
+def main():
+    args = parse_arguments()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    team_types = list(TEAM_QUERIES)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output_json", "compare", "data_dir")
+        },
+        "results": [],
+    }
+    with contextlib.ExitStack() as stack:
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(data_dir, exist_ok=True)
+        api_base = stack.enter_context(mock_openai(args.llm_latency))
+        for size in sizes:
+            logging.info(f"Preparing {size} rows...")
+            db_file = build_database(data_dir, size, args.seed)
+            with gunicorn_server(
+                db_file, api_base, args.workers, args.threads, args.cache
+            ) as (url, process):
+                sampler = RssSampler(process.pid)
+                sampler.start()
+                try:
+                    load = run_load(
+                        url,
+                        team_types,
+                        args.requests,
+                        args.concurrency,
+                        args.mode,
+                        args.warmup,
+                    )
+                finally:
+                    peak = sampler.stop()
+            entry = {"size": size, "peak_rss_mb": round(peak / 2**20, 1), **load}
+            results["results"].append(entry)
+            logging.info(
+                f"{size:>8} rows: p50 {entry['p50_ms']} ms, p95 {entry['p95_ms']} ms, "
+                f"p99 {entry['p99_ms']} ms, {entry['throughput_rps']} req/s, "
+                f"{entry['errors']} errors, peak RSS {entry['peak_rss_mb']} MB"
+            )
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Results written to {args.output_json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            logging.warning(f"Regressions: {'; '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
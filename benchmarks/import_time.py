@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the modules a gunicorn worker or a CLI loads.
+
+Imports each module in a fresh interpreter with -X importtime, takes the
+median cumulative time over several runs, lists the slowest imports and
+exits with status 1 when a module is over its budget, so CI can keep the
+cold start from creeping up.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget app=300 --repeat 7
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time allowed per module, in milliseconds
+DEFAULT_BUDGETS = {
+    "app": 500,
+    "batch": 550,
+    "similarity": 200,
+    "pareto": 200,
+    "synthetic_data": 150,
+}
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Check the import time of the entry-point modules."
+    )
+    parser.add_argument(
+        "--budget",
+        action="append",
+        default=None,
+        help="module=milliseconds; may be given several times. Replaces the "
+        "default budgets.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs per module; the median counts."
+    )
+    parser.add_argument(
+        "--top", type=int, default=5, help="Slowest imports listed per module."
+    )
+    parser.add_argument(
+        "--output_json",
+        type=str,
+        default=None,
+        help="Optional path to write the results as JSON.",
+    )
+    return parser.parse_args()
+
+
+def parse_importtime(text):
+    """
+    Parses the -X importtime report.
+
+    Args:
+        text (str): Standard error of the interpreter.
+
+    Returns:
+        dict: Module -> (self, cumulative) time in microseconds.
+    """
+    times = {}
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def measure(module):
+    """
+    Imports a module in a fresh interpreter.
+
+    The interpreter runs in an empty directory, so modules that create
+    files on import (e.g. the jobs database of app) leave nothing behind.
+
+    Returns:
+        dict: Module -> (self, cumulative) time in microseconds.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    env = dict(
+        os.environ,
+        PYTHONPATH=REPOSITORY + os.pathsep + os.environ.get("PYTHONPATH", ""),
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=directory,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_importtime(result.stderr)
+
+
+def check(module, budget_ms, repeat, top):
+    """
+    Measures a module against its budget.
+
+    Returns:
+        dict: Median cumulative time, budget and slowest imports.
+    """
+    runs = [measure(module) for _ in range(repeat)]
+    total = statistics.median(run[module][1] for run in runs) / 1000
+    # The slowest imports of the median run, by cumulative time
+    median_run = min(runs, key=lambda run: abs(run[module][1] / 1000 - total))
+    slowest = sorted(
+        (
+            (name, cumulative / 1000)
+            for name, (_, cumulative) in median_run.items()
+            if name != module and "." not in name
+        ),
+        key=lambda item: -item[1],
+    )[:top]
+    return {
+        "module": module,
+        "median_ms": round(total, 1),
+        "budget_ms": budget_ms,
+        "ok": total <= budget_ms,
+        "slowest": [{"module": name, "ms": round(ms, 1)} for name, ms in slowest],
+    }
+
+
+def main():
+    args = parse_arguments()
+    budgets = DEFAULT_BUDGETS
+    if args.budget:
+        budgets = {}
+        for item in args.budget:
+            module, _, limit = item.partition("=")
+            budgets[module] = float(limit)
+
+    results = []
+    for module, budget in budgets.items():
+        try:
+            result = check(module, budget, args.repeat, args.top)
+        except RuntimeError as e:
+            logging.error(f"Importing {module} failed: {e}")
+            sys.exit(1)
+        results.append(result)
+        logging.info(
+            f"{module:>16}: {result['median_ms']:>7} ms (budget {budget} ms)"
+            f"{'' if result['ok'] else '  OVER BUDGET'}; slowest: "
+            + ", ".join(f"{item['module']} {item['ms']}" for item in result["slowest"])
+        )
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Results written to {args.output_json}")
+
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
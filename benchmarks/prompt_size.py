@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark comparing prompt size and latency across player data encodings.
+
+Usage (from the repository root):
+    python -m benchmarks.prompt_size --num_players 1000 --top_n_per_role 5
+    python -m benchmarks.prompt_size --live  # also time the OpenAI round trip
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+
+from prompt_encoding import estimate_tokens
+from synthetic_data import generate_player_data
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+TEAM_TYPE = "Professional Team Submission"
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare prompt encodings by size and latency."
+    )
+    parser.add_argument(
+        "--num_players",
+        type=int,
+        default=1000,
+        help="Number of synthetic players in the candidate pool.",
+    )
+    parser.add_argument(
+        "--top_n_per_role",
+        type=int,
+        default=5,
+        help="Players kept per role by the pre-ranked variants.",
+    )
+    parser.add_argument(
+        "--token_budget",
+        type=int,
+        default=4000,
+        help="Token budget of the budgeted variant.",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Send each prompt to OpenAI and time the full round trip.",
+    )
+    parser.add_argument(
+        "--output_json",
+        type=str,
+        default=None,
+        help="Optional path to write the results as JSON.",
+    )
+    return parser.parse_args()
+
+
+def run(players, variants, live=False):
+    """
+    Builds the prompt of every variant and measures it.
+
+    Args:
+        players (list of dict): Candidate players.
+        variants (dict): Variant name -> build_prompt keyword arguments.
+        live (bool): Also time request_analysis on each prompt.
+
+    Returns:
+        list of dict: One result per variant.
+    """
+    # Imported here so that --help works without the app's environment
+    from app import TeamGenerationError, build_prompt, request_analysis
+
+    results = []
+    for name, options in variants.items():
+        start = time.perf_counter()
+        prompt = build_prompt(TEAM_TYPE, "", players, **options)
+        build_seconds = time.perf_counter() - start
+
+        result = {
+            "variant": name,
+            "characters": len(prompt),
+            "estimated_tokens": estimate_tokens(prompt),
+            "build_ms": round(build_seconds * 1000, 2),
+        }
+        if live:
+            start = time.perf_counter()
+            try:
+                request_analysis(prompt)
+                result["end_to_end_s"] = round(
+                    build_seconds + time.perf_counter() - start, 3
+                )
+            except TeamGenerationError as e:
+                result["error"] = str(e)
+        results.append(result)
+    return results
+
+
+def main():
+    args = parse_arguments()
+
+    players = generate_player_data(args.num_players).to_dict("records")
+    variants = {
+        "verbose": {"encoding": "verbose"},
+        "csv": {"encoding": "csv"},
+        f"csv_top{args.top_n_per_role}": {
+            "encoding": "csv",
+            "top_n_per_role": args.top_n_per_role,
+        },
+        f"csv_budget{args.token_budget}": {
+            "encoding": "csv",
+            "token_budget": args.token_budget,
+        },
+    }
+    results = run(players, variants, live=args.live)
+
+    baseline = results[0]["estimated_tokens"]
+    for result in results:
+        logging.info(
+            f"{result['variant']:>16}: {result['characters']:>9} chars, "
+            f"{result['estimated_tokens']:>8} tokens "
+            f"({result['estimated_tokens'] / baseline:6.1%} of verbose), "
+            f"built in {result['build_ms']} ms"
+            + (
+                f", end-to-end {result['end_to_end_s']} s"
+                if "end_to_end_s" in result
+                else ""
+            )
+            + (f", error: {result['error']}" if "error" in result else "")
+        )
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(
+                {"num_players": args.num_players, "results": results}, f, indent=2
+            )
+        logging.info(f"Results written to {args.output_json}")
+
+
+if __name__ == "__main__":
+    main()
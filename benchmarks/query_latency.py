@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark of team query latency as the players table grows.
+
+Builds synthetic players tables of increasing size, times every team query
+before and after sqllite.migrate_schema, and checks with EXPLAIN QUERY PLAN
+that the filtered queries are served by an index.
+
+Usage (from the repository root):
+    python -m benchmarks.query_latency --sizes 10000,100000,1000000
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from db import TEAM_QUERIES, explain_query_plan, full_table_scans
+from sqllite import CREATE_TABLE_QUERY, migrate_schema
+from synthetic_data import generate_player_data
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+# Bounded lookups whose latency should not depend on the table size
+POINT_QUERIES = {
+    "org page": ("SELECT * FROM players WHERE org = ? LIMIT 100", ("Rising",)),
+    "agent on map": (
+        "SELECT * FROM players WHERE agent = ? AND map_id = ? LIMIT 100",
+        ("Jett", 3),
+    ),
+    "role page": (
+        "SELECT * FROM players_by_role WHERE role = ? LIMIT 100",
+        ("Duelist",),
+    ),
+}
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure team query latency against table size."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default="10000,100000,1000000",
+        help="Comma-separated table sizes to benchmark.",
+    )
+    parser.add_argument(
+        "--block_size",
+        type=int,
+        default=10000,
+        help="Synthetic players generated once and inserted repeatedly.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Runs per query; the median is reported.",
+    )
+    parser.add_argument(
+        "--output_json",
+        type=str,
+        default=None,
+        help="Optional path to write the results as JSON.",
+    )
+    return parser.parse_args()
+
+
+def fill_table(conn, block, size):
+    """
+    Inserts size rows by repeating a block of synthetic players.
+
+    Player names get a per-copy suffix so every row stays a distinct player.
+    """
+    columns = list(block.columns)
+    name_index = columns.index("player")
+    rows = [list(row) for row in block.itertuples(index=False)]
+    insert = (
+        f"INSERT INTO players ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    inserted = 0
+    copy = 0
+    while inserted < size:
+        chunk = rows[: size - inserted]
+        for row, original in zip(chunk, block["player"]):
+            row[name_index] = f"{original}{copy}"
+        conn.executemany(insert, chunk)
+        inserted += len(chunk)
+        copy += 1
+    conn.commit()
+
+
+def time_query(conn, sql, params, repeat):
+    """
+    Returns the median latency in milliseconds and the number of rows.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3), len(rows)
+
+
+def benchmark_size(block, size, repeat):
+    """
+    Builds a table of the given size and measures all queries on it.
+
+    Returns:
+        dict: Latencies before and after migration, plans and scan check.
+    """
+    queries = {**{name: query for name, query in TEAM_QUERIES.items()}, **POINT_QUERIES}
+    result = {"size": size, "queries": {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "players.db"))
+        conn.execute(CREATE_TABLE_QUERY)
+        fill_table(conn, block, size)
+
+        for name, (sql, params) in queries.items():
+            if "players_by_role" in sql:
+                continue
+            latency, rows = time_query(conn, sql, params, repeat)
+            result["queries"][name] = {"rows": rows, "before_ms": latency}
+
+        start = time.perf_counter()
+        migrate_schema(conn)
+        result["migration_s"] = round(time.perf_counter() - start, 3)
+
+        for name, (sql, params) in queries.items():
+            latency, rows = time_query(conn, sql, params, repeat)
+            entry = result["queries"].setdefault(name, {"rows": rows})
+            entry["after_ms"] = latency
+            entry["plan"] = explain_query_plan(conn, sql, params)
+
+        result["full_table_scans"] = sorted(full_table_scans(conn))
+        conn.close()
+    return result
+
+
+def main():
+    args = parse_arguments()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    block = generate_player_data(args.block_size)
+    results = []
+    for size in sizes:
+        logging.info(f"Benchmarking {size} rows...")
+        result = benchmark_size(block, size, args.repeat)
+        results.append(result)
+        for name, entry in result["queries"].items():
+            before = entry.get("before_ms")
+            logging.info(
+                f"{name:>34}: {entry['rows']:>8} rows, "
+                + (f"{before:>9} ms unindexed, " if before is not None else " " * 24)
+                + f"{entry['after_ms']:>9} ms indexed  [{'; '.join(entry['plan'])}]"
+            )
+        if result["full_table_scans"]:
+            logging.warning(
+                f"Filtered queries still scanning the table: {result['full_table_scans']}"
+            )
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Results written to {args.output_json}")
+
+
+if __name__ == "__main__":
+    main()
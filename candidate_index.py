@@ -0,0 +1,456 @@
+# candidate_index.py
+
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+from db import _in_clause, changed_player_ids, fetch_players_by_id
+from player_store import ROLES, SCORE_WEIGHTS, PlayerStore
+from roles import ROLE_CATEGORIES
+from team_optimizer import TEAM_SIZE, _resolve_constraints, optimize_team
+
+Candidate = namedtuple("Candidate", "rating id player")
+
+
+class _Group:
+    """
+    Rows of one (role, region, org, map_id), best rated first.
+
+    Ratings are stored negated so the arrays are in ascending order and
+    new rows are placed with a binary search.
+    """
+
+    def __init__(self, keys, ids, players):
+        self.keys = keys
+        self.ids = ids
+        self.players = players
+
+    def __len__(self):
+        return len(self.ids)
+
+    def insert(self, key, row_id, player):
+        position = np.searchsorted(self.keys, key, side="right")
+        self.keys = np.insert(self.keys, position, key)
+        self.ids = np.insert(self.ids, position, row_id)
+        self.players = np.insert(self.players, position, player)
+
+    def remove(self, row_id):
+        position = np.flatnonzero(self.ids == row_id)
+        self.keys = np.delete(self.keys, position)
+        self.ids = np.delete(self.ids, position)
+        self.players = np.delete(self.players, position)
+
+
+def _merge(groups):
+    """
+    Merges sorted groups lazily, like heapq.merge, keeping only the head
+    of each group in the heap.
+
+    Args:
+        groups (Iterable): (_Group, rating bonus) pairs.
+
+    Yields:
+        tuple: (negated rating, id, player code), best first.
+    """
+    heap = [
+        (group.keys.item(0) - bonus, number, 0, group, bonus)
+        for number, (group, bonus) in enumerate(groups)
+    ]
+    heapq.heapify(heap)
+    while heap:
+        key, number, position, group, bonus = heap[0]
+        yield key, group.ids.item(position), group.players.item(position)
+        position += 1
+        if position < len(group):
+            heapq.heapreplace(
+                heap,
+                (group.keys.item(position) - bonus, number, position, group, bonus),
+            )
+        else:
+            heapq.heappop(heap)
+
+
+class CandidateIndex:
+    """
+    Ranked lists of 'players' rows per (role, region, org, map_id).
+
+    Every row is rated once with the composite rating of player_store, and
+    the rows of each group are kept sorted by it. A query merges the few
+    groups it selects through a heap of their heads and stops after k players, so its
+    cost depends on the number of groups and k rather than the number of
+    rows. Changed rows are moved between groups with refresh or update.
+
+    An index covers the pool of one team submission type, given as its
+    filters, and stats are standardised with the means and deviations of
+    that pool, so ratings equal those optimize_store computes over the
+    same players. Incremental updates reuse the statistics of the last
+    rebuild, so ratings stay comparable until the next rebuild but drift
+    from a fresh optimize_store as the pool changes.
+    """
+
+    def __init__(self, weights=SCORE_WEIGHTS, filters=None):
+        """
+        Args:
+            weights (dict): Weight per stat column, as in SCORE_WEIGHTS.
+            filters (dict): "org" and/or "region" -> allowed values, as in
+                db.TEAM_FILTERS; rows outside them are not indexed. None
+                indexes the whole table.
+        """
+        self.weights = weights
+        self.filters = dict(filters or {})
+        self.version = None
+        self._mean = None
+        self._std = None
+        # role -> upper-case region -> (org, map_id) -> _Group
+        self._groups = {}
+        # id -> (role, region, org, map_id) of the row's group
+        self._locations = {}
+        self._player_codes = {}
+        self._player_names = []
+
+    @classmethod
+    def from_database(cls, conn, **options):
+        """
+        Builds the index from the whole 'players' table.
+
+        Args:
+            conn (sqlite3.Connection): Connection with sqlite3.Row rows.
+            **options: CandidateIndex options.
+
+        Returns:
+            CandidateIndex: The index, at the database's data version.
+        """
+        index = cls(**options)
+        index.rebuild(conn)
+        return index
+
+    def __len__(self):
+        return len(self._locations)
+
+    def orgs(self):
+        """
+        Returns the organizations that have rows in the index.
+        """
+        return sorted(
+            {
+                org
+                for by_region in self._groups.values()
+                for by_group in by_region.values()
+                for (org, _), group in by_group.items()
+                if len(group)
+            },
+            key=str,
+        )
+
+    def _player_code(self, name):
+        code = self._player_codes.get(name)
+        if code is None:
+            code = self._player_codes[name] = len(self._player_names)
+            self._player_names.append(name)
+        return code
+
+    def _in_pool(self, store):
+        """
+        Selects the rows of a store that belong to the index's pool.
+        """
+        return store.mask(**self.filters)
+
+    def _rate(self, store):
+        matrix = np.stack([store.column(column) for column in self.weights])
+        if self._mean is None:
+            self._mean = np.nanmean(matrix, axis=1, keepdims=True)
+            self._std = np.nanstd(matrix, axis=1, keepdims=True)
+            self._std[~(self._std > 0)] = 1.0
+        z = np.nan_to_num((matrix - self._mean) / self._std)
+        return np.asarray(list(self.weights.values()), dtype=np.float32) @ z
+
+    def _keys(self, store):
+        """
+        Returns the group of every row of a store as parallel lists.
+        """
+        roles = [ROLES[code] for code in store.role_codes]
+        regions = [
+            (store.categories["region"][code] or "UNKNOWN").upper()
+            for code in store.codes["region"]
+        ]
+        orgs = [store.categories["org"][code] for code in store.codes["org"]]
+        return roles, regions, orgs, store.map_ids.tolist()
+
+    def rebuild(self, conn):
+        """
+        Reloads every row of 'players' and recomputes the normalisation.
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        sql = "SELECT * FROM players"
+        if self.filters:
+            sql += " WHERE " + " AND ".join(
+                f"{column} IN ({_in_clause(values)})"
+                for column, values in self.filters.items()
+            )
+        params = [value for values in self.filters.values() for value in values]
+        rows = conn.execute(sql, params).fetchall()
+        self._mean = self._std = None
+        self._groups = {}
+        self._locations = {}
+        self._player_codes = {}
+        self._player_names = []
+        self.version = version
+        if not rows:
+            return
+
+        store = PlayerStore.from_rows(rows)
+        keys = -self._rate(store).astype(np.float64)
+        players = np.array(
+            [self._player_code(name) for name in store.column("player")],
+            dtype=np.int32,
+        )
+        groups = {}
+        for row, location in enumerate(zip(*self._keys(store))):
+            groups.setdefault(location, []).append(row)
+        for location, rows_of_group in groups.items():
+            rows_of_group = np.asarray(rows_of_group)
+            order = rows_of_group[np.argsort(keys[rows_of_group], kind="stable")]
+            role, region, org, map_id = location
+            self._groups.setdefault(role, {}).setdefault(region, {})[
+                (org, map_id)
+            ] = _Group(keys[order], store.ids[order], players[order])
+            self._locations.update(
+                zip(store.ids[order].tolist(), [location] * len(order))
+            )
+
+    def remove(self, ids):
+        """
+        Drops rows from the index; unknown ids are ignored.
+        """
+        for row_id in ids:
+            location = self._locations.pop(row_id, None)
+            if location is None:
+                continue
+            role, region, org, map_id = location
+            self._groups[role][region][(org, map_id)].remove(row_id)
+
+    def update(self, rows):
+        """
+        Adds rows to the index or moves changed rows to their new place.
+
+        Args:
+            rows (list of sqlite3.Row or dict): Full 'players' rows.
+        """
+        if not rows:
+            return
+        store = PlayerStore.from_rows(rows)
+        # Rows that left the pool are only removed
+        self.remove(store.ids.tolist())
+        store = store.select(self._in_pool(store))
+        if not len(store):
+            return
+        keys = -self._rate(store).astype(np.float64)
+        for row, location in enumerate(zip(*self._keys(store))):
+            role, region, org, map_id = location
+            group = (
+                self._groups.setdefault(role, {})
+                .setdefault(region, {})
+                .setdefault(
+                    (org, map_id),
+                    _Group(np.empty(0), np.empty(0, np.int64), np.empty(0, np.int32)),
+                )
+            )
+            row_id = int(store.ids[row])
+            group.insert(
+                keys[row],
+                row_id,
+                self._player_code(
+                    store.categories["player"][store.codes["player"][row]]
+                ),
+            )
+            self._locations[row_id] = location
+
+    def refresh(self, conn):
+        """
+        Brings the index up to the database's data version.
+
+        Rows logged in player_changes since the index's version are
+        reloaded one by one; when the log does not cover every version in
+        between, e.g. after a CSV load, the whole index is rebuilt.
+
+        Args:
+            conn (sqlite3.Connection): Connection with sqlite3.Row rows.
+
+        Returns:
+            int: Number of rows reloaded; None if the index was rebuilt.
+        """
+        version, ids = changed_player_ids(conn, self.version)
+        if ids is None:
+            self.rebuild(conn)
+            return None
+        rows = fetch_players_by_id(conn, ids)
+        # Rows that were deleted are no longer in the table
+        self.remove(ids)
+        self.update(rows)
+        self.version = version
+        return len(ids)
+
+    def _matching_groups(self, roles, regions, orgs, exclude_orgs, map_ids):
+        for role in roles:
+            by_region = self._groups.get(role, {})
+            for region in by_region if regions is None else regions:
+                for (org, map_id), group in by_region.get(region, {}).items():
+                    if orgs is not None and org not in orgs:
+                        continue
+                    if exclude_orgs and org in exclude_orgs:
+                        continue
+                    if map_ids is not None and map_id not in map_ids:
+                        continue
+                    if len(group):
+                        yield org, group
+
+    def candidates(
+        self,
+        roles=None,
+        regions=None,
+        orgs=None,
+        map_ids=None,
+        exclude_orgs=None,
+        org_bonus=None,
+    ):
+        """
+        Iterates over the selected rows, best rated first.
+
+        Args:
+            roles (Iterable of str): Roles to include; defaults to all.
+            regions (Iterable of str): Regions, ignoring case; defaults to all.
+            orgs (Iterable of str): Organizations; defaults to all.
+            map_ids (Iterable of int): Maps; defaults to all.
+            exclude_orgs (Iterable of str): Organizations to leave out.
+            org_bonus (dict): Organization -> amount added to the rating of
+                its players.
+
+        Returns:
+            Iterator of (negated rating, id, player code) tuples, merged
+            lazily from the matching groups.
+        """
+        org_bonus = org_bonus or {}
+        groups = self._matching_groups(
+            ROLES if roles is None else roles,
+            None if regions is None else {region.upper() for region in regions},
+            None if orgs is None else set(orgs),
+            set(exclude_orgs or ()),
+            None if map_ids is None else set(map_ids),
+        )
+        return _merge((group, org_bonus.get(org, 0.0)) for org, group in groups)
+
+    def top(self, k, **filters):
+        """
+        Returns the k best rated distinct players among the selected rows.
+
+        Each player is represented by their best row. For example, the two
+        best Duelists from Japan or LATAM are
+        index.top(2, roles=["Duelist"], regions=["Japan", "LATAM"]).
+
+        Args:
+            k (int): Number of players.
+            **filters: See candidates.
+
+        Returns:
+            list of Candidate: rating, row id and player name, best first.
+        """
+        found = []
+        seen = set()
+        for key, row_id, player in self.candidates(**filters):
+            if player in seen:
+                continue
+            seen.add(player)
+            found.append(Candidate(-key, row_id, self._player_names[player]))
+            if len(found) == k:
+                break
+        return found
+
+    def optimize(
+        self,
+        fetch_rows,
+        team_type=None,
+        filters=None,
+        team_size=TEAM_SIZE,
+        required_roles=None,
+        min_regions=0,
+        min_org_players=None,
+        min_role_players=None,
+        org_bonus=None,
+    ):
+        """
+        Selects the best roster, like team_optimizer.optimize_store.
+
+        The candidates optimize_store keeps after pruning, the best
+        team_size players of every role, region and quota organization,
+        are read from the groups directly, and only those rows are fetched
+        for the branch-and-bound search.
+
+        Args:
+            fetch_rows (callable): Takes a list of ids and returns their
+                'players' rows as dicts or sqlite3.Row.
+            team_type (str): Team submission type, used to look up its constraints.
+            filters (dict): "org" and/or "region" -> allowed values, as in
+                db.TEAM_FILTERS.
+            team_size (int): Number of players on the roster.
+            required_roles (iterable of str): Roles that must be covered.
+                Defaults to every role with a candidate.
+            min_regions (int): Minimum number of distinct regions on the roster.
+            min_org_players (dict): Minimum number of players per organization.
+            min_role_players (dict): Minimum number of players per role.
+            org_bonus (dict): Organization -> amount added to the rating of
+                its players.
+
+        Returns:
+            list of dict: The selected players with their "role" and "rating",
+            or None if no roster satisfies the constraints.
+        """
+        min_regions, quotas, role_quotas = _resolve_constraints(
+            team_type, min_regions, min_org_players, min_role_players
+        )
+        filters = filters or {}
+        orgs = filters.get("org")
+        regions = filters.get("region")
+        if regions is None:
+            regions = {
+                region for by_region in self._groups.values() for region in by_region
+            }
+        regions = sorted({region.upper() for region in regions})
+
+        # Each bucket is one pruning group of optimize_store
+        region_buckets = (
+            [[region] for region in regions] if min_regions > 0 else [regions]
+        )
+        org_buckets = [
+            ([org], None) for org in quotas if orgs is None or org in orgs
+        ] + [(orgs, quotas)]
+
+        survivors = {}
+        covered = set()
+        for role in ROLES:
+            for bucket_regions in region_buckets:
+                for bucket_orgs, excluded in org_buckets:
+                    for candidate in self.top(
+                        team_size,
+                        roles=[role],
+                        regions=bucket_regions,
+                        orgs=bucket_orgs,
+                        exclude_orgs=excluded,
+                        org_bonus=org_bonus,
+                    ):
+                        covered.add(role)
+                        survivors[candidate.id] = candidate.rating
+        if required_roles is None:
+            required_roles = [role for role in ROLE_CATEGORIES if role in covered]
+
+        rows = {row["id"]: dict(row) for row in fetch_rows(list(survivors))}
+        ids = [row_id for row_id in survivors if row_id in rows]
+        return optimize_team(
+            [rows[row_id] for row_id in ids],
+            team_size=team_size,
+            required_roles=required_roles,
+            min_regions=min_regions,
+            min_org_players=quotas,
+            min_role_players=role_quotas,
+            scores=[survivors[row_id] for row_id in ids],
+        )
@@ -0,0 +1,291 @@
+# db.py
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from metrics import span
+from submission_rules import RULES
+
+# Database configuration
+DATABASE = "valorant_players.db"
+
+
+def _in_clause(values):
+    return ", ".join("?" for _ in values)
+
+
+# Named, parameterised statement for each team submission type, compiled
+# from its rule (see submission_rules.py). The SQL text is constant per
+# type, so every pooled connection prepares it once and reuses it from its
+# statement cache afterwards.
+TEAM_QUERIES = {name: rule.query() for name, rule in RULES.items()}
+
+# The same selections as column -> allowed values, for in-memory indexes
+# such as candidate_index.CandidateIndex; no filter selects every player
+TEAM_FILTERS = {name: dict(rule.filters) for name, rule in RULES.items()}
+
+
+class ConnectionPool:
+    """
+    Per-process pool of read-only SQLite connections.
+
+    Connections are opened through a read-only URI with memory-mapped I/O
+    and a larger page cache, and handed out to one thread at a time. The
+    pool is rebuilt after a fork, so each gunicorn worker keeps its own.
+    """
+
+    def __init__(
+        self,
+        database=DATABASE,
+        size=8,
+        mmap_size=256 * 1024 * 1024,
+        cache_size_kib=64 * 1024,
+    ):
+        """
+        Args:
+            database (str): Path to the SQLite database file.
+            size (int): Maximum number of idle connections kept open.
+            mmap_size (int): Bytes of the file mapped into memory.
+            cache_size_kib (int): Page cache size per connection, in KiB.
+        """
+        self.database = database
+        self.size = size
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self._idle = queue.LifoQueue()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        path = os.path.abspath(self.database)
+        conn = sqlite3.connect(
+            f"file:{path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def _check_fork(self):
+        # Connections must not be shared with the parent process after a fork
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = queue.LifoQueue()
+                self._pid = os.getpid()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection for the duration of a with block.
+
+        Yields:
+            sqlite3.Connection: A read-only connection.
+        """
+        self._check_fork()
+        with span("db_connect"):
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+
+        broken = False
+        try:
+            yield conn
+        except sqlite3.Error:
+            # The connection may be unusable; do not hand it out again
+            broken = True
+            raise
+        finally:
+            # Also runs when the block fails otherwise or a generator holding
+            # the connection is closed early, so no connection leaks
+            self._release(conn, broken)
+
+    def _release(self, conn, broken):
+        if not broken and conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                broken = True
+        if not broken and self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        """
+        Closes every idle connection.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def query(self, sql, params=()):
+        """
+        Runs a statement on a pooled connection.
+
+        Args:
+            sql (str): SQL statement with '?' placeholders.
+            params (tuple): Statement parameters.
+
+        Returns:
+            list of sqlite3.Row: The fetched rows.
+        """
+        with self.connection() as conn, span("db_query"):
+            return conn.execute(sql, params).fetchall()
+
+    def data_version(self):
+        """
+        Reads the version stamp that sqllite.create_database bumps on every load.
+
+        Returns:
+            int: Current data version.
+        """
+        return self.query("PRAGMA user_version")[0][0]
+
+    def fetch_team_players(self, team_type):
+        """
+        Runs the named query of a team submission type.
+
+        Args:
+            team_type (str): Description of the team submission type.
+
+        Returns:
+            list of sqlite3.Row: The matching players.
+
+        Raises:
+            KeyError: If the team type has no query.
+        """
+        sql, params = TEAM_QUERIES[team_type]
+        return self.query(sql, params)
+
+    def fetch_snapshot(self, team_types):
+        """
+        Runs the queries of several team submission types in one read
+        transaction, so every result comes from the same version of the data.
+
+        Args:
+            team_types (Iterable of str): Team submission types with a query.
+
+        Returns:
+            tuple: The data version, and a dict of team type -> list of
+            sqlite3.Row.
+
+        Raises:
+            KeyError: If a team type has no query.
+        """
+        with self.connection() as conn, span("db_query"):
+            conn.execute("BEGIN")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                rows = {
+                    team_type: conn.execute(*TEAM_QUERIES[team_type]).fetchall()
+                    for team_type in team_types
+                }
+            finally:
+                conn.rollback()
+        return version, rows
+
+
+# Rows fetched per statement when reading rows by id
+FETCH_CHUNK = 500
+
+
+def changed_player_ids(conn, since):
+    """
+    Reads the ids of the 'players' rows changed after a data version, from
+    the player_changes log that sqllite.bump_data_version writes.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the players database.
+        since (int): Data version the caller is up to date with; None if
+            it has no data yet.
+
+    Returns:
+        tuple: The current data version, and the sorted changed ids; None
+        instead of the ids when the log does not cover every version since,
+        e.g. after a CSV load, and the caller must reload everything.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == since:
+        return version, []
+    changes = []
+    has_log = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'player_changes'"
+    ).fetchone()
+    if since is not None and version > since and has_log:
+        changes = conn.execute(
+            "SELECT version, player_id FROM player_changes "
+            "WHERE version > ? AND version <= ?",
+            (since, version),
+        ).fetchall()
+    logged = {row[0] for row in changes}
+    if not changes or logged != set(range(since + 1, version + 1)):
+        return version, None
+    return version, sorted({row[1] for row in changes})
+
+
+def fetch_players_by_id(conn, ids):
+    """
+    Reads 'players' rows by id; ids of deleted rows are skipped.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the players database.
+        ids (list of int): Row ids.
+
+    Returns:
+        list: The rows, in the connection's row type.
+    """
+    rows = []
+    for start in range(0, len(ids), FETCH_CHUNK):
+        chunk = ids[start : start + FETCH_CHUNK]
+        rows += conn.execute(
+            f"SELECT * FROM players WHERE id IN ({_in_clause(chunk)})", chunk
+        ).fetchall()
+    return rows
+
+
+def explain_query_plan(conn, sql, params=()):
+    """
+    Returns SQLite's query plan for a statement.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the players database.
+        sql (str): SQL statement with '?' placeholders.
+        params (tuple): Statement parameters.
+
+    Returns:
+        list of str: The detail line of each plan step.
+    """
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def full_table_scans(conn):
+    """
+    Finds team queries that filter 'players' but still scan the whole table.
+
+    Queries without a WHERE clause read every row by design and are skipped.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the players database.
+
+    Returns:
+        dict: Team type -> plan of each offending query; empty when every
+        filtered query is served by an index.
+    """
+    offenders = {}
+    for team_type, (sql, params) in TEAM_QUERIES.items():
+        if " WHERE " not in sql:
+            continue
+        plan = explain_query_plan(conn, sql, params)
+        if any(detail.startswith("SCAN") for detail in plan):
+            offenders[team_type] = plan
+    return offenders
@@ -0,0 +1,12 @@
+# gunicorn.conf.py
+#
+# Read by gunicorn from the working directory; command-line options such as
+# --workers in the Dockerfile still apply.
+
+
+def post_worker_init(worker):
+    # Compile templates and open connections once per worker, before the
+    # first request arrives
+    from app import warm_up
+
+    warm_up()
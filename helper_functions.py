@@ -1,10 +1,12 @@
 import requests
 import time
-import boto3
 import json
 from dotenv import load_dotenv
 import os
-import pandas as pd
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 
 load_dotenv()
 
@@ -13,38 +15,332 @@ load_dotenv()
 RIOT_API_KEY = os.environ.get("RIOT_API_KEY")
 HEADERS = {"X-Riot-Token": RIOT_API_KEY}
 
+# Base URL of the API; set RIOT_API_BASE to point at riot_stub.py offline
+RIOT_API_BASE = os.environ.get("RIOT_API_BASE", "https://{region}.api.riotgames.com")
 
-def get_puuid(game_name, tag_line, region="na1"):
-    url = f"https://{region}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        return response.json().get("puuid")
-    else:
-        print(f"Error fetching PUUID: {response.status_code} - {response.text}")
+# Limits of a development key, used until the API reports its own
+DEFAULT_RATE_LIMITS = "20:1,100:120"
+
+# Responses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_rate_limits(header):
+    """
+    Parses a rate-limit header such as "20:1,100:120".
+
+    Args:
+        header (str): Comma-separated count:seconds pairs.
+
+    Returns:
+        list of tuple: (count, seconds) of each window.
+    """
+    windows = []
+    for pair in header.split(","):
+        count, seconds = pair.strip().split(":")
+        windows.append((int(count), int(seconds)))
+    return windows
+
+
+class RateLimiter:
+    """
+    Token buckets shared by every request of a client, one per window.
+
+    A request takes one token from each bucket. Buckets refill continuously
+    at count/seconds tokens per second. The windows and the tokens already
+    used follow the X-App-Rate-Limit and X-App-Rate-Limit-Count headers of
+    each response, and a Retry-After pauses every request until it expires.
+    """
+
+    def __init__(self, limits=DEFAULT_RATE_LIMITS):
+        """
+        Args:
+            limits (str): Initial windows as in the X-App-Rate-Limit header.
+        """
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._limits = {}
+        self._paused_until = 0.0
+        self._set_windows(parse_rate_limits(limits))
+
+    def _set_windows(self, windows):
+        # Tokens carry over from a window that already existed
+        now = time.monotonic()
+        self._refill(now)
+        self._buckets = {
+            seconds: (
+                min(self._buckets.get(seconds, (float(count), now))[0], float(count)),
+                now,
+            )
+            for count, seconds in windows
+        }
+        self._limits = {seconds: count for count, seconds in windows}
+
+    def _refill(self, now):
+        for seconds, (tokens, updated) in self._buckets.items():
+            count = self._limits[seconds]
+            tokens = min(count, tokens + (now - updated) * count / seconds)
+            self._buckets[seconds] = (tokens, now)
+
+    def acquire(self):
+        """
+        Blocks until every bucket has a token, then takes one from each.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    missing = [
+                        (1 - tokens) * seconds / self._limits[seconds]
+                        for seconds, (tokens, _) in self._buckets.items()
+                        if tokens < 1
+                    ]
+                    if not missing:
+                        for seconds, (tokens, updated) in self._buckets.items():
+                            self._buckets[seconds] = (tokens - 1, updated)
+                        return
+                    wait = max(missing)
+            time.sleep(wait)
+
+    def update(self, headers):
+        """
+        Adjusts the buckets to the rate-limit headers of a response.
+
+        Args:
+            headers (Mapping): Response headers.
+        """
+        with self._lock:
+            if "X-App-Rate-Limit" in headers:
+                windows = parse_rate_limits(headers["X-App-Rate-Limit"])
+                if {seconds: count for count, seconds in windows} != self._limits:
+                    self._set_windows(windows)
+            if "X-App-Rate-Limit-Count" in headers:
+                # The server's count wins when it has seen more requests
+                now = time.monotonic()
+                self._refill(now)
+                for used, seconds in parse_rate_limits(
+                    headers["X-App-Rate-Limit-Count"]
+                ):
+                    if seconds in self._buckets:
+                        remaining = float(self._limits[seconds] - used)
+                        tokens, updated = self._buckets[seconds]
+                        self._buckets[seconds] = (min(tokens, remaining), updated)
+
+    def pause(self, seconds):
+        """
+        Holds back every request for the given number of seconds.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RiotClient:
+    """
+    Concurrent client of the Riot API.
+
+    Requests share one pooled HTTP session and one RateLimiter, run on a
+    bounded thread pool, and are retried with exponential backoff when they
+    are rate limited or fail transiently.
+    """
+
+    def __init__(
+        self,
+        api_key=RIOT_API_KEY,
+        base_url=RIOT_API_BASE,
+        max_workers=8,
+        max_retries=5,
+        backoff=0.5,
+        timeout=10,
+        limiter=None,
+    ):
+        """
+        Args:
+            api_key (str): Riot API key.
+            base_url (str): Base URL, with an optional {region} placeholder.
+            max_workers (int): Maximum concurrent requests.
+            max_retries (int): Retries of a request before giving up.
+            backoff (float): First retry delay in seconds; doubled each retry.
+            timeout (float): Timeout of each request in seconds.
+            limiter (RateLimiter): Limiter to share with other clients.
+        """
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = limiter or RateLimiter()
+        self.session = requests.Session()
+        self.session.headers["X-Riot-Token"] = api_key or ""
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=max_workers, pool_maxsize=max_workers
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, region, path, params=None):
+        """
+        Sends a GET request, waiting for the rate limiter and retrying.
+
+        Args:
+            region (str): Routing region, e.g. "na1" or "americas".
+            path (str): Path of the endpoint.
+            params (dict): Query parameters.
+
+        Returns:
+            dict: The decoded JSON body, or None if the request failed.
+        """
+        url = self.base_url.format(region=region) + path
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = str(e)
+                delay = self.backoff * 2**attempt
+            else:
+                self.limiter.update(response.headers)
+                if response.status_code == 200:
+                    return response.json()
+                error = f"{response.status_code} - {response.text}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                delay = self.backoff * 2**attempt
+                if "Retry-After" in response.headers:
+                    delay = float(response.headers["Retry-After"])
+                    self.limiter.pause(delay)
+            if attempt < self.max_retries:
+                # Jitter keeps workers from retrying in lockstep
+                time.sleep(delay * random.uniform(1, 1.25))
+        print(f"Error fetching {path}: {error}")
         return None
 
+    def get_puuid(self, game_name, tag_line, region="americas"):
+        data = self.get(
+            region,
+            f"/riot/account/v1/accounts/by-riot-id/{quote(game_name)}/{quote(tag_line)}",
+        )
+        return data.get("puuid") if data else None
+
+    def get_match_ids(self, puuid, region="americas", count=20):
+        data = self.get(
+            region,
+            f"/val/match/v1/matchlists/by-puuid/{puuid}",
+            params={"start": 0, "count": count},
+        )
+        if not data:
+            return []
+        # The match list API returns "history"; older responses used "matches"
+        if "history" in data:
+            return [entry["matchId"] for entry in data["history"]][:count]
+        return data.get("matches", [])[:count]
+
+    def get_match_details(self, match_id, region="americas"):
+        return self.get(region, f"/val/match/v1/matches/{match_id}")
+
+    def map(self, func, items):
+        """
+        Applies func to every item concurrently, keeping the input order.
+        """
+        return list(self.executor.map(func, items))
+
+    def fetch_matches(self, puuids, region="americas", count=20, known_ids=()):
+        """
+        Downloads the recent matches of many players.
+
+        Match lists are fetched concurrently and merged so that a match
+        played by several of the players is downloaded once.
+
+        Args:
+            puuids (list of str): Players to fetch matches for.
+            region (str): Routing region of the match API.
+            count (int): Recent matches per player.
+            known_ids (Iterable): Match ids already stored, which are skipped.
+
+        Returns:
+            dict: Match id -> match details, in first-seen order.
+        """
+        match_lists = self.map(
+            lambda puuid: self.get_match_ids(puuid, region, count), puuids
+        )
+        known = set(known_ids)
+        match_ids = [
+            match_id
+            for match_id in dict.fromkeys(
+                match_id for match_list in match_lists for match_id in match_list
+            )
+            if match_id not in known
+        ]
+        details = self.map(
+            lambda match_id: self.get_match_details(match_id, region), match_ids
+        )
+        return {
+            match_id: match
+            for match_id, match in zip(match_ids, details)
+            if match is not None
+        }
+
+    def fetch_players_matches(self, riot_ids, region="americas", count=20):
+        """
+        Resolves Riot ids and downloads their recent matches.
+
+        Args:
+            riot_ids (list of tuple): (game_name, tag_line) of each player.
+            region (str): Routing region of the account and match APIs.
+            count (int): Recent matches per player.
+
+        Returns:
+            dict: Match id -> match details.
+        """
+        puuids = self.map(
+            lambda riot_id: self.get_puuid(*riot_id, region=region), riot_ids
+        )
+        return self.fetch_matches(
+            [puuid for puuid in puuids if puuid], region=region, count=count
+        )
+
+
+_client = None
+
+
+def get_client():
+    """
+    Returns the client shared by the module-level helpers.
+    """
+    global _client
+    if _client is None:
+        _client = RiotClient()
+    return _client
+
+
+def get_puuid(game_name, tag_line, region="na1"):
+    return get_client().get_puuid(game_name, tag_line, region)
+
 
 def get_match_ids(puuid, region="americas", count=20):
-    url = f"https://{region}.api.riotgames.com/val/match/v1/matchlists/by-puuid/{puuid}/?start=0&count={count}"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        return response.json().get("matches")
-    else:
-        print(f"Error fetching match IDs: {response.status_code} - {response.text}")
-        return []
+    return get_client().get_match_ids(puuid, region, count)
 
 
 def get_match_details(match_id, region="americas"):
-    url = f"https://{region}.api.riotgames.com/val/match/v1/matches/{match_id}"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error fetching match details: {response.status_code} - {response.text}")
-        return None
+    return get_client().get_match_details(match_id, region)
 
 
 def upload_to_s3(file_name, data):
+    # boto3 is slow to import and only needed here
+    import boto3
+
     s3 = boto3.client("s3")
     bucket_name = "valorant-player-data"
     s3.put_object(Bucket=bucket_name, Key=file_name, Body=json.dumps(data))
@@ -0,0 +1,191 @@
+# jobs.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+FINISHED_STATES = (DONE, FAILED)
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity.
+    """
+
+
+class JobQueue:
+    """
+    Bounded background queue for team generation jobs.
+
+    Jobs run on a thread pool owned by the current process, while their
+    state lives in a SQLite table so that any gunicorn worker can report
+    on a job, whichever worker accepted it.
+    """
+
+    def __init__(self, db_path, max_workers=4, max_pending=32, retention=86400):
+        """
+        Args:
+            db_path (str): SQLite file holding the jobs table.
+            max_workers (int): Jobs run concurrently by this process.
+            max_pending (int): Queued plus running jobs accepted before
+                submissions are rejected with QueueFull.
+            retention (float): Seconds finished jobs are kept.
+        """
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    progress TEXT,
+                    request TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _pool(self):
+        # Threads do not survive a fork, so every worker process builds its own pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="team-job"
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, func, request, *args, **kwargs):
+        """
+        Queues a job.
+
+        Args:
+            func (callable): Called as func(*args, progress=callback, **kwargs)
+                and returns the job result as a string.
+            request (dict): Job parameters, stored for inspection.
+            *args, **kwargs: Passed on to func.
+
+        Returns:
+            str: The job id.
+
+        Raises:
+            QueueFull: If max_pending jobs are already queued or running.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull("Too many team generation jobs in progress.")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "DELETE FROM jobs WHERE updated < ? AND status IN (?, ?)",
+                    (now - self.retention,) + FINISHED_STATES,
+                )
+                conn.execute(
+                    "INSERT INTO jobs (id, status, progress, request, created, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, "Queued", json.dumps(request), now, now),
+                )
+            self._pool().submit(self._run, job_id, func, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        return job_id
+
+    def _update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                list(fields.values()) + [job_id],
+            )
+
+    def _run(self, job_id, func, args, kwargs):
+        try:
+            self._update(job_id, status=RUNNING, progress="Started")
+            result = func(
+                *args,
+                progress=lambda message: self._update(job_id, progress=message),
+                **kwargs,
+            )
+            self._update(job_id, status=DONE, progress="Done", result=result)
+        except Exception as e:
+            self._update(job_id, status=FAILED, progress="Failed", error=str(e))
+        finally:
+            self._slots.release()
+
+    def get(self, job_id):
+        """
+        Returns a job's state.
+
+        Args:
+            job_id (str): Id returned by submit.
+
+        Returns:
+            dict: The job row, or None if the id is unknown.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def events(self, job_id, interval=0.5, timeout=300):
+        """
+        Yields the job's state every time it changes, until it finishes.
+
+        Args:
+            job_id (str): Id returned by submit.
+            interval (float): Seconds between polls of the jobs table.
+            timeout (float): Seconds after which the stream gives up.
+
+        Yields:
+            dict: Job rows; the last one is in a finished state unless the
+            stream timed out or the job is unknown.
+        """
+        deadline = time.monotonic() + timeout
+        last = None
+        while time.monotonic() < deadline:
+            job = self.get(job_id)
+            if job is None:
+                return
+            state = (job["status"], job["progress"])
+            if state != last:
+                last = state
+                yield job
+            if job["status"] in FINISHED_STATES:
+                return
+            time.sleep(interval)
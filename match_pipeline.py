@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Pipeline flattening Riot match documents into per-round SQLite tables.
+
+Match files are parsed incrementally with ijson, one round at a time, so a
+document is never loaded whole and ingesting thousands of matches uses
+bounded memory. Every round becomes one row per player in
+'round_player_stats', the source of the aggregate player statistics.
+
+Usage:
+    python match_pipeline.py data/matches/game.json --db_file valorant_players.db
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+
+import ijson
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+PLAYERS_FILE = "data/matches/players.json"
+
+# Agent names by Riot character id
+AGENT_IDS = {
+    "add6443a-41bd-e414-f6ad-e58d267f4e95": "Jett",
+    "a3bfb853-43b2-7238-a4f1-ad90e9e46bcc": "Reyna",
+    "f94c3b30-42be-e959-889c-5aa313dba261": "Raze",
+    "eb93336a-449b-9c1b-0a54-a891f7921d69": "Phoenix",
+    "7f94d92c-4234-0a36-9646-3a87eb8b5c89": "Yoru",
+    "bb2a4828-46eb-8cd1-e765-15848195d751": "Neon",
+    "569fdd95-4d10-43ab-ca70-79becc718b46": "Sage",
+    "117ed9e3-49f3-6512-3ccf-0cada7e3823b": "Cypher",
+    "1e58de9c-4950-5125-93e9-a0aee9f98746": "Killjoy",
+    "22697a3d-45bf-8dd7-4fec-84a9e28c69d7": "Chamber",
+    "8e253930-4c05-31dd-1b6c-968525494517": "Omen",
+    "41fb69c1-4189-7b37-f117-bcaf1e96f1bf": "Astra",
+    "9f0d8ba9-4140-b941-57d3-a7ad57c6b417": "Brimstone",
+    "707eab51-4836-f488-046a-cda6bf494859": "Viper",
+    "320b2a48-4d9b-a075-30f1-1f93a9b638fa": "Sova",
+    "5f8d3a7f-467b-97f3-062c-13acf203c006": "Breach",
+    "6f2a04ca-43e0-be17-7f36-b3908627744d": "Skye",
+    "601dbbe7-43ce-be57-2a40-4abd24953621": "KAY/O",
+    "dade69b4-4f5a-8528-247b-219e5a1facd6": "Fade",
+}
+
+# Map names by the internal name in matchInfo.mapId
+MAP_NAMES = {
+    "Duality": "Bind",
+    "Triad": "Haven",
+    "Bonsai": "Split",
+    "Ascent": "Ascent",
+    "Port": "Icebox",
+    "Foxtrot": "Breeze",
+    "Canyon": "Fracture",
+}
+
+# Same numbering as synthetic_data.MAPS and the map_id column of 'players'
+MAP_IDS = {
+    name: index + 1
+    for index, name in enumerate(
+        ["Bind", "Haven", "Split", "Ascent", "Icebox", "Breeze", "Fracture"]
+    )
+}
+
+CREATE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS matches (
+        match_id TEXT PRIMARY KEY,
+        map_id INTEGER,
+        map_name TEXT,
+        game_start_millis INTEGER,
+        game_length_millis INTEGER,
+        queue_id TEXT,
+        season_id TEXT,
+        rounds INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS match_players (
+        match_id TEXT NOT NULL,
+        puuid TEXT NOT NULL,
+        game_name TEXT,
+        tag_line TEXT,
+        team_id TEXT,
+        agent TEXT,
+        competitive_tier TEXT,
+        PRIMARY KEY (match_id, puuid)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS round_player_stats (
+        match_id TEXT NOT NULL,
+        round_num INTEGER NOT NULL,
+        puuid TEXT NOT NULL,
+        kills INTEGER,
+        deaths INTEGER,
+        assists INTEGER,
+        first_kills INTEGER,
+        first_deaths INTEGER,
+        damage INTEGER,
+        headshots INTEGER,
+        bodyshots INTEGER,
+        legshots INTEGER,
+        score INTEGER,
+        loadout_value INTEGER,
+        spent INTEGER,
+        clutches_played INTEGER,
+        clutches_won INTEGER,
+        won INTEGER,
+        PRIMARY KEY (match_id, round_num, puuid)
+    ) WITHOUT ROWID
+    """,
+)
+
+ROUND_COLUMNS = (
+    "match_id",
+    "round_num",
+    "puuid",
+    "kills",
+    "deaths",
+    "assists",
+    "first_kills",
+    "first_deaths",
+    "damage",
+    "headshots",
+    "bodyshots",
+    "legshots",
+    "score",
+    "loadout_value",
+    "spent",
+    "clutches_played",
+    "clutches_won",
+    "won",
+)
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments containing the match files and output database.
+    """
+    parser = argparse.ArgumentParser(
+        description="Flatten Riot match documents into per-round tables."
+    )
+    parser.add_argument("match_files", nargs="+", help="Match JSON documents.")
+    parser.add_argument(
+        "--db_file",
+        type=str,
+        default="valorant_players.db",
+        help="Path to the SQLite database.",
+    )
+    parser.add_argument(
+        "--players_file",
+        type=str,
+        default=PLAYERS_FILE,
+        help="JSON list of puuid, gameName and tagLine.",
+    )
+    return parser.parse_args()
+
+
+def load_player_names(players_file=PLAYERS_FILE):
+    """
+    Reads the puuid -> (gameName, tagLine) mapping.
+
+    Args:
+        players_file (str): JSON list of accounts.
+
+    Returns:
+        dict: puuid -> (game_name, tag_line).
+    """
+    with open(players_file, "rb") as f:
+        return {
+            account["puuid"]: (account.get("gameName"), account.get("tagLine"))
+            for account in ijson.items(f, "item")
+        }
+
+
+def iter_match_sections(f):
+    """
+    Streams the sections of a match document.
+
+    Args:
+        f (file): Match document opened in binary mode.
+
+    Yields:
+        tuple: ("matchInfo", dict), ("players", dict) for each player and
+        ("roundResults", dict) for each round, in document order.
+    """
+    builder = None
+    for prefix, event, value in ijson.parse(f):
+        if builder is None:
+            if (prefix, event) in (
+                ("matchInfo", "start_map"),
+                ("players.item", "start_map"),
+                ("roundResults.item", "start_map"),
+            ):
+                section = prefix.split(".")[0]
+                builder = ijson.ObjectBuilder()
+                depth = 0
+            else:
+                continue
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                yield section, builder.value
+                builder = None
+
+
+def iter_document_sections(document):
+    """
+    Yields the sections of an already decoded match document, such as those
+    returned by helper_functions.RiotClient, in the order of
+    iter_match_sections.
+    """
+    yield "matchInfo", document["matchInfo"]
+    for player in document["players"]:
+        yield "players", player
+    for round_result in document["roundResults"]:
+        yield "roundResults", round_result
+
+
+def flatten_round(match_id, round_result, teams):
+    """
+    Flattens one round into a row per player.
+
+    Args:
+        match_id (str): Id of the match.
+        round_result (dict): Entry of roundResults.
+        teams (dict): puuid -> team id of every player of the match.
+
+    Returns:
+        list of tuple: Rows of round_player_stats, in ROUND_COLUMNS order.
+    """
+    stats = round_result.get("playerStats") or []
+    winning_team = (round_result.get("winningTeam") or "").upper()
+    events = sorted(
+        (kill for player in stats for kill in player.get("kills") or []),
+        key=lambda kill: kill.get("timeSinceRoundStartMillis", 0),
+    )
+
+    deaths = {}
+    assists = {}
+    for kill in events:
+        deaths[kill["victim"]] = deaths.get(kill["victim"], 0) + 1
+        for assistant in kill.get("assistants") or []:
+            assists[assistant] = assists.get(assistant, 0) + 1
+    first_killer = events[0]["killer"] if events else None
+    first_victim = events[0]["victim"] if events else None
+
+    # A player is in a clutch once they are the last alive of their team
+    alive = {}
+    for player in stats:
+        alive.setdefault(teams.get(player["puuid"]), set()).add(player["puuid"])
+    clutches = set()
+    for kill in events:
+        for members in alive.values():
+            members.discard(kill["victim"])
+        for team, members in alive.items():
+            if len(members) == 1 and any(
+                others for other, others in alive.items() if other != team
+            ):
+                clutches.update(members)
+
+    rows = []
+    for player in stats:
+        puuid = player["puuid"]
+        damage = player.get("damage") or []
+        economy = player.get("economy") or {}
+        won = int(teams.get(puuid) == winning_team)
+        clutch = int(puuid in clutches)
+        rows.append(
+            (
+                match_id,
+                round_result["roundNum"],
+                puuid,
+                len(player.get("kills") or []),
+                deaths.get(puuid, 0),
+                assists.get(puuid, 0),
+                int(puuid == first_killer),
+                int(puuid == first_victim),
+                sum(hit.get("damage", 0) for hit in damage),
+                sum(hit.get("headshots", 0) for hit in damage),
+                sum(hit.get("bodyshots", 0) for hit in damage),
+                sum(hit.get("legshots", 0) for hit in damage),
+                player.get("score", 0),
+                economy.get("loadoutValue"),
+                economy.get("spent"),
+                clutch,
+                clutch * won,
+                won,
+            )
+        )
+    return rows
+
+
+def ingest_match(conn, sections, names=None):
+    """
+    Writes one match to the per-round tables.
+
+    Rounds are flattened and inserted as they are parsed. A match that is
+    already stored is skipped, so files can be ingested again safely.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+        sections (Iterable): Output of iter_match_sections or
+            iter_document_sections.
+        names (dict): puuid -> (game_name, tag_line), from load_player_names.
+
+    Returns:
+        int: Number of rounds written; 0 if the match was already stored.
+    """
+    names = names or {}
+    match_id = None
+    teams = {}
+    rounds = 0
+    insert_round = (
+        f"INSERT OR IGNORE INTO round_player_stats ({', '.join(ROUND_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in ROUND_COLUMNS)})"
+    )
+    for section, value in sections:
+        if section != "matchInfo" and match_id is None:
+            raise ValueError("matchInfo must precede players and rounds")
+        if section == "matchInfo":
+            match_id = value["matchId"]
+            if conn.execute(
+                "SELECT 1 FROM matches WHERE match_id = ?", (match_id,)
+            ).fetchone():
+                return 0
+            map_name = MAP_NAMES.get(value.get("mapId", "").rsplit("/", 1)[-1])
+            conn.execute(
+                "INSERT INTO matches (match_id, map_id, map_name, game_start_millis,"
+                " game_length_millis, queue_id, season_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    match_id,
+                    MAP_IDS.get(map_name),
+                    map_name,
+                    value.get("gameStartMillis"),
+                    value.get("gameLengthMillis"),
+                    value.get("queueId"),
+                    value.get("seasonId"),
+                ),
+            )
+        elif section == "players":
+            teams[value["puuid"]] = (value.get("teamId") or "").upper()
+            game_name, tag_line = names.get(value["puuid"], (None, None))
+            conn.execute(
+                "INSERT OR IGNORE INTO match_players VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    match_id,
+                    value["puuid"],
+                    game_name,
+                    tag_line,
+                    teams[value["puuid"]],
+                    AGENT_IDS.get(value.get("characterId"), "Unknown"),
+                    value.get("competitiveTier"),
+                ),
+            )
+        elif section == "roundResults":
+            conn.executemany(insert_round, flatten_round(match_id, value, teams))
+            rounds += 1
+    conn.execute("UPDATE matches SET rounds = ? WHERE match_id = ?", (rounds, match_id))
+    return rounds
+
+
+def create_tables(conn):
+    """
+    Creates the per-round tables if they do not exist.
+    """
+    for statement in CREATE_TABLES:
+        conn.execute(statement)
+    conn.commit()
+
+
+def ingest_files(db_file, match_files, players_file=PLAYERS_FILE):
+    """
+    Ingests match documents from files, committing after each match.
+
+    Args:
+        db_file (str): Path to the SQLite database.
+        match_files (list of str): Paths of match JSON documents.
+        players_file (str): JSON list of accounts used to name players.
+
+    Returns:
+        int: Number of matches written.
+    """
+    names = load_player_names(players_file)
+    conn = sqlite3.connect(db_file)
+    create_tables(conn)
+    written = 0
+    try:
+        for path in match_files:
+            with open(path, "rb") as f:
+                rounds = ingest_match(conn, iter_match_sections(f), names)
+            conn.commit()
+            if rounds:
+                written += 1
+                logging.info(f"Ingested {rounds} rounds from {path}.")
+            else:
+                logging.info(f"Skipped {path}: match already ingested.")
+    finally:
+        conn.close()
+    return written
+
+
+def main():
+    args = parse_arguments()
+    try:
+        written = ingest_files(args.db_file, args.match_files, args.players_file)
+    except (OSError, ValueError, KeyError, ijson.JSONError, sqlite3.Error) as e:
+        logging.error(f"Error ingesting matches: {e}")
+        sys.exit(1)
+    logging.info(f"Ingested {written} new matches into {args.db_file}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# metrics.py
+
+import bisect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# Upper bounds of the size buckets, for characters and tokens
+SIZE_BUCKETS = tuple(2**power for power in range(6, 21))
+
+# Share of requests whose structured log line is written; requests slower
+# than LOG_SLOW_SECONDS are always logged
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+LOG_SLOW_SECONDS = float(os.getenv("LOG_SLOW_SECONDS", "5"))
+
+request_logger = logging.getLogger("valorant.requests")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    text = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in pairs
+    )
+    return "{" + text + "}"
+
+
+class Counter:
+    """
+    Monotonic count per label values.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, description, labels=()):
+        """
+        Args:
+            name (str): Metric name.
+            description (str): Help text.
+            labels (tuple of str): Label names.
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        """
+        Yields:
+            tuple: (name suffix, label text, value) per exposed sample.
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield "", _format_labels(self.labels, key), value
+
+
+class Histogram:
+    """
+    Bucketed distribution of observed values per label values.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, description, buckets=LATENCY_BUCKETS, labels=()):
+        """
+        Args:
+            name (str): Metric name.
+            description (str): Help text.
+            buckets (tuple of float): Ascending bucket upper bounds.
+            labels (tuple of str): Label names.
+        """
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][position] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                yield "_bucket", _format_labels(
+                    self.labels, key, [("le", bound)]
+                ), cumulative
+            yield "_sum", _format_labels(self.labels, key), total
+            yield "_count", _format_labels(self.labels, key), count
+
+
+class Registry:
+    """
+    The metrics of this process, rendered in the Prometheus text format.
+
+    Every gunicorn worker keeps its own registry, so /metrics reports the
+    worker that served the scrape.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, description, labels=()):
+        """
+        Returns the counter of a name, creating it on first use.
+        """
+        return self._register(Counter, name, description, labels)
+
+    def histogram(self, name, description, buckets=LATENCY_BUCKETS, labels=()):
+        """
+        Returns the histogram of a name, creating it on first use.
+        """
+        return self._register(Histogram, name, description, buckets, labels)
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+SPAN_SECONDS = REGISTRY.histogram(
+    "valorant_span_seconds",
+    "Time spent in each step of the request pipeline.",
+    labels=("span",),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "valorant_request_seconds",
+    "Time to serve a request, excluding streamed bodies.",
+    labels=("endpoint", "status"),
+)
+PROMPT_CHARS = REGISTRY.histogram(
+    "valorant_prompt_chars", "Characters in prompts sent to OpenAI.", SIZE_BUCKETS
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "valorant_prompt_estimated_tokens",
+    "Estimated tokens in prompts sent to OpenAI (prompt_encoding.estimate_tokens).",
+    SIZE_BUCKETS,
+)
+LLM_TOKENS = REGISTRY.histogram(
+    "valorant_llm_tokens",
+    "Tokens per OpenAI call as reported by the API.",
+    SIZE_BUCKETS,
+    labels=("kind",),
+)
+LLM_ERRORS = REGISTRY.counter(
+    "valorant_llm_errors_total", "OpenAI calls that raised an error.", labels=("call",)
+)
+
+# Spans of the request the current thread is serving
+_trace = threading.local()
+
+
+@contextmanager
+def span(name):
+    """
+    Times a block into SPAN_SECONDS and into the current request's trace.
+
+    Args:
+        name (str): Step name, e.g. "db_query" or "llm".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name)
+        spans = getattr(_trace, "spans", None)
+        if spans is not None:
+            spans[name] = spans.get(name, 0.0) + elapsed
+
+
+def start_trace(**fields):
+    """
+    Starts collecting the spans of a request on this thread.
+
+    Args:
+        **fields: Values added to the request's log line.
+    """
+    _trace.spans = {}
+    _trace.fields = dict(fields)
+    _trace.start = time.perf_counter()
+
+
+def annotate(**fields):
+    """
+    Adds values to the log line of the request this thread is serving.
+    """
+    fields_of_trace = getattr(_trace, "fields", None)
+    if fields_of_trace is not None:
+        fields_of_trace.update(fields)
+
+
+def finish_trace(endpoint, status):
+    """
+    Ends the current trace: records the request duration and writes its
+    JSON log line when the request is sampled or slow.
+
+    Args:
+        endpoint (str): Name of the endpoint.
+        status (int): HTTP status code.
+
+    Returns:
+        float: The request duration in seconds; None without a trace.
+    """
+    spans = getattr(_trace, "spans", None)
+    if spans is None:
+        return None
+    elapsed = time.perf_counter() - _trace.start
+    _trace.spans = None
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, status=status)
+    if elapsed >= LOG_SLOW_SECONDS or random.random() < LOG_SAMPLE_RATE:
+        log_event(
+            "request",
+            endpoint=endpoint,
+            status=status,
+            seconds=round(elapsed, 4),
+            spans={name: round(value, 4) for name, value in spans.items()},
+            **_trace.fields,
+        )
+    return elapsed
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """
+    Writes one JSON log line.
+
+    Args:
+        event (str): Event name.
+        level (int): Logging level.
+        **fields: JSON-serialisable values.
+    """
+    if request_logger.isEnabledFor(level):
+        request_logger.log(level, json.dumps({"event": event, **fields}, default=str))
@@ -0,0 +1,741 @@
+#!/usr/bin/env python3
+"""
+Multi-objective roster search returning the Pareto front of 5-player rosters.
+
+Rosters are scored on mean ACS, summed first-kill differential (FK - FD),
+role balance (distinct roles covered, see synergy.role_coverage), region
+diversity (distinct regions) and, given a synergy.SynergyModel, the
+synergy of the agent composition. An evolutionary search (non-dominated sorting with crowding
+distance, as in NSGA-II) runs one island per CPU core in a long-lived pool
+of worker processes; every island keeps an archive of the non-dominated rosters it
+has seen, and the archives are merged into the front.
+
+The quotas of the team type (see team_optimizer.SUBMISSION_CONSTRAINTS)
+are hard constraints: rosters short of them rank behind every roster that
+meets them, are nudged towards them by a repair step, and never reach the
+front.
+
+Usage:
+    python pareto.py --team_type "Mixed-Gender Team Submission" --time_budget 0.5
+    python pareto.py --synergy
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from db import DATABASE, TEAM_QUERIES
+from player_store import ROLES, PlayerStore
+from synergy import (
+    NUM_MAPS,
+    ROLE_BITS,
+    SynergyModel,
+    agent_indices,
+    role_coverage,
+)
+from team_optimizer import TEAM_SIZE, _resolve_constraints
+
+# Objectives, all maximised; "synergy" follows when a model is given
+OBJECTIVES = ("mean_acs", "fk_fd", "role_balance", "region_diversity")
+
+
+def objective_names(synergy=None):
+    """
+    Names of the objective columns of a search.
+
+    Args:
+        synergy (SynergyModel): The search's synergy model, if any.
+
+    Returns:
+        tuple of str: The objective names.
+    """
+    return OBJECTIVES + ("synergy",) if synergy is not None else OBJECTIVES
+
+
+# Rows compared at once when pruning, bounding the dominance matrices
+PRUNE_CHUNK = 256
+
+# Island workers of this process. They are started by a fork server, a
+# single-threaded process that has imported this module, so no worker is
+# forked from a process whose other threads may hold locks (gunicorn's
+# threaded workers, the job queue, logging).
+_pool = None
+_pool_size = 0
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Search the Pareto front of rosters for a team type."
+    )
+    parser.add_argument(
+        "--team_type",
+        type=str,
+        default="Mixed-Gender Team Submission",
+        help="Team submission type whose players are searched.",
+    )
+    parser.add_argument(
+        "--db_file", type=str, default=DATABASE, help="Path to the SQLite database."
+    )
+    parser.add_argument(
+        "--time_budget",
+        type=float,
+        default=0.5,
+        help="Seconds the search may run, excluding loading the players.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Search islands run in parallel; defaults to the CPU count.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument(
+        "--synergy",
+        action="store_true",
+        help="Add the agent-composition synergy as an objective.",
+    )
+    return parser.parse_args()
+
+
+def _region_keys(store):
+    """
+    Region of every row as a code, ignoring case.
+    """
+    upper = {}
+    keys = np.array(
+        [
+            upper.setdefault(region.upper(), len(upper))
+            for region in store.categories["region"]
+        ],
+        dtype=np.int64,
+    )
+    return keys[store.codes["region"]]
+
+
+def _agent_keys(store):
+    """
+    Agent of every row as an index into synergy.AGENTS.
+    """
+    return agent_indices(store.categories["agent"])[store.codes["agent"]]
+
+
+def _map_keys(store):
+    """
+    Map of every row as a synergy table row; unknown maps are map 0.
+    """
+    map_ids = store.map_ids.astype(np.int64)
+    return np.where((map_ids > 0) & (map_ids < NUM_MAPS), map_ids, 0)
+
+
+class Candidates:
+    """
+    Per-row arrays the search works on, for the rows of a store worth
+    searching.
+    """
+
+    def __init__(
+        self,
+        store,
+        rows,
+        synergy=None,
+        min_regions=0,
+        min_org_players=None,
+        min_role_players=None,
+    ):
+        """
+        Args:
+            store (PlayerStore): Candidate players.
+            rows (np.ndarray): Row indices of the store to search.
+            synergy (SynergyModel): Scores the agent compositions; None
+                leaves synergy out of the objectives.
+            min_regions (int): Minimum number of distinct regions on a roster.
+            min_org_players (dict): Minimum number of players per organization.
+            min_role_players (dict): Minimum number of players per role.
+        """
+        self.rows = rows
+        self.synergy = synergy
+        self.acs = np.nan_to_num(store.stats["average_combat_score"][rows]).astype(
+            np.float64
+        )
+        self.fk_fd = np.nan_to_num(store.column("fk_fd")[rows]).astype(np.float64)
+        self.agents = _agent_keys(store)[rows]
+        self.map_ids = _map_keys(store)[rows]
+        self.regions = _region_keys(store)[rows]
+        self.players = store.codes["player"][rows].astype(np.int64)
+
+        # Quotas as (rows that count towards it, players needed)
+        self.min_regions = min_regions
+        orgs = store.column("org")[rows]
+        self.org_quotas = [
+            (orgs == org, quota) for org, quota in (min_org_players or {}).items()
+        ]
+        roles = store.role_codes[rows]
+        self.role_quotas = [
+            (roles == ROLES.index(role), quota)
+            for role, quota in (min_role_players or {}).items()
+        ]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def prune_candidates(store, team_size=TEAM_SIZE, by_agent=False, quota_orgs=()):
+    """
+    Drops rows that cannot improve any Pareto-optimal roster.
+
+    If team_size other players each have a row of the same roles, region
+    and quota organization that is at least as good on ACS and FK - FD, and
+    better on one of them, one of those rows can always replace this one
+    without making any objective worse or breaking a quota.
+
+    Args:
+        store (PlayerStore): Candidate players.
+        team_size (int): Number of players on a roster.
+        by_agent (bool): Only replace rows of the same agent and map, for
+            searches scoring agent synergy.
+        quota_orgs (Iterable of str): Organizations with a quota; their
+            rows are only replaced by rows of the same organization.
+
+    Returns:
+        np.ndarray: Row indices of the store worth searching.
+    """
+    acs = np.nan_to_num(store.stats["average_combat_score"])
+    fk_fd = np.nan_to_num(store.column("fk_fd"))
+    regions = _region_keys(store)
+    agents = _agent_keys(store)
+    # Agents that can fill the same roles are interchangeable for role balance
+    kinds = agents * NUM_MAPS + _map_keys(store) if by_agent else ROLE_BITS[agents]
+    group = kinds.astype(np.int64) * (regions.max(initial=0) + 1) + regions
+    quota_orgs = list(quota_orgs)
+    if quota_orgs:
+        org_keys = np.array(
+            [
+                quota_orgs.index(org) + 1 if org in quota_orgs else 0
+                for org in store.categories["org"]
+            ],
+            dtype=np.int64,
+        )
+        group = group * (len(quota_orgs) + 1) + org_keys[store.codes["org"]]
+    players = store.codes["player"]
+
+    kept = []
+    order = np.argsort(group, kind="stable")
+    starts = np.flatnonzero(np.diff(group[order], prepend=-1))
+    for rows in np.split(order, starts[1:]):
+        a, f, p = acs[rows], fk_fd[rows], players[rows]
+        for start in range(0, len(rows), PRUNE_CHUNK):
+            chunk = slice(start, start + PRUNE_CHUNK)
+            # better[i, j]: row j of the group dominates row i of the chunk
+            better = (
+                (a[None, :] >= a[chunk, None])
+                & (f[None, :] >= f[chunk, None])
+                & ((a[None, :] > a[chunk, None]) | (f[None, :] > f[chunk, None]))
+                & (p[None, :] != p[chunk, None])
+            )
+            keep = better.sum(axis=1) < team_size
+            # Rows of one player count once
+            for i in np.flatnonzero(~keep):
+                keep[i] = len(np.unique(p[better[i]])) < team_size
+            kept.append(rows[chunk][keep])
+    return np.sort(np.concatenate(kept)) if kept else np.empty(0, dtype=np.int64)
+
+
+def evaluate(candidates, rosters):
+    """
+    Scores rosters on every objective.
+
+    Args:
+        candidates (Candidates): The searched rows.
+        rosters (np.ndarray): (n, team_size) candidate indices.
+
+    Returns:
+        np.ndarray: (n, objectives) objective values, see objective_names.
+    """
+    agents = candidates.agents[rosters]
+    regions = np.sort(candidates.regions[rosters], axis=1)
+    columns = [
+        candidates.acs[rosters].mean(axis=1),
+        candidates.fk_fd[rosters].sum(axis=1),
+        role_coverage(agents),
+        1 + (np.diff(regions, axis=1) != 0).sum(axis=1),
+    ]
+    if candidates.synergy is not None:
+        columns.append(
+            candidates.synergy.score_many(agents, candidates.map_ids[rosters])
+        )
+    return np.column_stack(columns).astype(np.float64)
+
+
+def violations(candidates, rosters):
+    """
+    How far rosters are from meeting the quotas.
+
+    Counted like the deficit of team_optimizer.optimize_team: the most
+    players a roster is short of its regions, organization quotas or role
+    quotas.
+
+    Args:
+        candidates (Candidates): The searched rows.
+        rosters (np.ndarray): (n, team_size) candidate indices.
+
+    Returns:
+        np.ndarray: Players short per roster; 0 where every quota is met.
+    """
+    short = np.zeros(len(rosters), dtype=np.int64)
+    if candidates.min_regions:
+        regions = np.sort(candidates.regions[rosters], axis=1)
+        distinct = 1 + (np.diff(regions, axis=1) != 0).sum(axis=1)
+        short = np.maximum(short, candidates.min_regions - distinct)
+    for quotas in (candidates.org_quotas, candidates.role_quotas):
+        missing = np.zeros(len(rosters), dtype=np.int64)
+        for member, quota in quotas:
+            missing += np.maximum(0, quota - member[rosters].sum(axis=1))
+        short = np.maximum(short, missing)
+    return short
+
+
+def constrained_ranks(objectives, short):
+    """
+    Sorts rosters into fronts under constrained domination: rosters that
+    meet every quota come first, in their non-dominated fronts, then the
+    others from the least to the most short.
+
+    Args:
+        objectives (np.ndarray): (n, objectives) objective values.
+        short (np.ndarray): Players short of the quotas, see violations.
+
+    Returns:
+        np.ndarray: Front number of every roster, 0 being the best.
+    """
+    feasible = short == 0
+    ranks = np.zeros(len(objectives), dtype=np.int64)
+    ranks[feasible] = nondominated_ranks(objectives[feasible])
+    offset = ranks[feasible].max() + 1 if feasible.any() else 0
+    _, levels = np.unique(short[~feasible], return_inverse=True)
+    ranks[~feasible] = offset + levels
+    return ranks
+
+
+def _repair_quotas(candidates, rosters, rng):
+    """
+    Puts a random player of every organization or role a roster is short
+    of into one of its slots that does not count towards that quota.
+    """
+    for member, quota in candidates.org_quotas + candidates.role_quotas:
+        pool = np.flatnonzero(member)
+        if not len(pool):
+            continue
+        counted = member[rosters]
+        short = np.flatnonzero(counted.sum(axis=1) < quota)
+        if not len(short):
+            continue
+        slots = np.argmax(
+            rng.random((len(short), rosters.shape[1])) * ~counted[short], axis=1
+        )
+        rosters[short, slots] = rng.choice(pool, size=len(short))
+    return rosters
+
+
+def _repair(candidates, rosters, rng):
+    """
+    Replaces players that appear twice on a roster with random candidates.
+    """
+    for _ in range(100):
+        players = candidates.players[rosters]
+        order = np.argsort(players, axis=1)
+        sorted_players = np.take_along_axis(players, order, axis=1)
+        duplicate = np.zeros(rosters.shape, dtype=bool)
+        np.put_along_axis(
+            duplicate,
+            order[:, 1:],
+            sorted_players[:, 1:] == sorted_players[:, :-1],
+            axis=1,
+        )
+        if not duplicate.any():
+            break
+        rosters[duplicate] = rng.integers(len(candidates), size=duplicate.sum())
+    return rosters
+
+
+def nondominated_ranks(objectives):
+    """
+    Sorts points into successive non-dominated fronts.
+
+    Returns:
+        np.ndarray: Front number of every point, 0 being the Pareto front.
+    """
+    at_least = (objectives[:, None, :] >= objectives[None, :, :]).all(axis=2)
+    better = (objectives[:, None, :] > objectives[None, :, :]).any(axis=2)
+    dominates = at_least & better
+    ranks = np.full(len(objectives), -1)
+    remaining = np.ones(len(objectives), dtype=bool)
+    rank = 0
+    while remaining.any():
+        front = remaining & ~dominates[remaining].any(axis=0)
+        ranks[front] = rank
+        remaining &= ~front
+        rank += 1
+    return ranks
+
+
+def crowding_distance(objectives):
+    """
+    Distance of every point to its neighbours along each objective.
+    """
+    distance = np.zeros(len(objectives))
+    for column in objectives.T:
+        order = np.argsort(column, kind="stable")
+        spread = column[order[-1]] - column[order[0]]
+        distance[order[[0, -1]]] = np.inf
+        if spread > 0 and len(order) > 2:
+            distance[order[1:-1]] += (column[order[2:]] - column[order[:-2]]) / spread
+    return distance
+
+
+def _seed_rosters(candidates, rng, size, team_size):
+    """
+    Builds the first population: greedy rosters for each objective plus
+    random ones.
+    """
+    rankings = [
+        np.argsort(-candidates.acs, kind="stable")[: team_size * 4],
+        np.argsort(-candidates.fk_fd, kind="stable")[: team_size * 4],
+    ]
+    seeds = []
+    for ranked in rankings:
+        picked, seen = [], set()
+        for index in ranked:
+            if candidates.players[index] not in seen:
+                seen.add(candidates.players[index])
+                picked.append(index)
+            if len(picked) == team_size:
+                seeds.append(picked)
+                break
+    population = rng.integers(len(candidates), size=(size, team_size))
+    if seeds:
+        population[: len(seeds)] = seeds
+    population[len(seeds) :] = _repair_quotas(candidates, population[len(seeds) :], rng)
+    return _repair(candidates, population, rng)
+
+
+def _vary(candidates, population, ranks, crowding, rng):
+    """
+    Breeds offspring by tournament selection, crossover and mutation.
+    """
+    size, team_size = population.shape
+
+    def tournament():
+        a, b = rng.integers(size, size=(2, size))
+        a_wins = (ranks[a] < ranks[b]) | (
+            (ranks[a] == ranks[b]) & (crowding[a] >= crowding[b])
+        )
+        return np.where(a_wins, a, b)
+
+    mothers, fathers = population[tournament()], population[tournament()]
+    # Crossover: each child takes team_size of its parents' players
+    pool = np.concatenate((mothers, fathers), axis=1)
+    picks = np.argsort(rng.random(pool.shape), axis=1)[:, :team_size]
+    children = np.take_along_axis(pool, picks, axis=1)
+    # Mutation: one slot of most children gets a random candidate
+    mutate = rng.random(size) < 0.8
+    slots = rng.integers(team_size, size=size)
+    children[mutate, slots[mutate]] = rng.integers(len(candidates), size=mutate.sum())
+    return _repair(candidates, _repair_quotas(candidates, children, rng), rng)
+
+
+def _canonical(rosters):
+    """
+    Sorts each roster and drops repeated rosters.
+    """
+    return np.unique(np.sort(rosters, axis=1), axis=0)
+
+
+def search_island(
+    candidates,
+    seed=0,
+    time_budget=0.5,
+    team_size=TEAM_SIZE,
+    population_size=128,
+    patience=40,
+):
+    """
+    Runs one evolutionary search over the candidates.
+
+    Args:
+        candidates (Candidates): The searched rows.
+        seed (int): Random seed of this island.
+        time_budget (float): Seconds before the search stops.
+        team_size (int): Number of players on a roster.
+        population_size (int): Rosters kept per generation.
+        patience (int): Generations without a new non-dominated roster
+            after which the search stops early.
+
+    Returns:
+        tuple: (rosters, objectives) of the non-dominated rosters seen
+        that meet the quotas.
+    """
+    deadline = time.monotonic() + time_budget
+    rng = np.random.default_rng(seed)
+    population = _canonical(_seed_rosters(candidates, rng, population_size, team_size))
+    objectives = evaluate(candidates, population)
+    short = violations(candidates, population)
+    feasible = short == 0
+    ranks = constrained_ranks(objectives, short)
+    crowding = crowding_distance(objectives)
+    archive = population[(ranks == 0) & feasible]
+    archive_objectives = objectives[(ranks == 0) & feasible]
+
+    stale = 0
+    while time.monotonic() < deadline and stale < patience:
+        offspring = _vary(candidates, population, ranks, crowding, rng)
+        union = _canonical(np.concatenate((population, offspring)))
+        objectives = evaluate(candidates, union)
+        short = violations(candidates, union)
+        ranks = constrained_ranks(objectives, short)
+
+        # Keep whole fronts, then the least crowded points of the last one
+        chosen = []
+        for rank in range(ranks.max() + 1):
+            front = np.flatnonzero(ranks == rank)
+            if len(chosen) + len(front) > population_size:
+                distance = crowding_distance(objectives[front])
+                front = front[np.argsort(-distance)[: population_size - len(chosen)]]
+            chosen.extend(front)
+            if len(chosen) >= population_size:
+                break
+        chosen = np.asarray(chosen)
+        population = union[chosen]
+        objectives = objectives[chosen]
+        ranks = ranks[chosen]
+        feasible = short[chosen] == 0
+        crowding = crowding_distance(objectives)
+
+        # Merge the new front into the archive
+        merged = _canonical(
+            np.concatenate((archive, population[(ranks == 0) & feasible]))
+        )
+        merged_objectives = evaluate(candidates, merged)
+        keep = nondominated_ranks(merged_objectives) == 0
+        if np.array_equal(merged[keep], archive):
+            stale += 1
+        else:
+            stale = 0
+        archive, archive_objectives = merged[keep], merged_objectives[keep]
+    return archive, archive_objectives
+
+
+def _run_island(job):
+    candidates, options = job
+    return search_island(candidates, **options)
+
+
+def island_workers(workers=None):
+    """
+    Number of islands a search runs; defaults to the CPU count.
+    """
+    return workers or os.cpu_count() or 1
+
+
+def get_pool(workers=None):
+    """
+    Returns this process's pool of island workers, starting it on first use.
+
+    The pool lives as long as the process, so requests do not pay for
+    starting workers; it is replaced when more workers are asked for, after
+    a fork and after a worker died.
+
+    Args:
+        workers (int): Workers the pool needs at least; see island_workers.
+
+    Returns:
+        ProcessPoolExecutor: The pool.
+    """
+    global _pool, _pool_size, _pool_pid
+    workers = island_workers(workers)
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid() or _pool_size < workers:
+            if _pool is not None and _pool_pid == os.getpid():
+                _pool.shutdown(wait=False)
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            _pool = ProcessPoolExecutor(workers, mp_context=context)
+            _pool_size = workers
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def start_pool(workers=None):
+    """
+    Starts the island workers now rather than on the first search, e.g.
+    when an app worker boots.
+
+    Args:
+        workers (int): Workers to start; see island_workers.
+    """
+    workers = island_workers(workers)
+    if workers > 1:
+        list(get_pool(workers).map(abs, range(workers)))
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def pareto_front(
+    store,
+    time_budget=0.5,
+    workers=None,
+    seed=0,
+    team_size=TEAM_SIZE,
+    synergy=None,
+    team_type=None,
+    min_regions=0,
+    min_org_players=None,
+    min_role_players=None,
+    **options,
+):
+    """
+    Searches the Pareto front of rosters over a pool of players.
+
+    Args:
+        store (PlayerStore): Candidate players.
+        time_budget (float): Seconds each island searches at most.
+        workers (int): Islands searched in parallel processes; defaults to
+            the CPU count, 1 searches in this process.
+        seed (int): Random seed; island i uses seed + i.
+        team_size (int): Number of players on a roster.
+        synergy (SynergyModel): Adds the synergy of the agent composition
+            as an objective.
+        team_type (str): Team submission type, used to look up its quotas.
+        min_regions (int): Minimum number of distinct regions on a roster.
+        min_org_players (dict): Minimum number of players per organization.
+        min_role_players (dict): Minimum number of players per role.
+        **options: search_island options.
+
+    Returns:
+        list of dict: One entry per roster on the front, best mean ACS
+        first, with "objectives" and "players" (player data dictionaries
+        with their "role"). Every roster meets the quotas; the list is
+        empty when no roster that does was found.
+    """
+    min_regions, quotas, role_quotas = _resolve_constraints(
+        team_type, min_regions, min_org_players, min_role_players
+    )
+    rows = prune_candidates(
+        store, team_size, by_agent=synergy is not None, quota_orgs=quotas
+    )
+    if len(np.unique(store.codes["player"][rows])) < team_size:
+        return []
+    candidates = Candidates(store, rows, synergy, min_regions, quotas, role_quotas)
+    workers = island_workers(workers)
+    islands = [
+        dict(options, seed=seed + island, time_budget=time_budget, team_size=team_size)
+        for island in range(workers)
+    ]
+
+    if workers == 1:
+        results = [search_island(candidates, **islands[0])]
+    else:
+        # The candidates of the pruned rows are sent with each island
+        pool = get_pool(workers)
+        try:
+            results = list(
+                pool.map(_run_island, [(candidates, island) for island in islands])
+            )
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+
+    rosters = _canonical(np.concatenate([rosters for rosters, _ in results]))
+    rosters = rosters[violations(candidates, rosters) == 0]
+    if not len(rosters):
+        return []
+    objectives = evaluate(candidates, rosters)
+    front = nondominated_ranks(objectives) == 0
+    rosters, objectives = rosters[front], objectives[front]
+
+    names = objective_names(synergy)
+    entries = []
+    for index in np.argsort(-objectives[:, 0], kind="stable"):
+        rows = candidates.rows[rosters[index]]
+        players = store.records(rows)
+        for player, role in zip(players, store.role_codes[rows]):
+            player["role"] = ROLES[role]
+        entries.append(
+            {
+                "objectives": {
+                    name: round(float(value), 3)
+                    for name, value in zip(names, objectives[index])
+                },
+                "players": players,
+            }
+        )
+    return entries
+
+
+def main():
+    # Configure logging; stdout carries the front
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+    args = parse_arguments()
+    if args.team_type not in TEAM_QUERIES:
+        logging.error(f"Unknown team type: {args.team_type}")
+        sys.exit(1)
+
+    try:
+        conn = sqlite3.connect(args.db_file)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(*TEAM_QUERIES[args.team_type]).fetchall()
+        synergy = SynergyModel.from_database(conn) if args.synergy else None
+        conn.close()
+    except sqlite3.Error as e:
+        logging.error(f"Error reading players: {e}")
+        sys.exit(1)
+    if not rows:
+        logging.error("No players found matching the selected criteria.")
+        sys.exit(1)
+
+    store = PlayerStore.from_rows(rows)
+    start = time.perf_counter()
+    front = pareto_front(
+        store,
+        args.time_budget,
+        args.workers,
+        args.seed,
+        synergy=synergy,
+        team_type=args.team_type,
+    )
+    logging.info(
+        f"{len(front)} rosters on the front of {len(store)} players "
+        f"in {time.perf_counter() - start:.2f}s."
+    )
+    json.dump(front, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# player_store.py
+
+import numpy as np
+
+from roles import ROLE_CATEGORIES, assign_role
+
+# Numeric columns of the 'players' table (see sqllite.create_database)
+STAT_COLUMNS = (
+    "rds",
+    "average_combat_score",
+    "kill_deaths",
+    "average_damage_per_round",
+    "kills_per_round",
+    "assists_per_round",
+    "first_kills_per_round",
+    "first_deaths_per_round",
+    "headshot_percentage",
+    "clutch_success_percentage",
+    "clutch_won_played",
+    "total_kills",
+    "total_deaths",
+    "total_assists",
+    "total_first_kills",
+    "total_first_deaths",
+)
+
+# Text columns stored as integer codes into a per-column category list
+CATEGORICAL_COLUMNS = ("player", "org", "region", "agent")
+
+ALL_COLUMNS = ("id",) + CATEGORICAL_COLUMNS + STAT_COLUMNS + ("map_id",)
+
+# Stat columns that are whole numbers in the table
+INTEGER_COLUMNS = (
+    "rds",
+    "total_kills",
+    "total_deaths",
+    "total_assists",
+    "total_first_kills",
+    "total_first_deaths",
+)
+
+# Relative importance of each stat in a player's rating. "fk_fd" is the
+# first-kill differential (first kills minus first deaths per round).
+SCORE_WEIGHTS = {
+    "average_combat_score": 0.35,
+    "kill_deaths": 0.25,
+    "average_damage_per_round": 0.25,
+    "fk_fd": 0.15,
+}
+
+ROLES = list(ROLE_CATEGORIES) + ["Undefined"]
+
+
+def _encode(values):
+    """
+    Dictionary-encodes a sequence of strings.
+
+    Returns:
+        tuple: (int32 codes, list of categories in first-seen order).
+    """
+    lookup = {}
+    codes = np.fromiter(
+        (lookup.setdefault(value, len(lookup)) for value in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    return codes, list(lookup)
+
+
+def _float_column(values):
+    return np.fromiter(
+        (np.nan if value is None else value for value in values),
+        dtype=np.float32,
+        count=len(values),
+    )
+
+
+class PlayerStore:
+    """
+    Columnar (struct-of-arrays) copy of the 'players' table.
+
+    Stats are float32 arrays, text columns are int32 codes with a category
+    list each, so filtering and rating the whole table are single NumPy
+    operations instead of a loop over per-row dictionaries.
+    """
+
+    def __init__(self, ids, stats, codes, categories, map_ids):
+        self.ids = ids
+        self.stats = stats
+        self.codes = codes
+        self.categories = categories
+        self.map_ids = map_ids
+        # Column -> value -> code, built on first use of the column
+        self._index = {}
+        # Role of each agent category, then of each row
+        agent_roles = np.array(
+            [ROLES.index(assign_role(agent)) for agent in categories["agent"]],
+            dtype=np.int8,
+        )
+        self.role_codes = (
+            agent_roles[codes["agent"]] if len(agent_roles) else np.zeros(0, np.int8)
+        )
+
+    @classmethod
+    def from_columns(cls, data):
+        """
+        Builds a store from a mapping of column name to a sequence of values.
+
+        Args:
+            data (dict): Column name -> list or array, e.g. a DataFrame's columns.
+
+        Returns:
+            PlayerStore: The columnar store.
+        """
+        n = len(data["player"])
+        ids = (
+            np.asarray(data["id"], dtype=np.int64)
+            if "id" in data
+            else np.arange(1, n + 1, dtype=np.int64)
+        )
+        stats = {column: _float_column(list(data[column])) for column in STAT_COLUMNS}
+        codes = {}
+        categories = {}
+        for column in CATEGORICAL_COLUMNS:
+            values = list(data[column])
+            if column == "region":
+                values = ["UNKNOWN" if value is None else value for value in values]
+            codes[column], categories[column] = _encode(values)
+        map_ids = np.fromiter(
+            (-1 if value is None else value for value in data["map_id"]),
+            dtype=np.int16,
+            count=n,
+        )
+        return cls(ids, stats, codes, categories, map_ids)
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """
+        Maps a snapshot file written by snapshot.write_snapshot.
+
+        Args:
+            path (str): Snapshot file.
+
+        Returns:
+            PlayerStore: A read-only store over the mapped file.
+        """
+        from snapshot import load_snapshot
+
+        return load_snapshot(path).store
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds a store from rows fetched from the 'players' table.
+
+        Args:
+            rows (list of sqlite3.Row): Rows returned by a players query.
+
+        Returns:
+            PlayerStore: The columnar store.
+        """
+        columns = rows[0].keys() if rows else ALL_COLUMNS
+        return cls.from_columns(
+            {column: [row[column] for row in rows] for column in columns}
+        )
+
+    @classmethod
+    def from_records(cls, players):
+        """
+        Builds a store from a list of player data dictionaries.
+
+        Args:
+            players (list of dict): List of player data dictionaries.
+
+        Returns:
+            PlayerStore: The columnar store.
+        """
+        return cls.from_rows(players)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        """
+        Memory held by the arrays, excluding the category lists.
+        """
+        arrays = [self.ids, self.map_ids, self.role_codes]
+        arrays += list(self.stats.values()) + list(self.codes.values())
+        return sum(array.nbytes for array in arrays)
+
+    def _lookup(self, column):
+        index = self._index.get(column)
+        if index is None:
+            index = self._index[column] = {
+                value: code for code, value in enumerate(self.categories[column])
+            }
+        return index
+
+    def select(self, mask):
+        """
+        Returns a store of the selected rows, sharing the category lists.
+
+        Args:
+            mask (np.ndarray): Boolean mask over the rows.
+
+        Returns:
+            PlayerStore: The selected rows; this store when all are selected.
+        """
+        rows = np.flatnonzero(mask)
+        if len(rows) == len(self):
+            return self
+        return PlayerStore(
+            self.ids[rows],
+            {column: values[rows] for column, values in self.stats.items()},
+            {column: codes[rows] for column, codes in self.codes.items()},
+            self.categories,
+            self.map_ids[rows],
+        )
+
+    def column(self, name):
+        """
+        Returns a column as an array; categorical columns are decoded.
+        """
+        if name in self.stats:
+            return self.stats[name]
+        if name == "fk_fd":
+            return (
+                self.stats["first_kills_per_round"]
+                - self.stats["first_deaths_per_round"]
+            )
+        if name == "map_id":
+            return self.map_ids
+        if name == "role":
+            return np.array(ROLES, dtype=object)[self.role_codes]
+        return np.array(self.categories[name], dtype=object)[self.codes[name]]
+
+    def mask(self, **filters):
+        """
+        Selects rows whose categorical columns match the given values.
+
+        Args:
+            **filters: Column name -> value or iterable of values, e.g.
+                org=("Ascend", "OrgZ") or region="Japan". "role" is accepted
+                as well.
+
+        Returns:
+            np.ndarray: Boolean mask over the rows.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for column, values in filters.items():
+            if isinstance(values, str):
+                values = (values,)
+            if column == "role":
+                wanted = [ROLES.index(value) for value in values if value in ROLES]
+                mask &= np.isin(self.role_codes, wanted)
+            else:
+                index = self._lookup(column)
+                wanted = [index[value] for value in values if value in index]
+                mask &= np.isin(self.codes[column], wanted)
+        return mask
+
+    def count_distinct(self, column, mask=None, upper=False):
+        """
+        Counts the distinct values of a categorical column.
+        """
+        codes = self.codes[column] if mask is None else self.codes[column][mask]
+        present = np.unique(codes)
+        if not upper:
+            return len(present)
+        return len({self.categories[column][code].upper() for code in present})
+
+    def zscores(self, columns, mask=None):
+        """
+        Standardises stat columns over the selected rows.
+
+        Args:
+            columns (iterable of str): Stat columns, including "fk_fd".
+            mask (np.ndarray): Rows to normalise over. Defaults to all rows.
+
+        Returns:
+            np.ndarray: float32 array of shape (rows, columns).
+        """
+        # One contiguous row per stat, so each reduction is a single pass
+        if mask is None:
+            matrix = np.stack([self.column(column) for column in columns])
+        else:
+            matrix = np.stack([self.column(column)[mask] for column in columns])
+        if not matrix.shape[1]:
+            return matrix.T
+        if np.isnan(matrix).any():
+            mean = np.nanmean(matrix, axis=1, keepdims=True)
+            std = np.nanstd(matrix, axis=1, keepdims=True)
+        else:
+            mean = matrix.mean(axis=1, keepdims=True)
+            std = matrix.std(axis=1, keepdims=True)
+        std[~(std > 0)] = 1.0
+        matrix -= mean
+        matrix /= std
+        return np.nan_to_num(matrix, copy=False).T
+
+    def composite_rating(self, weights=SCORE_WEIGHTS, mask=None):
+        """
+        Rates every selected row with a weighted sum of z-scored stats.
+
+        Returns:
+            np.ndarray: float32 rating per selected row.
+        """
+        z = self.zscores(weights, mask)
+        return z @ np.asarray(list(weights.values()), dtype=np.float32)
+
+    def rank(self, k, mask=None, weights=SCORE_WEIGHTS):
+        """
+        Returns the row indices of the k best rated rows, best first.
+        """
+        rows = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        ratings = self.composite_rating(weights, mask)
+        k = min(k, len(rows))
+        if k == 0:
+            return rows[:0]
+        top = np.argpartition(-ratings, k - 1)[:k]
+        top = top[np.argsort(-ratings[top], kind="stable")]
+        return rows[top]
+
+    def records(self, indices):
+        """
+        Converts selected rows back into player data dictionaries.
+
+        Args:
+            indices (iterable of int): Row indices.
+
+        Returns:
+            list of dict: One dictionary per row, keyed like the 'players' table.
+        """
+        records = []
+        for i in indices:
+            record = {"id": int(self.ids[i])}
+            for column in CATEGORICAL_COLUMNS:
+                record[column] = self.categories[column][self.codes[column][i]]
+            for column in STAT_COLUMNS:
+                value = self.stats[column][i]
+                if np.isnan(value):
+                    record[column] = None
+                elif column in INTEGER_COLUMNS:
+                    record[column] = int(value)
+                else:
+                    record[column] = round(float(value), 2)
+            record["map_id"] = int(self.map_ids[i])
+            records.append(record)
+        return records
@@ -0,0 +1,206 @@
+# prompt_encoding.py
+
+import csv
+import io
+import math
+import re
+
+from roles import ROLE_CATEGORIES, assign_role
+from team_optimizer import score_players
+
+# Columns of the compact encodings, with the short header used for each.
+# Totals are left out: each one is the matching per-round stat times rds.
+COMPACT_COLUMNS = (
+    ("player", "player"),
+    ("org", "org"),
+    ("region", "region"),
+    ("agent", "agent"),
+    ("role", "role"),
+    ("map_id", "map"),
+    ("rds", "rds"),
+    ("average_combat_score", "acs"),
+    ("kill_deaths", "kd"),
+    ("average_damage_per_round", "adr"),
+    ("kills_per_round", "kpr"),
+    ("assists_per_round", "apr"),
+    ("first_kills_per_round", "fkpr"),
+    ("first_deaths_per_round", "fdpr"),
+    ("headshot_percentage", "hs%"),
+    ("clutch_success_percentage", "clutch%"),
+    ("clutch_won_played", "clutch_wp"),
+)
+
+COMPACT_LEGEND = (
+    "Player data as CSV. acs=average combat score, kd=kill/death ratio, "
+    "adr=average damage per round, kpr/apr/fkpr/fdpr=kills/assists/first "
+    "kills/first deaths per round, clutch_wp=clutches won/played. "
+    "Totals are the per-round stats times rds.\n"
+)
+
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text):
+    """
+    Estimates how many tokens a GPT model needs for a text.
+
+    Uses tiktoken when it is installed; otherwise approximates BPE by
+    splitting the text into words, digit runs and punctuation, counting
+    about four letters or three digits per token.
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Estimated token count.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        tokens = 0
+        for piece in _TOKEN_PIECES.findall(text):
+            if piece.isalpha():
+                tokens += math.ceil(len(piece) / 4)
+            elif piece.isdigit():
+                tokens += math.ceil(len(piece) / 3)
+            else:
+                tokens += 1
+        return tokens
+    return len(tiktoken.get_encoding("cl100k_base").encode(text))
+
+
+def encode_verbose(players):
+    """
+    Encodes players as labelled lines, one block per player.
+    """
+    player_info = ""
+    for player in players:
+        role = assign_role(player["agent"])
+        player_info += (
+            f"Player Name: {player['player']}\n"
+            f"Organization: {player['org']}\n"
+            f"Rounds Played: {player['rds']}\n"
+            f"Average Combat Score: {player['average_combat_score']}\n"
+            f"Kill/Death Ratio: {player['kill_deaths']}\n"
+            f"Average Damage Per Round: {player['average_damage_per_round']}\n"
+            f"Kills Per Round: {player['kills_per_round']}\n"
+            f"Assists Per Round: {player['assists_per_round']}\n"
+            f"First Kills Per Round: {player['first_kills_per_round']}\n"
+            f"First Deaths Per Round: {player['first_deaths_per_round']}\n"
+            f"Headshot Percentage: {player['headshot_percentage']}%\n"
+            f"Clutch Success Percentage: {player['clutch_success_percentage']}%\n"
+            f"Clutches Won/Played: {player['clutch_won_played']:.2f}\n"
+            f"Total Kills: {player['total_kills']}\n"
+            f"Total Deaths: {player['total_deaths']}\n"
+            f"Total Assists: {player['total_assists']}\n"
+            f"Total First Kills: {player['total_first_kills']}\n"
+            f"Total First Deaths: {player['total_first_deaths']}\n"
+            f"Map ID: {player['map_id']}\n"
+            f"Agent: {player['agent']} ({role})\n"
+            # f"Region: {player['region'].upper()}\n"
+            f"Region: {player['region']}\n"
+            "-----\n"
+        )
+    return player_info
+
+
+def encode_csv(players):
+    """
+    Encodes players as CSV with a single header and no derivable columns.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(header for _, header in COMPACT_COLUMNS)
+    for player in players:
+        writer.writerow(
+            assign_role(player["agent"]) if column == "role" else player[column]
+            for column, _ in COMPACT_COLUMNS
+        )
+    return COMPACT_LEGEND + buffer.getvalue()
+
+
+# Available encodings, selected by name in encode_players and build_prompt
+PROMPT_ENCODINGS = {
+    "verbose": encode_verbose,
+    "csv": encode_csv,
+}
+
+
+def rank_by_role(players, top_n):
+    """
+    Keeps the top_n best rated players of each role, best first.
+
+    Args:
+        players (list of dict): List of player data dictionaries.
+        top_n (int): Players kept per role.
+
+    Returns:
+        list of dict: The kept players, grouped by role in ROLE_CATEGORIES order.
+    """
+    if not players:
+        return []
+    scores = score_players(players)
+    by_role = {}
+    for score, player in sorted(
+        zip(scores, players), key=lambda pair: pair[0], reverse=True
+    ):
+        ranked = by_role.setdefault(assign_role(player["agent"]), [])
+        if len(ranked) < top_n:
+            ranked.append(player)
+    order = list(ROLE_CATEGORIES) + ["Undefined"]
+    return [player for role in order for player in by_role.get(role, [])]
+
+
+def _player_key(player):
+    return player["player"], player["agent"], player.get("map_id")
+
+
+def encode_players(
+    players, encoding="verbose", top_n_per_role=None, token_budget=None, selected=None
+):
+    """
+    Encodes player data for a prompt.
+
+    Args:
+        players (list of dict): List of player data dictionaries.
+        encoding (str): Name of an entry of PROMPT_ENCODINGS.
+        top_n_per_role (int): Send only the best rated players of each role.
+        token_budget (int): Upper bound on estimate_tokens of the result.
+            Players are ranked and the lowest rated ones are dropped until
+            the encoding fits.
+        selected (list of dict): Players of the chosen roster. They are
+            always encoded, first, and neither top_n_per_role nor
+            token_budget drops them; if they alone exceed the budget, they
+            are encoded anyway.
+
+    Returns:
+        str: The encoded player data.
+    """
+    encoder = PROMPT_ENCODINGS[encoding]
+    kept = list(selected or [])
+    keys = {_player_key(player) for player in kept}
+    others = [player for player in players if _player_key(player) not in keys]
+    if top_n_per_role is not None:
+        others = rank_by_role(others, top_n_per_role)
+
+    text = encoder(kept + others)
+    if token_budget is None or estimate_tokens(text) <= token_budget:
+        return text
+
+    # Binary search for the largest prefix of the ranking that fits
+    ranked = [
+        player
+        for _, player in sorted(
+            zip(score_players(others), others),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )
+    ]
+    low, high = 0, len(ranked)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(encoder(kept + ranked[:middle])) <= token_budget:
+            low = middle
+        else:
+            high = middle - 1
+    return encoder(kept + ranked[:low])
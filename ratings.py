@@ -0,0 +1,243 @@
+# ratings.py
+
+import re
+from bisect import bisect_right
+
+import numpy as np
+
+from results_store import load_results
+
+BASE_RATING = 1500.0
+
+# Tournament tiers by name, checked in order; anything else is tier 3
+TOURNAMENT_TIERS = (
+    (1, re.compile(r"Masters|Valorant Champions|Last Chance Qualifier|First Strike")),
+    (2, re.compile(r"Challengers|Champions Tour|Game Changers")),
+)
+LOWEST_TIER = 3
+
+# Elo K-factor of each tier: results of bigger events move ratings more
+K_FACTORS = {1: 40.0, 2: 32.0, 3: 24.0}
+
+
+def tournament_tier(name):
+    """
+    Returns the tier of a tournament, 1 being the most prestigious.
+    """
+    for tier, pattern in TOURNAMENT_TIERS:
+        if pattern.search(name):
+            return tier
+    return LOWEST_TIER
+
+
+def _expected(rating, opponent):
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / 400.0))
+
+
+def _layers(team1, team2, num_teams):
+    """
+    Splits matches into layers in which every team plays at most once.
+
+    A match goes one layer after the latest layer of either of its teams,
+    so each team's matches keep their order across layers and every layer
+    can be applied as one vectorised update.
+
+    Returns:
+        list of np.ndarray: Row numbers of each layer.
+    """
+    last = [-1] * num_teams
+    layer = np.empty(len(team1), dtype=np.int32)
+    for row, (a, b) in enumerate(zip(team1.tolist(), team2.tolist())):
+        current = max(last[a], last[b]) + 1
+        last[a] = last[b] = current
+        layer[row] = current
+    order = np.argsort(layer, kind="stable")
+    counts = np.bincount(layer)
+    return np.split(order, np.cumsum(counts)[:-1])
+
+
+class RatingEngine:
+    """
+    Elo ratings of every team, overall and per tournament tier.
+
+    The history of results is replayed in chronological order; ratings
+    after every match are kept as per-team snapshots, so the rating of a
+    team at any point in time is a binary search. New results are applied
+    one at a time with update.
+    """
+
+    def __init__(self, teams, base=BASE_RATING, k_factors=K_FACTORS):
+        """
+        Args:
+            teams (Iterable of str): Team names, indexed by code.
+            base (float): Rating of a team without results.
+            k_factors (dict): Elo K-factor of each tier.
+        """
+        self.teams = list(teams)
+        self.base = base
+        self.k_factors = k_factors
+        self._codes = {name.lower(): code for code, name in enumerate(self.teams)}
+        # Row 0 holds the overall ratings, row t the ratings of tier t
+        self.ratings = np.full((LOWEST_TIER + 1, len(self.teams)), base)
+        self._history_offsets = np.zeros(len(self.teams) + 1, dtype=np.int64)
+        self._history_times = np.empty(0, dtype=np.int64)
+        self._history_ratings = np.empty(0)
+        self._recent = {}
+
+    @classmethod
+    def from_results(cls, store=None, **options):
+        """
+        Replays every result of a ResultsStore.
+
+        Args:
+            store (ResultsStore): Results, oldest first. Defaults to
+                results_store.load_results().
+            **options: RatingEngine options.
+
+        Returns:
+            RatingEngine: The engine, with ratings after the last result.
+        """
+        store = store if store is not None else load_results()
+        engine = cls(store.teams, **options)
+        engine.replay(store)
+        return engine
+
+    def replay(self, store):
+        """
+        Rebuilds the ratings and snapshots from a full results history.
+        """
+        columns = store.columns
+        team1, team2 = columns["team1"], columns["team2"]
+        tiers = np.array(
+            [tournament_tier(name) for name in store.tournaments], dtype=np.int64
+        )[columns["tournament"]]
+        k = np.array([self.k_factors[tier] for tier in range(1, LOWEST_TIER + 1)])[
+            tiers - 1
+        ]
+        outcome = (
+            np.sign(columns["score1"].astype(np.int64) - columns["score2"]) * 0.5 + 0.5
+        )
+
+        self.ratings[:] = self.base
+        after1 = np.empty(len(team1))
+        after2 = np.empty(len(team2))
+        for rows in _layers(team1, team2, len(self.teams)):
+            a, b = team1[rows], team2[rows]
+            for level in (0, tiers[rows]):
+                rating_a = self.ratings[level, a]
+                rating_b = self.ratings[level, b]
+                delta = k[rows] * (outcome[rows] - _expected(rating_a, rating_b))
+                self.ratings[level, a] = rating_a + delta
+                self.ratings[level, b] = rating_b - delta
+            after1[rows] = self.ratings[0, a]
+            after2[rows] = self.ratings[0, b]
+
+        # Overall rating after each of a team's matches, grouped by team
+        offsets, rows = store.team_index()
+        owners = np.repeat(np.arange(len(self.teams)), np.diff(offsets))
+        self._history_offsets = offsets
+        self._history_times = columns["completed"][rows]
+        self._history_ratings = np.where(
+            team1[rows] == owners, after1[rows], after2[rows]
+        )
+        self._recent = {}
+
+    def team_code(self, team):
+        """
+        Returns the code of a team, adding the team if it is new.
+        """
+        key = team.lower()
+        if key not in self._codes:
+            self._codes[key] = len(self.teams)
+            self.teams.append(team)
+            self.ratings = np.hstack(
+                (self.ratings, np.full((LOWEST_TIER + 1, 1), self.base))
+            )
+            self._history_offsets = np.append(
+                self._history_offsets, self._history_offsets[-1]
+            )
+        return self._codes[key]
+
+    def update(self, team1, team2, score1, score2, completed, tournament=""):
+        """
+        Applies one new result, completed after every result seen so far.
+
+        Args:
+            team1 (str): First team.
+            team2 (str): Second team.
+            score1 (int): Maps or rounds won by team1.
+            score2 (int): Maps or rounds won by team2.
+            completed (int): Unix time the match was completed.
+            tournament (str): Tournament name, used for its tier.
+
+        Returns:
+            tuple: Overall ratings of team1 and team2 after the match.
+        """
+        a, b = self.team_code(team1), self.team_code(team2)
+        tier = tournament_tier(tournament)
+        outcome = 0.5 + 0.5 * np.sign(score1 - score2)
+        for level in (0, tier):
+            rating_a, rating_b = self.ratings[level, a], self.ratings[level, b]
+            delta = self.k_factors[tier] * (outcome - _expected(rating_a, rating_b))
+            self.ratings[level, a] = rating_a + delta
+            self.ratings[level, b] = rating_b - delta
+        for code in (a, b):
+            self._recent.setdefault(code, ([], []))
+            self._recent[code][0].append(completed)
+            self._recent[code][1].append(float(self.ratings[0, code]))
+        return float(self.ratings[0, a]), float(self.ratings[0, b])
+
+    def rating(self, team, tier=None):
+        """
+        Current rating of a team, overall or within one tier.
+
+        Unknown teams have the base rating.
+        """
+        code = self._codes.get(team.lower())
+        if code is None:
+            return self.base
+        return float(self.ratings[0 if tier is None else tier, code])
+
+    def rating_at(self, team, when):
+        """
+        Overall rating of a team after its last match completed at or
+        before a point in time.
+
+        Args:
+            team (str): Team name.
+            when (int): Unix time.
+
+        Returns:
+            float: The rating; the base rating before the team's first match.
+        """
+        code = self._codes.get(team.lower())
+        if code is None:
+            return self.base
+        recent = self._recent.get(code)
+        if recent and when >= recent[0][0]:
+            return recent[1][bisect_right(recent[0], when) - 1]
+        start, end = self._history_offsets[code], self._history_offsets[code + 1]
+        index = np.searchsorted(self._history_times[start:end], when, side="right")
+        return float(self._history_ratings[start + index - 1]) if index else self.base
+
+    def org_strength(self, orgs):
+        """
+        Strength of organizations, for weighting their players.
+
+        Args:
+            orgs (Iterable of str): Organization names, matched to teams
+                ignoring case.
+
+        Returns:
+            dict: Org -> overall rating above the base, in units of 400
+            points (one unit is 10:1 odds); 0.0 for orgs without results.
+        """
+        return {org: (self.rating(str(org)) - self.base) / 400.0 for org in orgs}
+
+    def strongest(self, n=10, tier=None):
+        """
+        Returns the n highest rated teams, best first, with their ratings.
+        """
+        ratings = self.ratings[0 if tier is None else tier]
+        order = np.argsort(-ratings)[:n]
+        return [(self.teams[code], float(ratings[code])) for code in order]
@@ -0,0 +1,410 @@
+# results_store.py
+
+import csv
+import io
+import os
+import re
+import zipfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+RESULTS_ZIP = "data/archive.zip"
+RESULTS_MEMBER = "results.csv"
+RESULTS_CACHE = "data/results.npz"
+
+# Seconds per unit of the relative "time_completed" strings
+TIME_UNITS = {
+    "y": 365.25 * 86400,
+    "mo": 30.44 * 86400,
+    "w": 7 * 86400,
+    "d": 86400,
+    "h": 3600,
+    "m": 60,
+    "s": 1,
+}
+
+_RELATIVE_TIME = re.compile(r"(\d+)\s*(mo|y|w|d|h|m|s)\b")
+
+
+def parse_relative_time(text, reference):
+    """
+    Converts a relative time such as "7h 36m ago" or "1y ago" to a timestamp.
+
+    Args:
+        text (str): Relative time, as scraped in results.csv.
+        reference (float): Unix time the text is relative to.
+
+    Returns:
+        int: Unix time in seconds.
+
+    Raises:
+        ValueError: If the text has no recognised amount.
+    """
+    parts = _RELATIVE_TIME.findall(text)
+    if not parts:
+        raise ValueError(f"Unrecognised relative time: {text!r}")
+    return int(
+        reference - sum(int(amount) * TIME_UNITS[unit] for amount, unit in parts)
+    )
+
+
+def _clean(row):
+    """
+    Strips the padding of a results.csv record and parses its scores.
+
+    Returns:
+        dict: The cleaned record, or None for rows the scrape garbled, such
+        as unplayed "TBD" matches or shifted columns.
+    """
+    row = {key: (value or "").strip() for key, value in row.items()}
+    try:
+        row["score1"] = int(row["score1"])
+        row["score2"] = int(row["score2"])
+    except ValueError:
+        return None
+    if not row["team1"] or not row["team2"]:
+        return None
+    return row
+
+
+def _encode(values, key=None):
+    """
+    Dictionary-encodes a sequence of strings.
+
+    Args:
+        values (list of str): Values to encode.
+        key (callable): Maps a value to the key it is grouped by, e.g.
+            str.lower; the first spelling seen names the category.
+
+    Returns:
+        tuple: (int32 codes, np.ndarray of categories in first-seen order).
+    """
+    lookup = {}
+    names = []
+    codes = np.empty(len(values), dtype=np.int32)
+    for index, value in enumerate(values):
+        group = key(value) if key else value
+        code = lookup.get(group)
+        if code is None:
+            code = lookup[group] = len(names)
+            names.append(value)
+        codes[index] = code
+    return codes, np.array(names, dtype=str)
+
+
+def _build_index(codes, rows, size):
+    """
+    Groups row numbers by code, as CSR offsets and rows.
+
+    Rows of each code are sorted ascending, i.e. in chronological order.
+    """
+    order = np.lexsort((rows, codes))
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=size), out=offsets[1:])
+    return offsets, rows[order]
+
+
+class ResultsStore:
+    """
+    Columnar, dictionary-encoded copy of data/results.csv.
+
+    Rows are kept oldest first. Team and tournament names are int32 codes
+    into category arrays, and per-team and per-tournament row indexes make
+    head-to-head and form lookups a slice plus a vectorised filter.
+    """
+
+    COLUMNS = (
+        "team1",
+        "team2",
+        "score1",
+        "score2",
+        "completed",
+        "round_info",
+        "tournament",
+        "match_page",
+    )
+
+    def __init__(self, columns, categories):
+        """
+        Args:
+            columns (dict): Column name -> array, see COLUMNS.
+            categories (dict): "teams", "round_infos" and "tournaments" ->
+                arrays of names indexed by code.
+        """
+        self.columns = columns
+        self.teams = categories["teams"]
+        self.round_infos = categories["round_infos"]
+        self.tournaments = categories["tournaments"]
+        self._team_codes = {name.lower(): code for code, name in enumerate(self.teams)}
+        self._tournament_codes = {
+            name.lower(): code for code, name in enumerate(self.tournaments)
+        }
+
+        # A team plays in team1 or team2, so its index covers both columns
+        rows = np.arange(len(self), dtype=np.int32)
+        self._team_offsets, self._team_rows = _build_index(
+            np.concatenate((columns["team1"], columns["team2"])),
+            np.concatenate((rows, rows)),
+            len(self.teams),
+        )
+        self._tournament_offsets, self._tournament_rows = _build_index(
+            columns["tournament"], rows, len(self.tournaments)
+        )
+
+    def __len__(self):
+        return len(self.columns["score1"])
+
+    @classmethod
+    def from_rows(cls, rows, reference):
+        """
+        Builds the store from results.csv records.
+
+        Garbled rows are skipped.
+
+        Args:
+            rows (Iterable): Dicts with the columns of results.csv, newest
+                first as in the file.
+            reference (float): Unix time the relative times are relative to.
+
+        Returns:
+            ResultsStore: The store.
+        """
+        records = [record for record in map(_clean, rows) if record][::-1]
+        completed = np.array(
+            [parse_relative_time(row["time_completed"], reference) for row in records],
+            dtype=np.int64,
+        )
+        # Relative times are coarse; the file order breaks ties
+        order = np.lexsort((np.arange(len(records)), completed))
+        records = [records[index] for index in order]
+
+        # Teams differing only in case ("Flawless", "flawless") are one team
+        team_codes, teams = _encode(
+            [row["team1"] for row in records] + [row["team2"] for row in records],
+            key=str.lower,
+        )
+        round_infos, round_info_names = _encode([row["round_info"] for row in records])
+        tournaments, tournament_names = _encode(
+            [row["tournament_name"] for row in records], key=str.lower
+        )
+        columns = {
+            "team1": team_codes[: len(records)],
+            "team2": team_codes[len(records) :],
+            "score1": np.array([row["score1"] for row in records], dtype=np.int16),
+            "score2": np.array([row["score2"] for row in records], dtype=np.int16),
+            "completed": completed[order],
+            "round_info": round_infos,
+            "tournament": tournaments,
+            "match_page": np.array([row["match_page"] for row in records], dtype=str),
+        }
+        categories = {
+            "teams": teams,
+            "round_infos": round_info_names,
+            "tournaments": tournament_names,
+        }
+        return cls(columns, categories)
+
+    @classmethod
+    def from_zip(cls, path=RESULTS_ZIP, member=RESULTS_MEMBER):
+        """
+        Reads results.csv straight from the zip archive, without extracting it.
+
+        Relative times are resolved against the archive entry's date, which
+        is when the results were scraped.
+
+        Args:
+            path (str): Path to the zip archive.
+            member (str): Name of the CSV inside it.
+
+        Returns:
+            ResultsStore: The store.
+        """
+        with zipfile.ZipFile(path) as archive:
+            info = archive.getinfo(member)
+            reference = datetime(*info.date_time, tzinfo=timezone.utc).timestamp()
+            with archive.open(info) as f:
+                return cls.from_rows(
+                    csv.DictReader(io.TextIOWrapper(f, encoding="utf-8")), reference
+                )
+
+    @classmethod
+    def from_csv(cls, path, reference=None):
+        """
+        Reads an extracted results.csv.
+
+        Args:
+            path (str): Path to the CSV file.
+            reference (float): Unix time the relative times are relative to;
+                defaults to the file's modification time.
+
+        Returns:
+            ResultsStore: The store.
+        """
+        if reference is None:
+            reference = os.path.getmtime(path)
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_rows(csv.DictReader(f), reference)
+
+    def save(self, path=RESULTS_CACHE):
+        """
+        Writes the columns and categories to a compressed .npz file.
+        """
+        np.savez_compressed(
+            path,
+            **self.columns,
+            teams=self.teams,
+            round_infos=self.round_infos,
+            tournaments=self.tournaments,
+        )
+
+    @classmethod
+    def load(cls, path=RESULTS_CACHE):
+        """
+        Reads a store written by save.
+        """
+        with np.load(path) as data:
+            columns = {column: data[column] for column in cls.COLUMNS}
+            categories = {
+                name: data[name] for name in ("teams", "round_infos", "tournaments")
+            }
+        return cls(columns, categories)
+
+    def team_code(self, team):
+        """
+        Returns the code of a team name, ignoring case.
+
+        Raises:
+            KeyError: If the team has no results.
+        """
+        return self._team_codes[team.lower()]
+
+    def team_index(self):
+        """
+        Returns the per-team row index as CSR arrays.
+
+        Returns:
+            tuple: (offsets, rows); the rows of team code c, oldest first,
+            are rows[offsets[c]:offsets[c + 1]].
+        """
+        return self._team_offsets, self._team_rows
+
+    def team_rows(self, team):
+        """
+        Returns the rows of a team's matches, oldest first.
+        """
+        code = self.team_code(team)
+        return self._team_rows[self._team_offsets[code] : self._team_offsets[code + 1]]
+
+    def tournament_rows(self, tournament):
+        """
+        Returns the rows of a tournament's matches, oldest first.
+        """
+        code = self._tournament_codes[tournament.lower()]
+        return self._tournament_rows[
+            self._tournament_offsets[code] : self._tournament_offsets[code + 1]
+        ]
+
+    def _summary(self, code, rows):
+        """
+        Counts wins, losses and draws of a team over some of its rows.
+        """
+        team1 = self.columns["team1"][rows] == code
+        own = np.where(
+            team1, self.columns["score1"][rows], self.columns["score2"][rows]
+        )
+        other = np.where(
+            team1, self.columns["score2"][rows], self.columns["score1"][rows]
+        )
+        wins = int(np.count_nonzero(own > other))
+        losses = int(np.count_nonzero(own < other))
+        return {
+            "played": len(rows),
+            "wins": wins,
+            "losses": losses,
+            "draws": len(rows) - wins - losses,
+            "win_rate": wins / len(rows) if len(rows) else None,
+            "rows": rows,
+        }
+
+    def head_to_head(self, team_a, team_b, since=None):
+        """
+        Results of the matches between two teams, from team_a's side.
+
+        Args:
+            team_a (str): Team name.
+            team_b (str): Opponent name.
+            since (int): Only count matches completed at or after this Unix time.
+
+        Returns:
+            dict: played, wins, losses, draws, win_rate and the matching rows.
+        """
+        code_a, code_b = self.team_code(team_a), self.team_code(team_b)
+        rows = self.team_rows(team_a)
+        rows = rows[
+            (self.columns["team1"][rows] == code_b)
+            | (self.columns["team2"][rows] == code_b)
+        ]
+        if since is not None:
+            rows = rows[self.columns["completed"][rows] >= since]
+        return self._summary(code_a, rows)
+
+    def team_form(self, team, last=10, before=None):
+        """
+        Results of a team's most recent matches.
+
+        Args:
+            team (str): Team name.
+            last (int): Number of matches.
+            before (int): Only count matches completed before this Unix time.
+
+        Returns:
+            dict: played, wins, losses, draws, win_rate and the rows.
+        """
+        rows = self.team_rows(team)
+        if before is not None:
+            rows = rows[: np.searchsorted(self.columns["completed"][rows], before)]
+        return self._summary(self.team_code(team), rows[-last:])
+
+    def records(self, rows):
+        """
+        Decodes rows back into dicts with the columns of results.csv.
+        """
+        return [
+            {
+                "team1": str(self.teams[self.columns["team1"][row]]),
+                "team2": str(self.teams[self.columns["team2"][row]]),
+                "score1": int(self.columns["score1"][row]),
+                "score2": int(self.columns["score2"][row]),
+                "completed": int(self.columns["completed"][row]),
+                "round_info": str(self.round_infos[self.columns["round_info"][row]]),
+                "tournament_name": str(
+                    self.tournaments[self.columns["tournament"][row]]
+                ),
+                "match_page": str(self.columns["match_page"][row]),
+            }
+            for row in rows
+        ]
+
+
+def load_results(zip_path=RESULTS_ZIP, cache_path=RESULTS_CACHE):
+    """
+    Loads the results, from the .npz cache when it is newer than the zip.
+
+    Args:
+        zip_path (str): Path to the zip archive.
+        cache_path (str): Path of the .npz cache; None disables it.
+
+    Returns:
+        ResultsStore: The store.
+    """
+    if (
+        cache_path
+        and os.path.exists(cache_path)
+        and os.path.getmtime(cache_path) >= os.path.getmtime(zip_path)
+    ):
+        return ResultsStore.load(cache_path)
+    store = ResultsStore.from_zip(zip_path)
+    if cache_path:
+        store.save(cache_path)
+    return store
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Riot API that replays the sample data in data/matches.
+
+Accounts come from players.json. Every player gets a deterministic list of
+match ids drawn from a shared pool, so players overlap in the matches they
+played, and every match is served as game.json with its own id. Requests
+are rate limited like a development key and answered with Riot's
+rate-limit headers.
+
+Usage:
+    python riot_stub.py --port 8001
+    RIOT_API_BASE=http://127.0.0.1:8001 python -c "import helper_functions"
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+GAME_FILE = "data/matches/game.json"
+PLAYERS_FILE = "data/matches/players.json"
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Serve a local Riot API stub.")
+    parser.add_argument("--port", type=int, default=8001, help="Port to listen on.")
+    parser.add_argument(
+        "--rate_limits",
+        type=str,
+        default="20:1,100:120",
+        help="Enforced windows as count:seconds pairs; empty to disable.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Seconds added to every response.",
+    )
+    parser.add_argument(
+        "--pool_size",
+        type=int,
+        default=50,
+        help="Number of distinct matches shared by all players.",
+    )
+    return parser.parse_args()
+
+
+class RiotStub:
+    """
+    Replayed data and rate-limit state shared by the request handlers.
+    """
+
+    def __init__(self, rate_limits="20:1,100:120", latency=0.05, pool_size=50):
+        with open(GAME_FILE, "rb") as f:
+            self.game = f.read()
+        self.game_id = json.loads(self.game)["matchInfo"]["matchId"]
+        with open(PLAYERS_FILE) as f:
+            self.players = json.load(f)
+        self.accounts = {
+            (player["gameName"].lower(), player["tagLine"].lower()): player
+            for player in self.players
+        }
+        self.puuids = [player["puuid"] for player in self.players]
+
+        self.windows = [
+            tuple(int(value) for value in pair.split(":"))
+            for pair in rate_limits.split(",")
+            if pair
+        ]
+        self.latency = latency
+        self.pool = [f"{self.game_id[:-4]}{index:04d}" for index in range(pool_size)]
+        self.requests = deque()
+        self.lock = threading.Lock()
+        self.served = {"requests": 0, "throttled": 0}
+
+    def match_ids(self, puuid, count):
+        """
+        Returns the ids of a player's matches; neighbours share most of them.
+        """
+        offset = self.puuids.index(puuid) * 3 if puuid in self.puuids else 0
+        return [self.pool[(offset + i) % len(self.pool)] for i in range(count)]
+
+    def admit(self):
+        """
+        Records a request against the rate limits.
+
+        Returns:
+            tuple: Response headers, and the Retry-After in seconds when the
+            request is over a limit.
+        """
+        with self.lock:
+            now = time.monotonic()
+            longest = max((seconds for _, seconds in self.windows), default=0)
+            while self.requests and self.requests[0] <= now - longest:
+                self.requests.popleft()
+            counts = [
+                sum(1 for stamp in self.requests if stamp > now - seconds)
+                for _, seconds in self.windows
+            ]
+            self.served["requests"] += 1
+            for (limit, seconds), used in zip(self.windows, counts):
+                if used >= limit:
+                    self.served["throttled"] += 1
+                    oldest = next(
+                        stamp for stamp in self.requests if stamp > now - seconds
+                    )
+                    return {}, max(1, int(oldest + seconds - now + 1))
+            self.requests.append(now)
+            headers = {}
+            if self.windows:
+                headers["X-App-Rate-Limit"] = ",".join(
+                    f"{limit}:{seconds}" for limit, seconds in self.windows
+                )
+                headers["X-App-Rate-Limit-Count"] = ",".join(
+                    f"{used + 1}:{seconds}"
+                    for used, (_, seconds) in zip(counts, self.windows)
+                )
+            return headers, None
+
+
+def make_handler(stub):
+    """
+    Builds the request handler class serving a RiotStub.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send(self, status, body, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            headers, retry_after = stub.admit()
+            if retry_after is not None:
+                self.send(
+                    429,
+                    b'{"status": {"status_code": 429}}',
+                    {"Retry-After": str(retry_after)},
+                )
+                return
+            time.sleep(stub.latency)
+
+            url = urlparse(self.path)
+            parts = [unquote(part) for part in url.path.strip("/").split("/")]
+            query = parse_qs(url.query)
+            body = None
+            if parts[:5] == ["riot", "account", "v1", "accounts", "by-riot-id"]:
+                account = stub.accounts.get(tuple(part.lower() for part in parts[5:7]))
+                if account:
+                    body = json.dumps(account).encode()
+            elif parts[:5] == ["val", "match", "v1", "matchlists", "by-puuid"]:
+                count = int(query.get("count", ["20"])[0])
+                history = [
+                    {"matchId": match_id, "gameStartTimeMillis": 0, "queueId": ""}
+                    for match_id in stub.match_ids(parts[5], count)
+                ]
+                body = json.dumps({"puuid": parts[5], "history": history}).encode()
+            elif parts[:4] == ["val", "match", "v1", "matches"] and len(parts) == 5:
+                if parts[4] in stub.pool:
+                    body = stub.game.replace(
+                        stub.game_id.encode(), parts[4].encode(), 1
+                    )
+
+            if body is None:
+                self.send(404, b'{"status": {"status_code": 404}}', headers)
+            else:
+                self.send(200, body, headers)
+
+    return Handler
+
+
+def start_server(port=0, **options):
+    """
+    Starts the stub on a background thread.
+
+    Args:
+        port (int): Port to listen on; 0 picks a free port.
+        **options: RiotStub options.
+
+    Returns:
+        tuple: The server, whose server_address holds the bound port, and
+        the RiotStub with its request counters.
+    """
+    stub = RiotStub(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stub
+
+
+def main():
+    args = parse_arguments()
+    stub = RiotStub(args.rate_limits, args.latency, args.pool_size)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(stub))
+    logging.info(f"Serving the Riot API stub on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    logging.info(
+        f"Served {stub.served['requests']} requests, "
+        f"{stub.served['throttled']} rate limited."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# roles.py
+
+# Define role categories. An agent listed under several roles (Viper) can
+# fill any of them; assign_role returns the first one listed. Role quotas,
+# the roles team_optimizer requires and the role reported for a player use
+# that single role, so Viper counts as a Sentinel only; synergy's role
+# coverage, which scores compositions, counts every role (AGENT_ROLES).
+ROLE_CATEGORIES = {
+    "Duelist": ["Jett", "Phoenix", "Reyna", "Raze", "Yoru", "Neon"],
+    "Sentinel": ["Sage", "Cypher", "Killjoy", "Chamber", "Viper"],
+    "Controller": ["Omen", "Astra", "Brimstone", "Viper"],
+    "Initiator": ["Sova", "Breach", "Skye", "KAY/O", "Fade"],
+}
+
+
+def _index_agent_roles():
+    agent_roles = {}
+    for role, agents in ROLE_CATEGORIES.items():
+        for agent in agents:
+            agent_roles[agent] = agent_roles.get(agent, ()) + (role,)
+    return agent_roles
+
+
+# Every role of each agent, in ROLE_CATEGORIES order
+AGENT_ROLES = _index_agent_roles()
+
+
+def agent_roles(agent):
+    """
+    Returns every role an agent can fill.
+
+    Args:
+        agent (str): Name of the agent.
+
+    Returns:
+        tuple of str: The agent's roles, or ("Undefined",) for unknown agents.
+    """
+    return AGENT_ROLES.get(agent, ("Undefined",))
+
+
+def assign_role(agent):
+    """
+    Assigns a role based on the agent name.
+
+    Args:
+        agent (str): Name of the agent.
+
+    Returns:
+        str: Assigned role (Duelist, Sentinel, Controller, Initiator, or Undefined).
+    """
+    return AGENT_ROLES.get(agent, ("Undefined",))[0]
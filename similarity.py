@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Finds the players whose stats are most like a given player's.
+
+Every 'players' row is a vector of standardised stats (ACS, K/D, ADR,
+KPR, APR, FKPR, FDPR, HS% and clutch %), and players are compared by the
+Euclidean distance between their vectors. Small tables are searched
+exhaustively; larger ones through an inverted file (IVF): the vectors are
+clustered with k-means and a query only scans the clusters nearest to it.
+
+Usage:
+    python similarity.py "Player Name" --k 10 --role Duelist --region NA
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from db import DATABASE, changed_player_ids, fetch_players_by_id
+from player_store import ROLES, PlayerStore
+
+# Stats compared between players
+FEATURE_COLUMNS = (
+    "average_combat_score",
+    "kill_deaths",
+    "average_damage_per_round",
+    "kills_per_round",
+    "assists_per_round",
+    "first_kills_per_round",
+    "first_deaths_per_round",
+    "headshot_percentage",
+    "clutch_success_percentage",
+)
+
+# Tables up to this many rows are searched exhaustively
+EXACT_LIMIT = 50000
+
+# Clusters scanned per query at least; more are scanned while fewer than k
+# players pass the filters
+PROBES = 8
+
+# k-means runs on a sample of the rows
+KMEANS_SAMPLE = 65536
+KMEANS_ITERATIONS = 10
+
+# Rows compared with the centroids at once, bounding the distance matrices
+ASSIGN_CHUNK = 16384
+
+Match = namedtuple("Match", "distance id player")
+
+# Per-slot arrays of SimilarityIndex
+ARRAYS = ("_vectors", "_norms", "_ids", "_players", "_roles", "_regions", "_alive")
+
+
+class _Codes:
+    """
+    Dictionary encoding of the values of one column, growing as rows are added.
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _kmeans(vectors, clusters, rng):
+    """
+    Clusters vectors with Lloyd's algorithm.
+
+    Returns:
+        np.ndarray: (clusters, dimensions) centroids.
+    """
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assigned = _nearest(vectors, centroids)
+        counts = np.bincount(assigned, minlength=clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assigned, vectors)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Empty clusters restart from random vectors
+        empty = np.flatnonzero(~filled)
+        centroids[empty] = vectors[rng.choice(len(vectors), len(empty))]
+    return centroids
+
+
+def _nearest(vectors, centroids):
+    """
+    Index of the nearest centroid of every vector.
+    """
+    norms = (centroids * centroids).sum(axis=1)
+    nearest = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        chunk = vectors[start : start + ASSIGN_CHUNK]
+        nearest[start : start + ASSIGN_CHUNK] = np.argmin(
+            norms - 2 * chunk @ centroids.T, axis=1
+        )
+    return nearest
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index over the standardised stats of 'players' rows.
+
+    Rows live in growable arrays; removed or replaced rows are only marked
+    dead, and rebuild compacts them. With more than exact_limit rows at
+    build time the rows are also split into inverted lists by k-means
+    cluster, and new rows join the list of their nearest centroid.
+
+    Like candidate_index.CandidateIndex, stats are standardised with the
+    means and deviations of the table when the index was built, and
+    incremental updates reuse them.
+    """
+
+    def __init__(self, exact_limit=EXACT_LIMIT, probes=PROBES, seed=0):
+        """
+        Args:
+            exact_limit (int): Largest table searched exhaustively.
+            probes (int): Clusters scanned per query at least.
+            seed (int): Random seed of the clustering.
+        """
+        self.exact_limit = exact_limit
+        self.probes = probes
+        self.seed = seed
+        self.version = None
+        self._clear()
+
+    def _clear(self):
+        self._mean = None
+        self._std = None
+        self._size = 0
+        self._vectors = np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._players = np.empty(0, dtype=np.int32)
+        self._roles = np.empty(0, dtype=np.int8)
+        self._regions = np.empty(0, dtype=np.int32)
+        self._alive = np.empty(0, dtype=bool)
+        # id -> slot of the row's live vector
+        self._slots = {}
+        self._player_codes = _Codes()
+        self._region_codes = _Codes()
+        self._centroids = None
+        self._lists = []
+
+    @classmethod
+    def from_database(cls, conn, **options):
+        """
+        Builds the index from the whole 'players' table.
+
+        Args:
+            conn (sqlite3.Connection): Connection with sqlite3.Row rows.
+            **options: SimilarityIndex options.
+
+        Returns:
+            SimilarityIndex: The index, at the database's data version.
+        """
+        index = cls(**options)
+        index.rebuild(conn)
+        return index
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _standardise(self, store):
+        matrix = np.column_stack([store.column(column) for column in FEATURE_COLUMNS])
+        if self._mean is None:
+            self._mean = np.nanmean(matrix, axis=0) if len(matrix) else 0.0
+            self._std = np.nanstd(matrix, axis=0) if len(matrix) else 1.0
+            self._std = np.where(self._std > 0, self._std, 1.0)
+        # Missing stats count as average
+        return np.nan_to_num((matrix - self._mean) / self._std).astype(np.float32)
+
+    def _grow(self, count):
+        needed = self._size + count
+        if needed <= len(self._ids):
+            return
+        capacity = max(needed, 2 * len(self._ids), 1024)
+        for name in ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[: self._size] = array[: self._size]
+            setattr(self, name, grown)
+
+    def _append(self, store):
+        """
+        Stores the rows of a store in new slots.
+
+        Returns:
+            np.ndarray: The slots.
+        """
+        vectors = self._standardise(store)
+        self._grow(len(store))
+        slots = np.arange(self._size, self._size + len(store))
+        self._size += len(store)
+        self._vectors[slots] = vectors
+        self._norms[slots] = (vectors * vectors).sum(axis=1)
+        self._ids[slots] = store.ids
+        players = [
+            self._player_codes.encode(name) for name in store.categories["player"]
+        ]
+        self._players[slots] = np.array(players, dtype=np.int32)[store.codes["player"]]
+        self._roles[slots] = store.role_codes
+        regions = [
+            self._region_codes.encode((region or "UNKNOWN").upper())
+            for region in store.categories["region"]
+        ]
+        self._regions[slots] = np.array(regions, dtype=np.int32)[store.codes["region"]]
+        self._alive[slots] = True
+        self._slots.update(zip(store.ids.tolist(), slots.tolist()))
+        return slots
+
+    def _assign(self, slots):
+        """
+        Adds slots to the inverted lists of their nearest centroids.
+        """
+        clusters = _nearest(self._vectors[slots], self._centroids)
+        order = np.argsort(clusters, kind="stable")
+        starts = np.flatnonzero(np.diff(clusters[order], prepend=-1))
+        for members in np.split(order, starts[1:]):
+            cluster = clusters[members[0]]
+            self._lists[cluster] = np.concatenate(
+                (self._lists[cluster], slots[members])
+            )
+
+    def rebuild(self, conn):
+        """
+        Reloads every row of 'players', recomputes the normalisation and,
+        for tables over exact_limit rows, reclusters the vectors.
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        rows = conn.execute("SELECT * FROM players").fetchall()
+        self._clear()
+        self.version = version
+        if not rows:
+            return
+
+        slots = self._append(PlayerStore.from_rows(rows))
+        if len(slots) > self.exact_limit:
+            rng = np.random.default_rng(self.seed)
+            sample = rng.choice(
+                len(slots), min(len(slots), KMEANS_SAMPLE), replace=False
+            )
+            clusters = int(np.sqrt(len(slots)))
+            self._centroids = _kmeans(self._vectors[sample], clusters, rng)
+            self._lists = [np.empty(0, dtype=np.int64)] * clusters
+            self._assign(slots)
+
+    def remove(self, ids):
+        """
+        Drops rows from the index; unknown ids are ignored.
+        """
+        for row_id in ids:
+            slot = self._slots.pop(row_id, None)
+            if slot is not None:
+                self._alive[slot] = False
+
+    def update(self, rows):
+        """
+        Adds rows to the index or replaces the vectors of changed rows.
+
+        Args:
+            rows (list of sqlite3.Row or dict): Full 'players' rows.
+        """
+        if not rows:
+            return
+        store = PlayerStore.from_rows(rows)
+        self.remove(store.ids.tolist())
+        slots = self._append(store)
+        if self._centroids is not None:
+            self._assign(slots)
+
+    def refresh(self, conn):
+        """
+        Brings the index up to the database's data version, reloading the
+        rows logged as changed or rebuilding it (see db.changed_player_ids).
+
+        Args:
+            conn (sqlite3.Connection): Connection with sqlite3.Row rows.
+
+        Returns:
+            int: Number of rows reloaded; None if the index was rebuilt.
+        """
+        version, ids = changed_player_ids(conn, self.version)
+        if ids is None:
+            self.rebuild(conn)
+            return None
+        rows = fetch_players_by_id(conn, ids)
+        # Rows that were deleted are no longer in the table
+        self.remove(ids)
+        self.update(rows)
+        self.version = version
+        return len(ids)
+
+    def player_vector(self, player):
+        """
+        Mean standardised stats of a player's rows.
+
+        Args:
+            player (str): Player name.
+
+        Returns:
+            np.ndarray: The vector.
+
+        Raises:
+            KeyError: If the index has no row of the player.
+        """
+        code = self._player_codes.codes.get(player, -1)
+        slots = np.flatnonzero(
+            (self._players[: self._size] == code) & self._alive[: self._size]
+        )
+        if not len(slots):
+            raise KeyError(player)
+        return self._vectors[slots].mean(axis=0)
+
+    def _allowed(self, slots, roles, regions, exclude):
+        allowed = self._alive[slots]
+        if roles is not None:
+            codes = [ROLES.index(role) for role in roles if role in ROLES]
+            allowed &= np.isin(self._roles[slots], codes)
+        if regions is not None:
+            codes = [
+                self._region_codes.codes[region.upper()]
+                for region in regions
+                if region.upper() in self._region_codes.codes
+            ]
+            allowed &= np.isin(self._regions[slots], codes)
+        if exclude >= 0:
+            allowed &= self._players[slots] != exclude
+        return slots[allowed]
+
+    def _candidate_slots(self, vector, k, filters):
+        if self._centroids is None:
+            return self._allowed(np.arange(self._size), *filters)
+        distances = (self._centroids * self._centroids).sum(axis=1) - 2 * (
+            self._centroids @ vector
+        )
+        order = np.argsort(distances)
+        probes = self.probes
+        while True:
+            slots = self._allowed(
+                np.concatenate([self._lists[cluster] for cluster in order[:probes]]),
+                *filters,
+            )
+            enough = len(np.unique(self._players[slots])) >= k
+            if enough or probes >= len(order):
+                return slots
+            probes *= 2
+
+    def search(self, vector, k=10, roles=None, regions=None, exclude_player=None):
+        """
+        Finds the k players with rows nearest to a vector.
+
+        Args:
+            vector (np.ndarray): Standardised stats, see player_vector.
+            k (int): Number of players returned; clamped to 1..len(self).
+            roles (Iterable of str): Roles allowed; None allows every role.
+            regions (Iterable of str): Regions allowed, ignoring case; None
+                allows every region.
+            exclude_player (str): Player left out of the results.
+
+        Returns:
+            list of Match: Nearest first, with the nearest row of each player.
+        """
+        if not len(self):
+            return []
+        k = min(max(int(k), 1), len(self))
+        vector = np.asarray(vector, dtype=np.float32)
+        exclude = self._player_codes.codes.get(exclude_player, -1)
+        slots = self._candidate_slots(vector, k, (roles, regions, exclude))
+        distances = np.sqrt(
+            np.maximum(
+                self._norms[slots]
+                - 2 * (self._vectors[slots] @ vector)
+                + vector @ vector,
+                0,
+            )
+        )
+        order = np.argsort(distances, kind="stable")
+        # The nearest row of every player, nearest players first
+        _, first = np.unique(self._players[slots[order]], return_index=True)
+        nearest = order[np.sort(first)[:k]]
+        return [
+            Match(
+                round(float(distances[i]), 4),
+                int(self._ids[slots[i]]),
+                self._player_codes.values[self._players[slots[i]]],
+            )
+            for i in nearest
+        ]
+
+    def similar(self, player, k=10, roles=None, regions=None):
+        """
+        Finds the k players whose stats are most like a player's.
+
+        Args:
+            player (str): Player name.
+            k (int): Number of players returned.
+            roles (Iterable of str): Roles allowed; None allows every role.
+            regions (Iterable of str): Regions allowed; None allows every
+                region.
+
+        Returns:
+            list of Match: Nearest first; the player is not among them.
+
+        Raises:
+            KeyError: If the index has no row of the player.
+        """
+        return self.search(
+            self.player_vector(player), k, roles, regions, exclude_player=player
+        )
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Find the players whose stats are most like a player's."
+    )
+    parser.add_argument("player", type=str, help="Name of the player.")
+    parser.add_argument("--k", type=int, default=10, help="Number of similar players.")
+    parser.add_argument(
+        "--role", type=str, default="", help="Comma-separated roles allowed."
+    )
+    parser.add_argument(
+        "--region", type=str, default="", help="Comma-separated regions allowed."
+    )
+    parser.add_argument(
+        "--db_file", type=str, default=DATABASE, help="Path to the SQLite database."
+    )
+    parser.add_argument(
+        "--exact_limit",
+        type=int,
+        default=EXACT_LIMIT,
+        help="Largest table searched exhaustively instead of through clusters.",
+    )
+    return parser.parse_args()
+
+
+def split_names(text):
+    """
+    Splits a comma-separated list; empty text gives None, meaning no filter.
+    """
+    names = [name.strip() for name in (text or "").split(",") if name.strip()]
+    return names or None
+
+
+def main():
+    # Configure logging; stdout carries the results
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+    args = parse_arguments()
+
+    try:
+        conn = sqlite3.connect(args.db_file)
+        conn.row_factory = sqlite3.Row
+        start = time.perf_counter()
+        index = SimilarityIndex.from_database(conn, exact_limit=args.exact_limit)
+        logging.info(
+            f"Indexed {len(index)} rows in {time.perf_counter() - start:.2f}s."
+        )
+
+        start = time.perf_counter()
+        try:
+            matches = index.similar(
+                args.player, args.k, split_names(args.role), split_names(args.region)
+            )
+        except KeyError:
+            logging.error(f"Unknown player: {args.player}")
+            sys.exit(1)
+        logging.info(f"Searched in {(time.perf_counter() - start) * 1000:.1f}ms.")
+
+        rows = {
+            row["id"]: dict(row)
+            for row in fetch_players_by_id(conn, [m.id for m in matches])
+        }
+        conn.close()
+    except sqlite3.Error as e:
+        logging.error(f"Error reading players: {e}")
+        sys.exit(1)
+
+    results = [
+        dict(rows[match.id], distance=match.distance)
+        for match in matches
+        if match.id in rows
+    ]
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
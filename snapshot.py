@@ -0,0 +1,274 @@
+# snapshot.py
+
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+from collections.abc import Sequence
+
+import numpy as np
+
+from player_store import ALL_COLUMNS, CATEGORICAL_COLUMNS, PlayerStore
+
+# File layout: MAGIC, the header length as a little-endian uint64, the JSON
+# header, then every array at an ALIGNMENT-byte boundary. The header holds
+# the generation, the data version and the dtype, shape and offset of each
+# array; the category strings of a column are stored as one UTF-8 blob, the
+# int64 offsets of its strings and a uint8 flag per category that is set
+# where the value is NULL (stored as an empty string in the blob).
+MAGIC = b"VTBSNAP1"
+ALIGNMENT = 64
+
+Snapshot = namedtuple("Snapshot", "store generation data_version")
+
+
+def snapshot_path(db_file):
+    """
+    Returns the snapshot file kept next to a players database.
+    """
+    return os.path.splitext(db_file)[0] + ".snapshot"
+
+
+class Strings(Sequence):
+    """
+    Read-only list of strings decoded on access from a UTF-8 blob.
+
+    Category lists of a snapshot stay in the mapped file, so workers share
+    them and opening a snapshot does not build one Python string per player.
+    Entries flagged in nulls are None.
+    """
+
+    def __init__(self, blob, offsets, nulls=None):
+        self._blob = blob
+        self._offsets = offsets
+        self._nulls = nulls
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if self._nulls is not None and self._nulls[index]:
+            return None
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._blob[start:end].tobytes().decode()
+
+
+def read_store(conn):
+    """
+    Reads the whole 'players' table and its data version in one transaction.
+
+    Returns:
+        tuple: (PlayerStore, data version).
+    """
+    in_transaction = conn.in_transaction
+    if not in_transaction:
+        conn.execute("BEGIN")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        cursor = conn.execute("SELECT * FROM players")
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+    finally:
+        if not in_transaction:
+            conn.rollback()
+    data = dict(zip(columns, zip(*rows))) if rows else {}
+    data = {column: data.get(column, ()) for column in columns or ALL_COLUMNS}
+    return PlayerStore.from_columns(data), version
+
+
+def _data_start(header_length):
+    return -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+
+def _read_header(buffer):
+    """
+    Returns the header of a snapshot and the offset of its first array.
+    """
+    if bytes(buffer[: len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a player snapshot file.")
+    (length,) = struct.unpack_from("<Q", buffer, len(MAGIC))
+    start = len(MAGIC) + 8
+    return json.loads(bytes(buffer[start : start + length])), _data_start(length)
+
+
+def read_generation(path):
+    """
+    Returns the generation of a snapshot file; 0 if there is none.
+    """
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(len(MAGIC) + 8)
+            (length,) = struct.unpack_from("<Q", prefix, len(MAGIC))
+            return _read_header(prefix + f.read(length))[0]["generation"]
+    except (OSError, ValueError, KeyError, struct.error):
+        return 0
+
+
+def write_snapshot(conn, path):
+    """
+    Writes the 'players' table as a snapshot file.
+
+    The file is written next to its destination and renamed over it, so
+    readers see either the old or the new snapshot, never a partial one.
+    The generation is one more than the replaced file's.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the players database.
+        path (str): Snapshot file to write.
+
+    Returns:
+        int: The generation of the new snapshot.
+    """
+    store, version = read_store(conn)
+    arrays = {"ids": store.ids, "map_ids": store.map_ids}
+    arrays.update({f"stats/{name}": array for name, array in store.stats.items()})
+    arrays.update({f"codes/{name}": array for name, array in store.codes.items()})
+    for column in CATEGORICAL_COLUMNS:
+        values = store.categories[column]
+        encoded = [b"" if value is None else value.encode() for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        arrays[f"categories/{column}/offsets"] = offsets
+        arrays[f"categories/{column}/blob"] = np.frombuffer(
+            b"".join(encoded), dtype=np.uint8
+        )
+        arrays[f"categories/{column}/nulls"] = np.array(
+            [value is None for value in values], dtype=np.uint8
+        )
+
+    generation = read_generation(path) + 1
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps(
+        {
+            "generation": generation,
+            "data_version": version,
+            "rows": len(store),
+            "arrays": layout,
+        }
+    ).encode()
+    data_start = _data_start(len(header))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return generation
+
+
+def load_snapshot(path):
+    """
+    Memory-maps a snapshot file.
+
+    Arrays are read-only views of the mapping, so every process mapping
+    the same file shares its pages and nothing is copied or decoded.
+
+    Args:
+        path (str): Snapshot file.
+
+    Returns:
+        Snapshot: The store, its generation and data version.
+
+    Raises:
+        OSError: If the file cannot be opened.
+        ValueError: If the file is not a snapshot.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header, data_start = _read_header(buffer)
+
+    def array(name):
+        spec = header["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        return np.frombuffer(buffer, dtype, count, data_start + spec["offset"]).reshape(
+            spec["shape"]
+        )
+
+    names = header["arrays"]
+    store = PlayerStore(
+        array("ids"),
+        {name[6:]: array(name) for name in names if name.startswith("stats/")},
+        {name[6:]: array(name) for name in names if name.startswith("codes/")},
+        {
+            column: Strings(
+                array(f"categories/{column}/blob"),
+                array(f"categories/{column}/offsets"),
+                (
+                    array(f"categories/{column}/nulls")
+                    if f"categories/{column}/nulls" in names
+                    else None
+                ),
+            )
+            for column in CATEGORICAL_COLUMNS
+        },
+        array("map_ids"),
+    )
+    return Snapshot(store, header["generation"], header["data_version"])
+
+
+class SnapshotReader:
+    """
+    Keeps the newest snapshot of a file mapped.
+
+    Every call to current costs one stat of the file; when a writer has
+    swapped in a new file, it is mapped and served from then on, while
+    callers still holding the previous store keep a valid mapping.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Snapshot file, as written by write_snapshot.
+        """
+        self.path = path
+        self._snapshot = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """
+        Returns the newest snapshot, or None when there is no valid file.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    try:
+                        self._snapshot = load_snapshot(self.path)
+                    except (OSError, ValueError):
+                        self._snapshot = None
+                    self._key = key
+        return self._snapshot
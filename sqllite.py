@@ -1,42 +1,358 @@
+import argparse
+import csv
 import sqlite3
-import pandas as pd
 import os
 import sys
+import time
 
+from roles import assign_role
+from snapshot import snapshot_path, write_snapshot
 
-def create_database(csv_file, db_file):
+
+CREATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    player TEXT NOT NULL,
+    org TEXT,
+    rds INTEGER,
+    average_combat_score REAL,
+    kill_deaths REAL,
+    average_damage_per_round REAL,
+    kills_per_round REAL,
+    assists_per_round REAL,
+    first_kills_per_round REAL,
+    first_deaths_per_round REAL,
+    headshot_percentage REAL,
+    clutch_success_percentage REAL,
+    clutch_won_played REAL,
+    total_kills INTEGER,
+    total_deaths INTEGER,
+    total_assists INTEGER,
+    total_first_kills INTEGER,
+    total_first_deaths INTEGER,
+    map_id INTEGER,
+    agent TEXT,
+    region TEXT
+);
+"""
+
+# Columns of 'players' that are loaded from CSV files
+PLAYER_COLUMNS = (
+    "player",
+    "org",
+    "rds",
+    "average_combat_score",
+    "kill_deaths",
+    "average_damage_per_round",
+    "kills_per_round",
+    "assists_per_round",
+    "first_kills_per_round",
+    "first_deaths_per_round",
+    "headshot_percentage",
+    "clutch_success_percentage",
+    "clutch_won_played",
+    "total_kills",
+    "total_deaths",
+    "total_assists",
+    "total_first_kills",
+    "total_first_deaths",
+    "map_id",
+    "agent",
+    "region",
+)
+
+# Natural key of a players row, used to upsert on reload
+NATURAL_KEY = ("player", "agent", "map_id")
+NATURAL_KEY_INDEX = "idx_players_natural_key"
+
+# Ids of the 'players' rows changed by each data version, so readers can
+# catch up without reloading the table; only the latest versions are kept
+CREATE_CHANGES_QUERY = """
+CREATE TABLE IF NOT EXISTS player_changes (
+    version INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    PRIMARY KEY (version, player_id)
+) WITHOUT ROWID
+"""
+CHANGE_LOG_VERSIONS = 100
+
+# Lookup tables normalising the repeated text columns of 'players'
+LOOKUP_TABLES = {"org": "orgs", "region": "regions", "agent": "agents"}
+
+# Indexes dropped during bulk loads and rebuilt by migrate_schema
+SECONDARY_INDEXES = (
+    "idx_players_org",
+    "idx_players_region",
+    "idx_players_agent_map",
+)
+
+INDEX_STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS idx_players_org ON players (org)",
+    "CREATE INDEX IF NOT EXISTS idx_players_region ON players (region)",
+    "CREATE INDEX IF NOT EXISTS idx_players_agent_map ON players (agent, map_id)",
+    "CREATE INDEX IF NOT EXISTS idx_player_roles_player ON player_roles (player_id)",
+)
+
+
+def migrate_schema(conn):
+    """
+    Brings the 'players' schema up to date. Safe to run after every load.
+
+    - orgs, regions and agents lookup tables, referenced from new org_id,
+      region_id and agent_id columns on 'players'
+    - indexes on (org), (region) and (agent, map_id)
+    - player_roles, a materialised role per player row based on
+      ROLE_CATEGORIES, and the players_by_role view joining it back
+
+    Args:
+        conn (sqlite3.Connection): Connection to the players database.
+    """
+    cursor = conn.cursor()
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(players)")}
+
+    for column, table in LOOKUP_TABLES.items():
+        extra = ", role TEXT" if table == "agents" else ""
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            f"(id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE{extra})"
+        )
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {table} (name) "
+            f"SELECT DISTINCT {column} FROM players WHERE {column} IS NOT NULL"
+        )
+        if f"{column}_id" not in columns:
+            cursor.execute(
+                f"ALTER TABLE players ADD COLUMN {column}_id INTEGER "
+                f"REFERENCES {table} (id)"
+            )
+        cursor.execute(
+            f"UPDATE players SET {column}_id = "
+            f"(SELECT id FROM {table} WHERE name = players.{column}) "
+            f"WHERE {column}_id IS NULL"
+        )
+
+    # Role of each agent, then the materialised per-row role table
+    agents = cursor.execute("SELECT id, name FROM agents").fetchall()
+    cursor.executemany(
+        "UPDATE agents SET role = ? WHERE id = ?",
+        [(assign_role(name), agent_id) for agent_id, name in agents],
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS player_roles (
+            role TEXT NOT NULL,
+            player_id INTEGER NOT NULL,
+            PRIMARY KEY (role, player_id)
+        ) WITHOUT ROWID
+        """
+    )
+    cursor.execute("DELETE FROM player_roles")
+    cursor.execute(
+        """
+        INSERT INTO player_roles (role, player_id)
+        SELECT agents.role, players.id
+        FROM players JOIN agents ON agents.id = players.agent_id
+        """
+    )
+    cursor.execute(
+        """
+        CREATE VIEW IF NOT EXISTS players_by_role AS
+        SELECT player_roles.role, players.*
+        FROM player_roles JOIN players ON players.id = player_roles.player_id
+        """
+    )
+
+    for statement in INDEX_STATEMENTS:
+        cursor.execute(statement)
+    cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def link_player_rows(conn, ids):
     """
-    Converts a CSV file to a SQLite database.
+    Incremental counterpart of migrate_schema for a few changed rows.
+
+    Adds their org, region and agent to the lookup tables, sets the *_id
+    columns and the player_roles entries of just these rows, so that rows
+    written outside create_database do not need a full migration.
+
+    Args:
+        conn (sqlite3.Connection): Connection to a migrated players database.
+        ids (list of int): Ids of the rows to link.
+    """
+    if not ids:
+        return
+    cursor = conn.cursor()
+    placeholders = ", ".join("?" for _ in ids)
+    for column, table in LOOKUP_TABLES.items():
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {table} (name) SELECT DISTINCT {column} "
+            f"FROM players WHERE id IN ({placeholders}) AND {column} IS NOT NULL",
+            ids,
+        )
+        cursor.execute(
+            f"UPDATE players SET {column}_id = "
+            f"(SELECT id FROM {table} WHERE name = players.{column}) "
+            f"WHERE id IN ({placeholders})",
+            ids,
+        )
+    agents = cursor.execute("SELECT id, name FROM agents WHERE role IS NULL").fetchall()
+    cursor.executemany(
+        "UPDATE agents SET role = ? WHERE id = ?",
+        [(assign_role(name), agent_id) for agent_id, name in agents],
+    )
+    cursor.execute(f"DELETE FROM player_roles WHERE player_id IN ({placeholders})", ids)
+    cursor.execute(
+        f"""
+        INSERT INTO player_roles (role, player_id)
+        SELECT agents.role, players.id
+        FROM players JOIN agents ON agents.id = players.agent_id
+        WHERE players.id IN ({placeholders})
+        """,
+        ids,
+    )
+
+
+def bump_data_version(conn, ids=None):
+    """
+    Increments the data version after 'players' rows changed.
+
+    With ids, the rows are logged in player_changes under the new version
+    and readers of the previous versions can reload just those rows.
+    Without, the version is missing from the log, which tells readers to
+    reload the whole table.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the players database.
+        ids (list of int): Ids of the inserted, updated or deleted rows.
+
+    Returns:
+        int: The new data version.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0] + 1
+    conn.execute(f"PRAGMA user_version = {version}")
+    conn.execute(CREATE_CHANGES_QUERY)
+    conn.execute(
+        "DELETE FROM player_changes WHERE version <= ?",
+        (version - CHANGE_LOG_VERSIONS,),
+    )
+    if ids is not None:
+        conn.executemany(
+            "INSERT OR IGNORE INTO player_changes (version, player_id) VALUES (?, ?)",
+            [(version, player_id) for player_id in ids],
+        )
+    return version
+
+
+def ensure_natural_key(cursor):
+    """
+    Creates the unique (player, agent, map_id) index used for upserts,
+    first removing duplicates left by older append-only loads.
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+        (NATURAL_KEY_INDEX,),
+    ).fetchone()
+    if exists:
+        return
+    removed = cursor.execute(
+        f"""
+        DELETE FROM players WHERE id NOT IN (
+            SELECT MAX(id) FROM players GROUP BY {", ".join(NATURAL_KEY)}
+        )
+        """
+    ).rowcount
+    if removed:
+        print(f"Removed {removed} duplicate records from 'players'.")
+    cursor.execute(
+        f"CREATE UNIQUE INDEX {NATURAL_KEY_INDEX} "
+        f"ON players ({', '.join(NATURAL_KEY)})"
+    )
+
+
+def _upsert_statement(columns, table_columns, incremental):
+    """
+    Builds the INSERT ... ON CONFLICT statement for the given CSV columns.
+    """
+    updated = [column for column in columns if column not in NATURAL_KEY]
+    assignments = [f"{column} = excluded.{column}" for column in updated]
+    # Lookup ids are recomputed by migrate_schema for rows that changed
+    assignments += [
+        f"{column}_id = NULL"
+        for column in LOOKUP_TABLES
+        if f"{column}_id" in table_columns
+    ]
+    statement = (
+        f"INSERT INTO players ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(NATURAL_KEY)}) DO UPDATE SET "
+        + ", ".join(assignments)
+    )
+    if incremental:
+        statement += " WHERE " + " OR ".join(
+            f"players.{column} IS NOT excluded.{column}" for column in updated
+        )
+    return statement
+
+
+def _read_chunks(reader, positions, region_position, chunk_size, counters):
+    """
+    Yields lists of at most chunk_size rows, ready for executemany.
+
+    Values stay strings; the column affinities of 'players' convert them on
+    insert. Empty fields become NULL and a missing region becomes 'UNKNOWN'.
+    """
+    chunk = []
+    for record in reader:
+        row = [record[position] or None for position in positions]
+        if region_position is not None and row[region_position] is None:
+            row[region_position] = "UNKNOWN"
+            counters["missing_regions"] += 1
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def create_database(
+    csv_file,
+    db_file,
+    chunk_size=50000,
+    incremental=False,
+    defer_indexes=True,
+    snapshot=True,
+):
+    """
+    Loads a players CSV file into a SQLite database.
+
+    The CSV is streamed in chunks and written in a single transaction with
+    executemany, so memory stays bounded whatever the file size. Rows are
+    upserted on (player, agent, map_id): loading the same file again does
+    not duplicate players. Rows missing from the file are kept.
 
     Args:
         csv_file (str): Path to the input CSV file.
         db_file (str): Path to the output SQLite database file.
+        chunk_size (int): Rows read and inserted per batch.
+        incremental (bool): Only write rows whose values changed; unchanged
+            rows are skipped and an unchanged file leaves the data version
+            as it was.
+        defer_indexes (bool): Drop the secondary indexes during the load and
+            rebuild them afterwards, which is faster for large files.
+        snapshot (bool): Write the memory-mapped snapshot of 'players' that
+            the app's workers share (see snapshot.write_snapshot) when the
+            data changed or there is none yet.
+
+    Returns:
+        int: Number of rows inserted or updated.
     """
     # Check if CSV file exists
     if not os.path.exists(csv_file):
         print(f"Error: CSV file '{csv_file}' does not exist.")
         sys.exit(1)
 
-    # Read CSV into DataFrame
-    try:
-        df = pd.read_csv(csv_file)
-        print(f"Successfully read '{csv_file}'.")
-    except Exception as e:
-        print(f"Error reading CSV file: {e}")
-        sys.exit(1)
-
-    # Data Validation: Check for missing 'region' values
-    missing_regions = df["region"].isnull().sum()
-    if missing_regions > 0:
-        print(
-            f"Warning: {missing_regions} records have missing 'region' values. Filling with 'UNKNOWN'."
-        )
-        df["region"] = df["region"].fillna("UNKNOWN")
-
-    # Display first few rows for verification
-    print("First few rows of the CSV data:")
-    print(df.head())
-
     # Connect to SQLite database (creates it if not exists)
     try:
         conn = sqlite3.connect(db_file)
@@ -47,35 +363,9 @@ def create_database(csv_file, db_file):
         sys.exit(1)
 
     # Create 'players' table
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS players (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        player TEXT NOT NULL,
-        org TEXT,
-        rds INTEGER,
-        average_combat_score REAL,
-        kill_deaths REAL,
-        average_damage_per_round REAL,
-        kills_per_round REAL,
-        assists_per_round REAL,
-        first_kills_per_round REAL,
-        first_deaths_per_round REAL,
-        headshot_percentage REAL,
-        clutch_success_percentage REAL,
-        clutch_won_played REAL,
-        total_kills INTEGER,
-        total_deaths INTEGER,
-        total_assists INTEGER,
-        total_first_kills INTEGER,
-        total_first_deaths INTEGER,
-        map_id INTEGER,
-        agent TEXT,
-        region TEXT
-    );
-    """
-
     try:
-        cursor.execute(create_table_query)
+        cursor.execute(CREATE_TABLE_QUERY)
+        ensure_natural_key(cursor)
         conn.commit()
         print("Table 'players' is ready.")
     except Exception as e:
@@ -83,30 +373,151 @@ def create_database(csv_file, db_file):
         conn.close()
         sys.exit(1)
 
-    # Insert data into 'players' table using pandas to_sql
+    # Stream the CSV into 'players' inside one transaction
+    counters = {"missing_regions": 0}
+    rows_read = 0
+    start = time.perf_counter()
+    try:
+        with open(csv_file, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            columns = [column for column in header if column in PLAYER_COLUMNS]
+            missing = [column for column in NATURAL_KEY if column not in columns]
+            if missing:
+                raise ValueError(f"CSV file is missing columns {missing}")
+            positions = [header.index(column) for column in columns]
+            region_position = columns.index("region") if "region" in columns else None
+
+            table_columns = {
+                row[1] for row in cursor.execute("PRAGMA table_info(players)")
+            }
+            statement = _upsert_statement(columns, table_columns, incremental)
+
+            cursor.execute("PRAGMA synchronous = OFF")
+            if defer_indexes:
+                for name in SECONDARY_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+            changes_before = conn.total_changes
+            for chunk in _read_chunks(
+                reader, positions, region_position, chunk_size, counters
+            ):
+                cursor.executemany(statement, chunk)
+                rows_read += len(chunk)
+            changed = conn.total_changes - changes_before
+        conn.commit()
+        cursor.execute("PRAGMA synchronous = FULL")
+    except Exception as e:
+        print(f"Error inserting data into table: {e}")
+        conn.rollback()
+        conn.close()
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - start
+    if counters["missing_regions"]:
+        print(
+            f"Warning: {counters['missing_regions']} records have missing 'region' values. Filled with 'UNKNOWN'."
+        )
+    print(
+        f"Read {rows_read} records in {elapsed:.2f}s "
+        f"({rows_read / max(elapsed, 1e-9):,.0f} rows/s); "
+        f"{changed} inserted or updated in 'players' table."
+    )
+
+    # Refresh lookup tables, indexes and the per-role table
     try:
-        # Replace NaN with None for SQLite compatibility
-        df = df.where(pd.notnull(df), None)
+        migrate_schema(conn)
+        print("Schema migration completed.")
+    except Exception as e:
+        print(f"Error migrating schema: {e}")
+        conn.close()
+        sys.exit(1)
 
-        df.to_sql("players", conn, if_exists="append", index=False)
-        print(f"Successfully inserted {len(df)} records into 'players' table.")
+    try:
+        # Bump the data version so caches keyed on it drop stale rosters
+        if changed:
+            version = bump_data_version(conn)
+            conn.commit()
+            print(f"Data version is now {version}.")
+
+        # Let the app's readers keep querying while the next load writes
+        cursor.execute("PRAGMA journal_mode=WAL")
     except Exception as e:
         print(f"Error inserting data into table: {e}")
         conn.close()
         sys.exit(1)
 
+    path = snapshot_path(db_file)
+    if snapshot and (changed or not os.path.exists(path)):
+        # The load is committed; without a current snapshot the app reads
+        # SQLite instead, so a failure here does not fail the load
+        try:
+            generation = write_snapshot(conn, path)
+            print(f"Snapshot '{path}' is now at generation {generation}.")
+        except Exception as e:
+            print(f"Warning: snapshot '{path}' not written: {e}")
+
     # Close the connection
     conn.close()
     print("Database connection closed.")
+    return changed
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments containing the CSV and database paths and load options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Load VALORANT player data into SQLite."
+    )
+    parser.add_argument(
+        "--csv_file",
+        type=str,
+        default="players.csv",  # Ensure this is the path to your CSV file
+        help="Path to the input CSV file.",
+    )
+    parser.add_argument(
+        "--db_file",
+        type=str,
+        default="valorant_players.db",  # Desired SQLite DB file
+        help="Path to the output SQLite database file.",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=50000,
+        help="Rows read and inserted per batch.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only write rows whose values changed.",
+    )
+    parser.add_argument(
+        "--no_snapshot",
+        action="store_true",
+        help="Do not write the memory-mapped snapshot for the app.",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    # Define file paths
-    csv_file = "players.csv"  # Ensure this is the path to your CSV file
-    db_file = "valorant_players.db"  # Desired SQLite DB file
+    args = parse_arguments()
+    csv_file = args.csv_file
+    db_file = args.db_file
 
     # Call the function to create the database
-    create_database(csv_file, db_file)
+    create_database(
+        csv_file,
+        db_file,
+        chunk_size=args.chunk_size,
+        incremental=args.incremental,
+        defer_indexes=not args.incremental,
+        snapshot=not args.no_snapshot,
+    )
     conn = sqlite3.connect(db_file)
     cursor = conn.cursor()
 
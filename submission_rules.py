@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Team submission types declared as data.
+
+Each type is one entry of a JSON rules file (submission_rules.json, or the
+file named by SUBMISSION_RULES):
+
+    {
+        "name": "Cross-Regional Team Submission",
+        "description": "Players from at least three of the listed regions",
+        "filters": {"region": ["Japan", "Russia", "China", "ME", "LATAM"]},
+        "min_regions": 3,
+        "min_org_players": {"OrgZ": 1},
+        "min_role_players": {"Duelist": 2}
+    }
+
+"filters" selects the candidate players by org and/or region and compiles
+to one query over the indexed columns; the minimums are roster quotas the
+optimizer enforces while it searches. Role minimums count each player in
+the first role of its agent (roles.assign_role). A new type only needs a
+new entry.
+
+Usage (checks a rules file and shows each compiled query and its plan):
+    python submission_rules.py --rules submission_rules.json --database valorant_players.db
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+from player_store import ROLES
+from roles import ROLE_CATEGORIES
+
+RULES_FILE = os.getenv(
+    "SUBMISSION_RULES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "submission_rules.json"),
+)
+
+# Columns a rule may filter on; both are indexed by sqllite.INDEX_STATEMENTS
+FILTER_COLUMNS = ("org", "region")
+
+RULE_KEYS = {
+    "name",
+    "description",
+    "filters",
+    "min_regions",
+    "min_org_players",
+    "min_role_players",
+}
+
+
+def _count(value, what):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(f"{what} must be a non-negative integer, got {value!r}.")
+    return value
+
+
+def _counts(value, what):
+    if not isinstance(value, dict):
+        raise ValueError(f"{what} must be an object of name -> count.")
+    return {str(key): _count(count, f"{what}[{key!r}]") for key, count in value.items()}
+
+
+class SubmissionRule:
+    """
+    One team submission type: which players are candidates and what a
+    roster must contain.
+    """
+
+    def __init__(
+        self,
+        name,
+        description="",
+        filters=None,
+        min_regions=0,
+        min_org_players=None,
+        min_role_players=None,
+    ):
+        """
+        Args:
+            name (str): Team submission type, as shown to users.
+            description (str): What the type selects.
+            filters (dict): "org" and/or "region" -> allowed values.
+            min_regions (int): Minimum number of distinct regions on the roster.
+            min_org_players (dict): Minimum number of players per organization.
+            min_role_players (dict): Minimum number of players per role.
+
+        Raises:
+            ValueError: If the rule is malformed or cannot be satisfied.
+        """
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError("A rule needs a non-empty name.")
+        self.name = name
+        self.description = description
+        where = f"Rule {name!r}"
+
+        filters = filters or {}
+        if not isinstance(filters, dict):
+            raise ValueError(f"{where}: filters must be an object.")
+        self.filters = {}
+        for column, values in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(
+                    f"{where}: cannot filter on {column!r}; use {FILTER_COLUMNS}."
+                )
+            if isinstance(values, str):
+                values = [values]
+            if not values or not all(isinstance(value, str) for value in values):
+                raise ValueError(f"{where}: {column} needs a list of names.")
+            self.filters[column] = tuple(values)
+
+        self.min_regions = _count(min_regions, f"{where}: min_regions")
+        self.min_org_players = _counts(
+            min_org_players or {}, f"{where}: min_org_players"
+        )
+        self.min_role_players = _counts(
+            min_role_players or {}, f"{where}: min_role_players"
+        )
+        for role in self.min_role_players:
+            if role not in ROLE_CATEGORIES:
+                raise ValueError(
+                    f"{where}: unknown role {role!r}; use {list(ROLE_CATEGORIES)}."
+                )
+        orgs = self.filters.get("org")
+        for org, count in self.min_org_players.items():
+            if count and orgs is not None and org not in orgs:
+                raise ValueError(
+                    f"{where}: quota on {org!r}, which its filter excludes."
+                )
+        regions = self.filters.get("region")
+        if regions is not None and self.min_regions > len(
+            {region.upper() for region in regions}
+        ):
+            raise ValueError(f"{where}: min_regions exceeds the regions it allows.")
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Builds a rule from one entry of a rules file.
+
+        Raises:
+            ValueError: If the entry is malformed.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Every rule must be an object.")
+        unknown = set(data) - RULE_KEYS
+        if unknown:
+            raise ValueError(
+                f"Rule {data.get('name')!r}: unknown keys {sorted(unknown)}."
+            )
+        return cls(**data)
+
+    def query(self):
+        """
+        Compiles the filters to a parameterised statement.
+
+        Values of one column are OR'ed with IN and columns are AND'ed, so
+        SQLite serves the statement from the org or region index.
+
+        Returns:
+            tuple: (SQL text, parameters).
+        """
+        clauses = []
+        params = []
+        for column in FILTER_COLUMNS:
+            values = self.filters.get(column)
+            if values is None:
+                continue
+            clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        sql = "SELECT * FROM players"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return sql, tuple(params)
+
+    def constraints(self):
+        """
+        Returns the roster quotas in the keyword form of
+        team_optimizer.optimize_team, omitting the ones the rule leaves unset.
+        """
+        constraints = {}
+        if self.min_regions:
+            constraints["min_regions"] = self.min_regions
+        if self.min_org_players:
+            constraints["min_org_players"] = dict(self.min_org_players)
+        if self.min_role_players:
+            constraints["min_role_players"] = dict(self.min_role_players)
+        return constraints
+
+    def check(self, store, mask=None):
+        """
+        Tells whether the candidates could meet the rule's quotas at all.
+
+        Counts distinct players per organization and role and distinct
+        regions with array operations, so a hopeless request is rejected
+        before the roster search runs.
+
+        Args:
+            store (PlayerStore): Candidate players, already filtered.
+            mask (np.ndarray): Rows eligible for the roster. Defaults to all rows.
+
+        Returns:
+            str: Why no roster can satisfy the rule, or None if one may.
+        """
+        if mask is None:
+            mask = np.ones(len(store), dtype=bool)
+        players = store.codes["player"][mask].astype(np.int64)
+        width = int(players.max()) + 1 if len(players) else 1
+
+        def distinct_players(codes, size):
+            pairs = np.unique(codes.astype(np.int64) * width + players)
+            return np.bincount(pairs // width, minlength=size)
+
+        if self.min_org_players:
+            by_org = distinct_players(
+                store.codes["org"][mask], len(store.categories["org"])
+            )
+            index = {org: code for code, org in enumerate(store.categories["org"])}
+            for org, count in self.min_org_players.items():
+                found = by_org[index[org]] if org in index else 0
+                if found < count:
+                    return (
+                        f"Not enough players from {org} to build a team "
+                        f"for {self.name} ({found} of {count})."
+                    )
+
+        if self.min_regions:
+            found = store.count_distinct("region", mask=mask, upper=True)
+            if found < self.min_regions:
+                return (
+                    f"Not enough players from different regions to build a team "
+                    f"for {self.name} ({found} of {self.min_regions})."
+                )
+
+        if self.min_role_players:
+            by_role = distinct_players(store.role_codes[mask], len(ROLES))
+            for role, count in self.min_role_players.items():
+                found = by_role[ROLES.index(role)]
+                if found < count:
+                    return (
+                        f"Not enough {role} players to build a team "
+                        f"for {self.name} ({found} of {count})."
+                    )
+        return None
+
+
+def load_rules(path=RULES_FILE):
+    """
+    Reads a rules file.
+
+    Args:
+        path (str): JSON file holding a list of rules.
+
+    Returns:
+        dict: Team submission type -> SubmissionRule, in file order.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file or a rule is malformed, or names repeat.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"{path} must hold a non-empty list of rules.")
+    rules = {}
+    for entry in data:
+        rule = SubmissionRule.from_dict(entry)
+        if rule.name in rules:
+            raise ValueError(f"Rule {rule.name!r} is declared twice.")
+        rules[rule.name] = rule
+    return rules
+
+
+RULES = load_rules()
+
+
+def parse_arguments():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        args: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Check a submission rules file and show its compiled queries."
+    )
+    parser.add_argument(
+        "--rules", type=str, default=RULES_FILE, help="Path to the rules file."
+    )
+    parser.add_argument(
+        "--database",
+        type=str,
+        default=None,
+        help="Optional players database to show each query plan.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+    args = parse_arguments()
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as e:
+        logging.error(f"Invalid rules file {args.rules}: {e}")
+        sys.exit(1)
+
+    conn = None
+    if args.database:
+        from db import explain_query_plan
+
+        conn = sqlite3.connect(args.database)
+    try:
+        for rule in rules.values():
+            sql, params = rule.query()
+            logging.info(f"{rule.name}: {sql} {list(params)}")
+            if rule.constraints():
+                logging.info(f"    quotas: {rule.constraints()}")
+            if conn is not None:
+                for detail in explain_query_plan(conn, sql, params):
+                    logging.info(f"    plan: {detail}")
+    except sqlite3.Error as e:
+        logging.error(f"Could not explain the queries: {e}")
+        sys.exit(1)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+# synergy.py
+
+import functools
+import itertools
+
+import numpy as np
+
+from roles import AGENT_ROLES, ROLE_CATEGORIES
+
+# Agents in a fixed order; agents outside ROLE_CATEGORIES share the last index
+AGENTS = tuple(AGENT_ROLES)
+AGENT_INDEX = {agent: index for index, agent in enumerate(AGENTS)}
+UNKNOWN_AGENT = len(AGENTS)
+
+ROLE_NAMES = tuple(ROLE_CATEGORIES)
+
+# Bit i is set when the agent can fill ROLE_NAMES[i]
+ROLE_BITS = np.array(
+    [
+        sum(1 << ROLE_NAMES.index(role) for role in AGENT_ROLES[agent])
+        for agent in AGENTS
+    ]
+    + [0],
+    dtype=np.uint8,
+)
+
+# Every subset of the roles as a bit mask, with its size; used to count the
+# roles a composition covers through Hall's theorem
+_ROLE_SUBSETS = np.arange(1 << len(ROLE_NAMES), dtype=np.uint8)
+_SUBSET_SIZES = np.array(
+    [bin(subset).count("1") for subset in range(1 << len(ROLE_NAMES))]
+)
+
+# Coverage only depends on how many agents have each distinct role mask, so
+# it is tabulated for every such count up to a full team
+TABLE_TEAM_SIZE = 5
+_MASKS, _AGENT_CLASSES = np.unique(ROLE_BITS, return_inverse=True)
+_CLASS_WEIGHTS = (TABLE_TEAM_SIZE + 1) ** np.arange(len(_MASKS), dtype=np.int64)
+
+# Rows of the per-map table: map_id 1-7 as numbered by match_pipeline.MAP_IDS
+# (not imported: it needs ijson and configures logging), 0 for unknown maps
+NUM_MAPS = 8
+
+# Prior synergy of two agents by role: different roles complement each other,
+# two duelists or two controllers compete for the same job
+ROLE_PAIR_PRIOR = {
+    ("Duelist", "Duelist"): -0.15,
+    ("Controller", "Controller"): -0.2,
+    ("Sentinel", "Sentinel"): -0.1,
+    ("Initiator", "Initiator"): 0.0,
+}
+COMPLEMENT_PRIOR = 0.1
+
+# Synergy of an agent with itself: the game forbids picking an agent twice
+DUPLICATE_PENALTY = -10.0
+
+
+def agent_indices(agents):
+    """
+    Maps agent names to their index in AGENTS.
+
+    Args:
+        agents (Iterable of str): Agent names.
+
+    Returns:
+        np.ndarray: int64 indices; UNKNOWN_AGENT for unknown names.
+    """
+    return np.fromiter(
+        (AGENT_INDEX.get(agent, UNKNOWN_AGENT) for agent in agents), dtype=np.int64
+    )
+
+
+def _hall_coverage(bits):
+    """
+    Roles covered by rows of role masks: all roles minus the largest
+    deficit |S| - |agents able to fill a role of S| over role subsets S.
+    """
+    fillers = ((bits[:, :, None] & _ROLE_SUBSETS) != 0).sum(axis=1)
+    return len(ROLE_NAMES) - np.maximum(_SUBSET_SIZES - fillers, 0).max(axis=1)
+
+
+@functools.lru_cache(maxsize=None)
+def coverage_table():
+    """
+    Roles covered by every count of agents per role-mask class, built on
+    first use; _CLASS_WEIGHTS turns the counts into the index.
+    """
+    table = np.zeros((TABLE_TEAM_SIZE + 1) ** len(_MASKS), dtype=np.int8)
+    for counts in itertools.product(range(TABLE_TEAM_SIZE + 1), repeat=len(_MASKS)):
+        if sum(counts) > TABLE_TEAM_SIZE:
+            continue
+        bits = np.repeat(_MASKS, counts)
+        table[np.dot(counts, _CLASS_WEIGHTS)] = _hall_coverage(bits[None, :])[0]
+    return table
+
+
+def role_coverage(agents):
+    """
+    Counts the distinct roles compositions can cover, one role per agent.
+
+    Multi-role agents count for whichever role helps most, e.g. Viper
+    covers Controller when the team already has a Sentinel.
+
+    Args:
+        agents (np.ndarray): (n, team size) agent indices.
+
+    Returns:
+        np.ndarray: Roles covered by each composition, 0 to len(ROLE_NAMES).
+    """
+    if agents.shape[1] > TABLE_TEAM_SIZE:
+        return _hall_coverage(ROLE_BITS[agents])
+    return coverage_table()[_CLASS_WEIGHTS[_AGENT_CLASSES[agents]].sum(axis=1)]
+
+
+def _prior_pairs():
+    """
+    Role-based synergy of every pair of agents.
+    """
+    size = len(AGENTS) + 1
+    pair = np.zeros((size, size), dtype=np.float32)
+    for i, first in enumerate(AGENTS):
+        for j, second in enumerate(AGENTS):
+            # A multi-role agent plays whichever role suits the pair best
+            pair[i, j] = max(
+                ROLE_PAIR_PRIOR.get((a, b), COMPLEMENT_PRIOR if a != b else 0.0)
+                for a in AGENT_ROLES[first]
+                for b in AGENT_ROLES[second]
+            )
+    np.fill_diagonal(pair, DUPLICATE_PENALTY)
+    pair[UNKNOWN_AGENT, :] = pair[:, UNKNOWN_AGENT] = 0.0
+    return pair
+
+
+class SynergyModel:
+    """
+    Dense lookup tables scoring agent compositions.
+
+    pair[i, j] is the synergy of agents i and j on one team, and
+    maps[m, i] the value of agent i on map m. Scoring a composition is a
+    gather from each table plus the role coverage, so whole arrays of
+    compositions are scored at once.
+    """
+
+    def __init__(self, pair, maps, coverage_weight=0.5):
+        """
+        Args:
+            pair (np.ndarray): (agents + 1, agents + 1) symmetric synergies.
+            maps (np.ndarray): (NUM_MAPS, agents + 1) agent values per map.
+            coverage_weight (float): Score of each role the composition covers.
+        """
+        self.pair = np.asarray(pair, dtype=np.float32)
+        self.maps = np.asarray(maps, dtype=np.float32)
+        self.coverage_weight = coverage_weight
+
+    @classmethod
+    def prior(cls, **options):
+        """
+        Builds the model from role complementarity alone, with no map effects.
+        """
+        return cls(_prior_pairs(), np.zeros((NUM_MAPS, len(AGENTS) + 1)), **options)
+
+    @classmethod
+    def from_database(cls, conn, shrinkage=20.0, **options):
+        """
+        Estimates the tables from the players and match data.
+
+        Map values are the mean ACS of each agent on each map, standardised
+        over all rows of 'players'. Pair synergies are the round win rates
+        of teams fielding both agents, from the match_pipeline tables when
+        they exist. Both are shrunk towards the role prior, weighted by
+        their sample size against shrinkage.
+
+        Args:
+            conn (sqlite3.Connection): Connection to the players database.
+            shrinkage (float): Samples worth as much as the prior.
+            **options: SynergyModel options.
+
+        Returns:
+            SynergyModel: The model.
+        """
+        model = cls.prior(**options)
+
+        mean, std = conn.execute(
+            "SELECT AVG(average_combat_score), "
+            "AVG(average_combat_score * average_combat_score) FROM players"
+        ).fetchone()
+        if mean is not None:
+            std = max((std - mean * mean) ** 0.5, 1e-9)
+            for map_id, agent, acs, count in conn.execute(
+                "SELECT map_id, agent, AVG(average_combat_score), COUNT(*) "
+                "FROM players WHERE average_combat_score IS NOT NULL "
+                "GROUP BY map_id, agent"
+            ):
+                if map_id is None or not 0 <= map_id < NUM_MAPS:
+                    continue
+                weight = count / (count + shrinkage)
+                index = AGENT_INDEX.get(agent, UNKNOWN_AGENT)
+                model.maps[map_id, index] = weight * (acs - mean) / std
+
+        has_matches = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'round_player_stats'"
+        ).fetchone()
+        if has_matches:
+            wins = np.zeros_like(model.pair, dtype=np.float64)
+            rounds = np.zeros_like(wins)
+            teams = conn.execute(
+                """
+                SELECT match_players.match_id, match_players.team_id,
+                    GROUP_CONCAT(DISTINCT match_players.agent),
+                    SUM(round_stats.won), COUNT(*)
+                FROM match_players
+                JOIN round_player_stats AS round_stats
+                    ON round_stats.match_id = match_players.match_id
+                    AND round_stats.puuid = match_players.puuid
+                GROUP BY match_players.match_id, match_players.team_id
+                """
+            )
+            for _, _, agents, won, played in teams:
+                indices = np.unique(agent_indices((agents or "").split(",")))
+                # Per-player round counts, so divide by the team size
+                size = max(len(indices), 1)
+                wins[np.ix_(indices, indices)] += won / size
+                rounds[np.ix_(indices, indices)] += played / size
+            observed = rounds > 0
+            weight = rounds / (rounds + shrinkage)
+            synergy = np.where(observed, wins / np.maximum(rounds, 1) - 0.5, 0.0)
+            off_diagonal = ~np.eye(len(wins), dtype=bool)
+            blended = (1 - weight) * model.pair + weight * synergy
+            model.pair[off_diagonal] = blended[off_diagonal]
+        return model
+
+    def save(self, path):
+        """
+        Writes the tables to a .npz file.
+        """
+        np.savez(
+            path, pair=self.pair, maps=self.maps, coverage_weight=self.coverage_weight
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a model written by save.
+        """
+        with np.load(path) as data:
+            return cls(data["pair"], data["maps"], float(data["coverage_weight"]))
+
+    def score_many(self, agents, map_ids=0):
+        """
+        Scores many compositions at once.
+
+        Args:
+            agents (np.ndarray): (n, 5) agent indices, see agent_indices.
+            map_ids (int or np.ndarray): Map of every composition, shape
+                (n,), or of every slot, shape (n, 5).
+
+        Returns:
+            np.ndarray: float32 score of each composition.
+        """
+        agents = np.asarray(agents)
+        map_ids = np.asarray(map_ids)
+        if map_ids.ndim == 1:
+            map_ids = map_ids[:, None]
+        # Every pair of slots once; a repeated agent meets itself and gets
+        # the diagonal's penalty
+        first, second = np.triu_indices(agents.shape[1], k=1)
+        pairs = self.pair[agents[:, first], agents[:, second]].sum(axis=1)
+        return (
+            pairs
+            + self.maps[map_ids, agents].sum(axis=1)
+            + self.coverage_weight * role_coverage(agents)
+        ).astype(np.float32)
+
+    def score(self, agents, map_id=0):
+        """
+        Scores one composition.
+
+        Args:
+            agents (Iterable of str): Agent names.
+            map_id (int): Map the composition plays on; 0 for any map.
+
+        Returns:
+            float: The composition score.
+        """
+        indices = agent_indices(agents)[None, :]
+        return float(self.score_many(indices, np.array([map_id]))[0])
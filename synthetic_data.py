@@ -4,15 +4,18 @@ Script to generate synthetic VALORANT player data and export it as a CSV file.
 
 Usage:
     python generate_synthetic_valorant_data.py --output_csv synthetic_valorant_players.csv --num_players 1000
+    python synthetic_data.py --output_csv players.parquet --num_players 10000000 --seed 1
 """
 
-import pandas as pd
 import numpy as np
-from faker import Faker
 import argparse
-import random
+import contextlib
+import functools
 import logging
+import os
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -27,7 +30,7 @@ def parse_arguments():
     Parses command-line arguments.
 
     Returns:
-        args: Parsed arguments containing output CSV path and number of players.
+        args: Parsed arguments containing output path, number of players and generation options.
     """
     parser = argparse.ArgumentParser(
         description="Generate synthetic VALORANT player data."
@@ -44,6 +47,30 @@ def parse_arguments():
         default=1000,
         help="Number of synthetic players to generate.",
     )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=1000000,
+        help="Players generated and written per block.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the random generator.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes generating blocks; defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("csv", "parquet"),
+        default=None,
+        help="Output format; inferred from the file extension by default.",
+    )
 
     args = parser.parse_args()
     return args
@@ -64,21 +91,6 @@ def get_agents_by_role():
     }
 
 
-def get_random_agent(agents_by_role):
-    """
-    Randomly selects an agent from the provided agents dictionary, ensuring role distribution.
-
-    Args:
-        agents_by_role (dict): Agents categorized by role.
-
-    Returns:
-        tuple: Selected agent and their role.
-    """
-    role = random.choice(list(agents_by_role.keys()))
-    agent = random.choice(agents_by_role[role])
-    return agent, role
-
-
 def get_organizations():
     """
     Returns a list of fictional VALORANT organizations.
@@ -141,183 +153,303 @@ def get_regions():
     ]
 
 
-def generate_player_data(num_players):
+# Distribution of each per-round statistic by role: ("normal", mean, std)
+# or ("uniform", low, high). These ranges can be adjusted to better simulate
+# realistic data; "Undefined" holds the defaults for agents without a role.
+ROLE_STAT_DISTRIBUTIONS = {
+    "Duelist": {
+        "average_combat_score": ("normal", 300, 30),
+        "kill_deaths": ("normal", 1.5, 0.3),
+        "average_damage_per_round": ("normal", 180, 20),
+        "kills_per_round": ("normal", 1.5, 0.3),
+        "assists_per_round": ("normal", 0.3, 0.1),
+        "first_kills_per_round": ("uniform", 0.1, 0.4),
+        "first_deaths_per_round": ("uniform", 0.0, 0.2),
+        "headshot_percentage": ("uniform", 25, 55),
+        "clutch_success_percentage": ("uniform", 15, 65),
+    },
+    "Sentinel": {
+        "average_combat_score": ("normal", 290, 25),
+        "kill_deaths": ("normal", 1.2, 0.25),
+        "average_damage_per_round": ("normal", 160, 15),
+        "kills_per_round": ("normal", 0.8, 0.2),
+        "assists_per_round": ("normal", 0.5, 0.15),
+        "first_kills_per_round": ("uniform", 0.0, 0.3),
+        "first_deaths_per_round": ("uniform", 0.0, 0.25),
+        "headshot_percentage": ("uniform", 20, 50),
+        "clutch_success_percentage": ("uniform", 10, 60),
+    },
+    "Controller": {
+        "average_combat_score": ("normal", 295, 28),
+        "kill_deaths": ("normal", 1.3, 0.28),
+        "average_damage_per_round": ("normal", 170, 18),
+        "kills_per_round": ("normal", 0.9, 0.25),
+        "assists_per_round": ("normal", 0.4, 0.12),
+        "first_kills_per_round": ("uniform", 0.05, 0.25),
+        "first_deaths_per_round": ("uniform", 0.0, 0.15),
+        "headshot_percentage": ("uniform", 15, 45),
+        "clutch_success_percentage": ("uniform", 10, 55),
+    },
+    "Initiator": {
+        "average_combat_score": ("normal", 305, 32),
+        "kill_deaths": ("normal", 1.4, 0.35),
+        "average_damage_per_round": ("normal", 175, 22),
+        "kills_per_round": ("normal", 1.0, 0.25),
+        "assists_per_round": ("normal", 0.6, 0.18),
+        "first_kills_per_round": ("uniform", 0.15, 0.35),
+        "first_deaths_per_round": ("uniform", 0.05, 0.2),
+        "headshot_percentage": ("uniform", 20, 50),
+        "clutch_success_percentage": ("uniform", 20, 70),
+    },
+    "Undefined": {
+        "average_combat_score": ("normal", 280, 25),
+        "kill_deaths": ("normal", 1.0, 0.3),
+        "average_damage_per_round": ("normal", 150, 20),
+        "kills_per_round": ("normal", 0.7, 0.2),
+        "assists_per_round": ("normal", 0.3, 0.1),
+        "first_kills_per_round": ("uniform", 0.0, 0.2),
+        "first_deaths_per_round": ("uniform", 0.0, 0.1),
+        "headshot_percentage": ("uniform", 10, 40),
+        "clutch_success_percentage": ("uniform", 5, 50),
+    },
+}
+
+# Decimal places each statistic is rounded to
+STAT_DECIMALS = {
+    "average_combat_score": 1,
+    "kill_deaths": 2,
+    "average_damage_per_round": 1,
+    "kills_per_round": 2,
+    "assists_per_round": 2,
+    "first_kills_per_round": 2,
+    "first_deaths_per_round": 2,
+    "headshot_percentage": 1,
+    "clutch_success_percentage": 1,
+}
+
+# Per-round statistic behind each total
+TOTAL_COLUMNS = {
+    "total_kills": "kills_per_round",
+    "total_deaths": "kill_deaths",
+    "total_assists": "assists_per_round",
+    "total_first_kills": "first_kills_per_round",
+    "total_first_deaths": "first_deaths_per_round",
+}
+
+MAPS = ["Bind", "Haven", "Split", "Ascent", "Icebox", "Breeze", "Fracture"]
+
+# Size of the pool of name stems; a running number makes each name unique
+NAME_STEMS = 1000
+
+
+@functools.lru_cache(maxsize=None)
+def get_name_stems(seed, count=NAME_STEMS):
+    """
+    Generates a pool of user-name stems.
+
+    Args:
+        seed (int): Seed of the name generator.
+        count (int): Number of stems.
+
+    Returns:
+        np.ndarray: Capitalized stems.
+    """
+    # Faker is slow to import and only needed for the stems
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    return np.array(
+        [
+            fake.user_name().replace(".", "").replace("_", "").capitalize()
+            for _ in range(count)
+        ]
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_stat_parameters():
+    """
+    Gathers the distribution parameters of each statistic into arrays.
+
+    Returns:
+        tuple: Role names, and a dict mapping each statistic to its
+        distribution kind and two parameter arrays indexed by role code.
+    """
+    roles = list(get_agents_by_role())
+    parameters = {}
+    for column in STAT_DECIMALS:
+        kinds = {ROLE_STAT_DISTRIBUTIONS[role][column][0] for role in roles}
+        if len(kinds) != 1:
+            raise ValueError(f"Roles use different distributions for {column}")
+        parameters[column] = (
+            kinds.pop(),
+            np.array([ROLE_STAT_DISTRIBUTIONS[role][column][1] for role in roles]),
+            np.array([ROLE_STAT_DISTRIBUTIONS[role][column][2] for role in roles]),
+        )
+    return roles, parameters
+
+
+def generate_player_data(num_players, seed=0, block=0, first_number=0):
     """
     Generates synthetic player data.
 
+    Every column is drawn with one NumPy call, with the per-role
+    distribution parameters gathered by role code. Names are a random stem
+    followed by the player's running number, so they are unique without
+    tracking the names already used.
+
     Args:
         num_players (int): Number of players to generate.
+        seed (int): Seed of the random generator.
+        block (int): Index of the block when a dataset is generated in
+            several calls; each block draws from its own stream.
+        first_number (int): Running number of the first player.
 
     Returns:
         pd.DataFrame: DataFrame containing synthetic player data.
     """
-    logging.info(f"Generating synthetic data for {num_players} players...")
-    fake = Faker()
-    Faker.seed(0)
-    np.random.seed(0)
-    random.seed(0)
-
+    rng = np.random.default_rng([seed, block])
+    roles, parameters = get_stat_parameters()
     agents_by_role = get_agents_by_role()
-    organizations = get_organizations()
-    regions = get_regions()
-    maps = ["Bind", "Haven", "Split", "Ascent", "Icebox", "Breeze", "Fracture"]
-    map_ids = {map_name: idx + 1 for idx, map_name in enumerate(maps)}
-
+    agents = np.array([agent for role in roles for agent in agents_by_role[role]])
+    agent_counts = np.array([len(agents_by_role[role]) for role in roles])
+    agent_offsets = np.concatenate(([0], np.cumsum(agent_counts)[:-1]))
+    organizations = np.array(get_organizations())
+    regions = np.array(get_regions())
+    stems = get_name_stems(seed)
+
+    # Assign agent and role
+    role_codes = rng.integers(0, len(roles), num_players)
+    agent_index = agent_offsets[role_codes] + (
+        rng.random(num_players) * agent_counts[role_codes]
+    ).astype(np.int64)
+
+    numbers = np.arange(first_number, first_number + num_players).astype(str)
     data = {
-        "player": [],
-        "org": [],
-        "rds": [],
-        "average_combat_score": [],
-        "kill_deaths": [],
-        "average_damage_per_round": [],
-        "kills_per_round": [],
-        "assists_per_round": [],
-        "first_kills_per_round": [],
-        "first_deaths_per_round": [],
-        "headshot_percentage": [],
-        "clutch_success_percentage": [],
-        "clutch_won_played": [],
-        "total_kills": [],
-        "total_deaths": [],
-        "total_assists": [],
-        "total_first_kills": [],
-        "total_first_deaths": [],
-        "map_id": [],
-        "agent": [],
-        "region": [],
+        "player": np.char.add(stems[rng.integers(0, len(stems), num_players)], numbers),
+        "org": organizations[rng.integers(0, len(organizations), num_players)],
+        "rds": rng.integers(100, 501, num_players),
     }
 
-    for _ in range(num_players):
-        # Generate player name
-        player_name = (
-            fake.unique.user_name().replace(".", "").replace("_", "").capitalize()
-        )
-
-        # Assign organization
-        org = random.choice(organizations)
-
-        # Assign region
-        region = random.choice(regions)
-
-        # Assign agent and role
-        agent, role = get_random_agent(agents_by_role)
-
-        # Assign map_id
-        map_name = random.choice(maps)
-        map_id = map_ids[map_name]
-
-        # Generate statistics based on role
-        # These ranges can be adjusted to better simulate realistic data
-        rds = random.randint(100, 500)
-
-        if role == "Duelist":
-            average_combat_score = round(np.random.normal(300, 30), 1)
-            kill_deaths = round(np.random.normal(1.5, 0.3), 2)
-            average_damage_per_round = round(np.random.normal(180, 20), 1)
-            kills_per_round = round(np.random.normal(1.5, 0.3), 2)
-            assists_per_round = round(np.random.normal(0.3, 0.1), 2)
-            first_kills_per_round = round(np.random.uniform(0.1, 0.4), 2)
-            first_deaths_per_round = round(np.random.uniform(0.0, 0.2), 2)
-            headshot_percentage = round(np.random.uniform(25, 55), 1)
-            clutch_success_percentage = round(np.random.uniform(15, 65), 1)
-        elif role == "Sentinel":
-            average_combat_score = round(np.random.normal(290, 25), 1)
-            kill_deaths = round(np.random.normal(1.2, 0.25), 2)
-            average_damage_per_round = round(np.random.normal(160, 15), 1)
-            kills_per_round = round(np.random.normal(0.8, 0.2), 2)
-            assists_per_round = round(np.random.normal(0.5, 0.15), 2)
-            first_kills_per_round = round(np.random.uniform(0.0, 0.3), 2)
-            first_deaths_per_round = round(np.random.uniform(0.0, 0.25), 2)
-            headshot_percentage = round(np.random.uniform(20, 50), 1)
-            clutch_success_percentage = round(np.random.uniform(10, 60), 1)
-        elif role == "Controller":
-            average_combat_score = round(np.random.normal(295, 28), 1)
-            kill_deaths = round(np.random.normal(1.3, 0.28), 2)
-            average_damage_per_round = round(np.random.normal(170, 18), 1)
-            kills_per_round = round(np.random.normal(0.9, 0.25), 2)
-            assists_per_round = round(np.random.normal(0.4, 0.12), 2)
-            first_kills_per_round = round(np.random.uniform(0.05, 0.25), 2)
-            first_deaths_per_round = round(np.random.uniform(0.0, 0.15), 2)
-            headshot_percentage = round(np.random.uniform(15, 45), 1)
-            clutch_success_percentage = round(np.random.uniform(10, 55), 1)
-        elif role == "Initiator":
-            average_combat_score = round(np.random.normal(305, 32), 1)
-            kill_deaths = round(np.random.normal(1.4, 0.35), 2)
-            average_damage_per_round = round(np.random.normal(175, 22), 1)
-            kills_per_round = round(np.random.normal(1.0, 0.25), 2)
-            assists_per_round = round(np.random.normal(0.6, 0.18), 2)
-            first_kills_per_round = round(np.random.uniform(0.15, 0.35), 2)
-            first_deaths_per_round = round(np.random.uniform(0.05, 0.2), 2)
-            headshot_percentage = round(np.random.uniform(20, 50), 1)
-            clutch_success_percentage = round(np.random.uniform(20, 70), 1)
+    # Generate statistics based on role
+    for column, (kind, first, second) in parameters.items():
+        if kind == "normal":
+            values = rng.normal(first[role_codes], second[role_codes])
         else:
-            # Default values if role is undefined
-            average_combat_score = round(np.random.normal(280, 25), 1)
-            kill_deaths = round(np.random.normal(1.0, 0.3), 2)
-            average_damage_per_round = round(np.random.normal(150, 20), 1)
-            kills_per_round = round(np.random.normal(0.7, 0.2), 2)
-            assists_per_round = round(np.random.normal(0.3, 0.1), 2)
-            first_kills_per_round = round(np.random.uniform(0.0, 0.2), 2)
-            first_deaths_per_round = round(np.random.uniform(0.0, 0.1), 2)
-            headshot_percentage = round(np.random.uniform(10, 40), 1)
-            clutch_success_percentage = round(np.random.uniform(5, 50), 1)
-
-        # Ensure no negative statistics
-        kill_deaths = max(kill_deaths, 0.1)
-        clutch_won_played = round(np.random.uniform(0.0, 1.0), 2)
-
-        # Calculate total statistics
-        total_kills = int(round(kills_per_round * rds))
-        total_deaths = int(round(kill_deaths * rds))
-        total_assists = int(round(assists_per_round * rds))
-        total_first_kills = int(round(first_kills_per_round * rds))
-        total_first_deaths = int(round(first_deaths_per_round * rds))
-
-        # Append data
-        data["player"].append(player_name)
-        data["org"].append(org)
-        data["rds"].append(rds)
-        data["average_combat_score"].append(average_combat_score)
-        data["kill_deaths"].append(kill_deaths)
-        data["average_damage_per_round"].append(average_damage_per_round)
-        data["kills_per_round"].append(kills_per_round)
-        data["assists_per_round"].append(assists_per_round)
-        data["first_kills_per_round"].append(first_kills_per_round)
-        data["first_deaths_per_round"].append(first_deaths_per_round)
-        data["headshot_percentage"].append(headshot_percentage)
-        data["clutch_success_percentage"].append(clutch_success_percentage)
-        data["clutch_won_played"].append(clutch_won_played)
-        data["total_kills"].append(total_kills)
-        data["total_deaths"].append(total_deaths)
-        data["total_assists"].append(total_assists)
-        data["total_first_kills"].append(total_first_kills)
-        data["total_first_deaths"].append(total_first_deaths)
-        data["map_id"].append(map_id)
-        data["agent"].append(agent)
-        data["region"].append(region)
-
-    # Create DataFrame
-    df = pd.DataFrame(data)
-
-    # Shuffle the DataFrame to ensure random distribution
-    df = df.sample(frac=1).reset_index(drop=True)
-
-    # Save to CSV
+            values = rng.uniform(first[role_codes], second[role_codes])
+        data[column] = np.round(values, STAT_DECIMALS[column])
+
+    # Ensure no negative statistics
+    data["kill_deaths"] = np.maximum(data["kill_deaths"], 0.1)
+    data["clutch_won_played"] = np.round(rng.uniform(0.0, 1.0, num_players), 2)
+
+    # Calculate total statistics
+    for total, per_round in TOTAL_COLUMNS.items():
+        data[total] = np.rint(data[per_round] * data["rds"]).astype(np.int64)
+
+    data["map_id"] = rng.integers(1, len(MAPS) + 1, num_players)
+    data["agent"] = agents[agent_index]
+    data["region"] = regions[rng.integers(0, len(regions), num_players)]
+    import pandas as pd
+
+    return pd.DataFrame(data)
+
+
+def _generate_block(seed, block, chunk_size, num_players, fmt):
+    """
+    Generates one block of a streamed dataset in a worker process.
+
+    CSV blocks are formatted in the worker, which is where most of the time
+    goes; Parquet blocks are returned as DataFrames.
+    """
+    first_number = block * chunk_size
+    size = min(chunk_size, num_players - first_number)
+    df = generate_player_data(size, seed, block, first_number)
+    if fmt == "csv":
+        return df.to_csv(header=block == 0, index=False)
     return df
 
 
+def write_player_data(
+    output_path, num_players, chunk_size=1000000, seed=0, fmt="csv", workers=None
+):
+    """
+    Generates synthetic players and streams them to a file in blocks.
+
+    Blocks are generated in parallel worker processes and written in order,
+    so only a few are held in memory at a time. The output depends only on
+    the seed and the chunk size, not on the number of workers.
+
+    Args:
+        output_path (str): Path to the output file.
+        num_players (int): Number of players to generate.
+        chunk_size (int): Players generated and written per block.
+        seed (int): Seed of the random generator.
+        fmt (str): "csv" or "parquet"; Parquet output requires pyarrow.
+        workers (int): Worker processes; defaults to the number of CPUs.
+    """
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+    num_blocks = -(-num_players // chunk_size)
+    workers = workers or os.cpu_count() or 1
+    writer = None
+    written = 0
+
+    def write_block(result):
+        nonlocal writer
+        if fmt == "csv":
+            f.write(result)
+        else:
+            table = pa.Table.from_pandas(result, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, (
+        open(output_path, "w", newline="") if fmt == "csv" else contextlib.nullcontext()
+    ) as f:
+        # Keep at most two blocks per worker in flight to bound memory
+        pending = deque()
+        for block in range(num_blocks):
+            pending.append(
+                executor.submit(
+                    _generate_block, seed, block, chunk_size, num_players, fmt
+                )
+            )
+            while len(pending) >= 2 * workers or (pending and block == num_blocks - 1):
+                write_block(pending.popleft().result())
+                written = min(written + chunk_size, num_players)
+                logging.info(f"Wrote {written}/{num_players} players.")
+    if writer is not None:
+        writer.close()
+
+
 def main():
     # Parse command-line arguments
     args = parse_arguments()
     output_csv = args.output_csv
     num_players = args.num_players
+    fmt = args.format or ("parquet" if output_csv.endswith(".parquet") else "csv")
 
-    # Generate synthetic player data
-    df = generate_player_data(num_players)
-
-    # Save to CSV
-    logging.info(f"Saving synthetic data to {output_csv}...")
-    df.to_csv(output_csv, index=False)
+    # Generate synthetic player data and save it block by block
+    logging.info(
+        f"Generating synthetic data for {num_players} players into {output_csv}..."
+    )
+    try:
+        write_player_data(
+            output_csv,
+            num_players,
+            chunk_size=args.chunk_size,
+            seed=args.seed,
+            fmt=fmt,
+            workers=args.workers,
+        )
+    except ImportError as e:
+        logging.error(f"Parquet output requires pyarrow: {e}")
+        sys.exit(1)
     logging.info("Data generation completed successfully.")
 
 
@@ -0,0 +1,204 @@
+# team_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def normalize_text(text):
+    """
+    Normalises free text so trivially different submissions share a cache entry.
+
+    Args:
+        text (str): Additional constraints or region.
+
+    Returns:
+        str: Lower-cased text with collapsed whitespace.
+    """
+    return " ".join((text or "").split()).lower()
+
+
+class TeamCache:
+    """
+    LRU cache with TTL for generated team reports.
+
+    Entries live in memory and, when a disk path is given, in a SQLite
+    table as well, so they survive gunicorn worker restarts and are shared
+    by all workers on the host.
+    """
+
+    def __init__(self, maxsize=256, ttl=3600, disk_path=None):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept in memory.
+            ttl (float): Seconds an entry stays valid.
+            disk_path (str): SQLite file for the on-disk tier, or None.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "saved_seconds": 0.0,
+        }
+        if disk_path:
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS team_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        created REAL NOT NULL,
+                        cost REAL NOT NULL
+                    )
+                    """
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.disk_path, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(
+        team_type, additional_constraints, data_version, mode="full", region=None
+    ):
+        """
+        Builds the cache key of a team request.
+
+        The team type is kept exactly as given: it must name a type
+        verbatim, so a variant in another case is a different, invalid
+        request rather than a hit on the valid one.
+
+        Args:
+            team_type (str): Description of the team submission type.
+            additional_constraints (str): Any additional constraints provided by the user.
+            data_version (int): Version stamp of the players table.
+            mode (str): Generation mode, e.g. "full" or "fast".
+            region (str): Region the players were restricted to, if any.
+
+        Returns:
+            str: Hex digest identifying the request.
+        """
+        parts = [
+            team_type,
+            normalize_text(additional_constraints),
+            data_version,
+            mode,
+        ]
+        if region:
+            parts.append(normalize_text(region))
+        payload = json.dumps(parts)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Looks up a report, checking memory first and then the disk tier.
+
+        Args:
+            key (str): Key from make_key.
+
+        Returns:
+            str: The cached report, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._record_hit("memory_hits", entry[2])
+                return entry[0]
+
+        # The disk tier is read without holding the lock, so a slow disk
+        # does not stall the memory hits of other threads
+        row = None
+        if self.disk_path:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created, cost FROM team_cache WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM team_cache WHERE key = ?", (key,))
+                    row = None
+
+        with self._lock:
+            if row is not None:
+                self._store(key, row)
+                self._record_hit("disk_hits", row[2])
+                return row[0]
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key, value, cost=0.0):
+        """
+        Stores a report.
+
+        Args:
+            key (str): Key from make_key.
+            value (str): The generated report.
+            cost (float): Seconds it took to generate, credited on each hit.
+        """
+        entry = (value, time.time(), cost)
+        with self._lock:
+            self._store(key, entry)
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO team_cache VALUES (?, ?, ?, ?)",
+                    (key,) + entry,
+                )
+
+    def _store(self, key, entry):
+        self._entries[key] = tuple(entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _record_hit(self, tier, cost):
+        self._counters["hits"] += 1
+        self._counters[tier] += 1
+        self._counters["saved_seconds"] += cost
+
+    def clear(self):
+        """
+        Drops every entry from both tiers.
+        """
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM team_cache")
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits per tier, misses, hit ratio, entries in memory and the
+            total generation time saved by hits.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        return stats
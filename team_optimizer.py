@@ -0,0 +1,333 @@
+# team_optimizer.py
+
+from collections import Counter
+
+import numpy as np
+
+from player_store import ROLES, SCORE_WEIGHTS, PlayerStore
+from roles import ROLE_CATEGORIES, assign_role
+from submission_rules import RULES
+
+TEAM_SIZE = 5
+
+# Hard constraints that a roster must satisfy for each submission type
+SUBMISSION_CONSTRAINTS = {name: rule.constraints() for name, rule in RULES.items()}
+
+OFFENSIVE_ROLES = ("Duelist", "Initiator")
+
+
+def _region(player):
+    return (player["region"] or "UNKNOWN").upper()
+
+
+def score_players(players, weights=SCORE_WEIGHTS):
+    """
+    Rates every player with a weighted sum of z-scored stats.
+
+    Args:
+        players (list of dict): List of player data dictionaries.
+        weights (dict): Weight per stat column.
+
+    Returns:
+        list of float: Rating for each player, in input order.
+    """
+    return PlayerStore.from_records(players).composite_rating(weights).tolist()
+
+
+def _resolve_constraints(team_type, min_regions, min_org_players, min_role_players):
+    constraints = SUBMISSION_CONSTRAINTS.get(team_type, {})
+    min_regions = max(min_regions, constraints.get("min_regions", 0))
+    quotas = dict(constraints.get("min_org_players", {}))
+    quotas.update(min_org_players or {})
+    role_quotas = dict(constraints.get("min_role_players", {}))
+    role_quotas.update(min_role_players or {})
+    return min_regions, quotas, role_quotas
+
+
+def _prune_candidates(candidates, team_size, use_region, quota_orgs):
+    """
+    Keeps only the best few rows of every interchangeable group.
+
+    Two rows are interchangeable when they share a role and, where the
+    constraints care about it, a region and quota organization. Swapping a
+    roster member for a better row of the same group never breaks a
+    constraint, so at most ``team_size`` distinct players per group can
+    appear in an optimal roster.
+    """
+    kept = []
+    group_players = {}
+    for candidate in candidates:
+        score, player, role = candidate
+        org = player["org"] if player["org"] in quota_orgs else None
+        key = (role, _region(player) if use_region else None, org)
+        seen = group_players.setdefault(key, set())
+        if player["player"] in seen or len(seen) >= team_size:
+            continue
+        seen.add(player["player"])
+        kept.append(candidate)
+    return kept
+
+
+def optimize_team(
+    players,
+    team_type=None,
+    team_size=TEAM_SIZE,
+    required_roles=None,
+    min_regions=0,
+    min_org_players=None,
+    min_role_players=None,
+    scores=None,
+):
+    """
+    Selects the highest rated roster that satisfies the team constraints.
+
+    Runs a branch-and-bound search over the candidates sorted by rating:
+    a branch is cut as soon as it can no longer cover the missing roles,
+    regions or organization quotas, or when even the best remaining
+    players cannot beat the best roster found so far.
+
+    Args:
+        players (list of dict): List of player data dictionaries.
+        team_type (str): Team submission type, used to look up its constraints.
+        team_size (int): Number of players on the roster.
+        required_roles (iterable of str): Roles that must be covered. Defaults
+            to every role of ROLE_CATEGORIES present in the candidate pool.
+        min_regions (int): Minimum number of distinct regions on the roster.
+        min_org_players (dict): Minimum number of players per organization.
+        min_role_players (dict): Minimum number of players per role. Each
+            player fills the first role of its agent, see roles.assign_role.
+        scores (list of float): Precomputed ratings, one per player.
+
+    Returns:
+        list of dict: The selected players with their "role" and "rating",
+        or None if no roster satisfies the constraints.
+    """
+    min_regions, quotas, role_quotas = _resolve_constraints(
+        team_type, min_regions, min_org_players, min_role_players
+    )
+
+    if scores is None:
+        scores = score_players(players) if players else []
+
+    candidates = sorted(
+        (
+            (score, player, assign_role(player["agent"]))
+            for score, player in zip(scores, players)
+        ),
+        key=lambda candidate: candidate[0],
+        reverse=True,
+    )
+    if required_roles is None:
+        available = {role for _, _, role in candidates}
+        required_roles = [role for role in ROLE_CATEGORIES if role in available]
+    role_needs = {role: 1 for role in required_roles}
+    for role, quota in role_quotas.items():
+        role_needs[role] = max(role_needs.get(role, 0), quota)
+
+    candidates = _prune_candidates(candidates, team_size, min_regions > 0, quotas)
+    if len({player["player"] for _, player, _ in candidates}) < team_size:
+        return None
+
+    # prefix[i] is the summed rating of the i best candidates
+    prefix = [0.0]
+    for score, _, _ in candidates:
+        prefix.append(prefix[-1] + score)
+
+    best = {"score": float("-inf"), "roster": None}
+    roster = []
+    names = set()
+    roles = Counter()
+    regions = Counter()
+    orgs = Counter()
+
+    def deficit():
+        missing_roles = sum(
+            max(0, need - roles[role]) for role, need in role_needs.items()
+        )
+        missing_regions = max(0, min_regions - len(regions))
+        missing_orgs = sum(max(0, quota - orgs[org]) for org, quota in quotas.items())
+        return max(missing_roles, missing_regions, missing_orgs)
+
+    def search(start, total):
+        slots = team_size - len(roster)
+        if slots == 0:
+            if total > best["score"] and not deficit():
+                best["score"] = total
+                best["roster"] = list(roster)
+            return
+        if deficit() > slots:
+            return
+        for i in range(start, len(candidates) - slots + 1):
+            # Candidates are sorted, so the bound only shrinks as i grows
+            if total + prefix[i + slots] - prefix[i] <= best["score"]:
+                return
+            score, player, role = candidates[i]
+            if player["player"] in names:
+                continue
+            region = _region(player)
+            roster.append(candidates[i])
+            names.add(player["player"])
+            roles[role] += 1
+            regions[region] += 1
+            orgs[player["org"]] += 1
+
+            search(i + 1, total + score)
+
+            roster.pop()
+            names.discard(player["player"])
+            roles[role] -= 1
+            regions[region] -= 1
+            if not regions[region]:
+                del regions[region]
+            orgs[player["org"]] -= 1
+
+    search(0, 0.0)
+
+    if best["roster"] is None:
+        return None
+
+    role_order = list(ROLE_CATEGORIES) + ["Undefined"]
+    selected = [
+        dict(player, role=role, rating=round(score, 3))
+        for score, player, role in best["roster"]
+    ]
+    selected.sort(key=lambda player: role_order.index(player["role"]))
+    return selected
+
+
+def optimize_store(
+    store,
+    team_type=None,
+    mask=None,
+    team_size=TEAM_SIZE,
+    required_roles=None,
+    min_regions=0,
+    min_org_players=None,
+    min_role_players=None,
+    org_bonus=None,
+):
+    """
+    Selects the best roster from a columnar player store.
+
+    Ratings and the candidate pruning of optimize_team are computed as
+    array operations over the whole store, so only the few surviving rows
+    are turned into dictionaries for the branch-and-bound search.
+
+    Args:
+        store (PlayerStore): Columnar player data.
+        team_type (str): Team submission type, used to look up its constraints.
+        mask (np.ndarray): Rows eligible for the roster. Defaults to all rows.
+        team_size (int): Number of players on the roster.
+        required_roles (iterable of str): Roles that must be covered. Defaults
+            to every role of ROLE_CATEGORIES present in the candidate pool.
+        min_regions (int): Minimum number of distinct regions on the roster.
+        min_org_players (dict): Minimum number of players per organization.
+        min_role_players (dict): Minimum number of players per role.
+        org_bonus (dict): Organization -> amount added to the rating of its
+            players, e.g. from ratings.RatingEngine.org_strength.
+
+    Returns:
+        list of dict: The selected players with their "role" and "rating",
+        or None if no roster satisfies the constraints.
+    """
+    min_regions, quotas, role_quotas = _resolve_constraints(
+        team_type, min_regions, min_org_players, min_role_players
+    )
+
+    rows = np.arange(len(store)) if mask is None else np.flatnonzero(mask)
+    if not len(rows):
+        return None
+    ratings = store.composite_rating(mask=mask)
+    if org_bonus:
+        bonus = np.array(
+            [org_bonus.get(org, 0.0) for org in store.categories["org"]],
+            dtype=ratings.dtype,
+        )
+        ratings = ratings + bonus[store.codes["org"][rows]]
+    role_codes = store.role_codes[rows]
+
+    if required_roles is None:
+        present = np.unique(role_codes)
+        required_roles = [
+            role for role in ROLE_CATEGORIES if ROLES.index(role) in present
+        ]
+
+    # Group key: role, plus region and quota organization when they matter
+    group = role_codes.astype(np.int64)
+    if min_regions > 0:
+        regions = store.categories["region"]
+        upper = {}
+        region_keys = np.array(
+            [upper.setdefault(region.upper(), len(upper)) for region in regions],
+            dtype=np.int64,
+        )
+        group = group * len(regions) + region_keys[store.codes["region"][rows]]
+    if quotas:
+        orgs = store.categories["org"]
+        org_keys = np.array(
+            [list(quotas).index(org) + 1 if org in quotas else 0 for org in orgs],
+            dtype=np.int64,
+        )
+        group = group * (len(quotas) + 1) + org_keys[store.codes["org"][rows]]
+
+    # Sort by group then rating, keep each player's best row per group and
+    # the first team_size players of every group
+    player_codes = store.codes["player"][rows].astype(np.int64)
+    order = np.lexsort((-ratings, group))
+    pair = group[order] * (player_codes.max() + 1) + player_codes[order]
+    _, first = np.unique(pair, return_index=True)
+    order = order[np.sort(first)]
+    groups = group[order]
+    _, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    rank = np.arange(len(order)) - np.repeat(starts, counts)
+    survivors = order[rank < team_size]
+
+    return optimize_team(
+        store.records(rows[survivors]),
+        team_size=team_size,
+        required_roles=required_roles,
+        min_regions=min_regions,
+        min_org_players=quotas,
+        min_role_players=role_quotas,
+        scores=ratings[survivors].tolist(),
+    )
+
+
+def describe_team(team_type, roster):
+    """
+    Writes a short plain-text report about a selected roster without an LLM.
+
+    Args:
+        team_type (str): Description of the team submission type.
+        roster (list of dict): Players returned by optimize_team.
+
+    Returns:
+        str: The report text.
+    """
+    igl = max(
+        roster,
+        key=lambda p: (p["assists_per_round"] or 0)
+        + (p["clutch_success_percentage"] or 0) / 100,
+    )
+    lines = [f"Team Submission Type: {team_type}", ""]
+    for player in roster:
+        side = "Offensive" if player["role"] in OFFENSIVE_ROLES else "Defensive"
+        lines.append(
+            f"- {player['player']} ({player['org']}, {player['region']}): "
+            f"{player['agent']} - {player['role']}, {side}. "
+            f"ACS {player['average_combat_score']}, K/D {player['kill_deaths']}, "
+            f"ADR {player['average_damage_per_round']}, rating {player['rating']:+.2f}"
+        )
+    lines += [
+        "",
+        f"IGL: {igl['player']} - highest assists and clutch success on the roster, "
+        "suited to calling strategy and mid-round adjustments.",
+    ]
+
+    strongest = max(roster, key=lambda p: p["rating"])
+    weakest = min(roster, key=lambda p: p["rating"])
+    lines += [
+        f"Strength: anchored by {strongest['player']} ({strongest['role']}).",
+        f"Weakness: {weakest['player']} ({weakest['role']}) has the lowest rating on the roster.",
+    ]
+    return "\n".join(lines)
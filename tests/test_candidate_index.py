@@ -0,0 +1,70 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from candidate_index import CandidateIndex
+from db import TEAM_FILTERS, TEAM_QUERIES, fetch_players_by_id
+from player_store import STAT_COLUMNS, PlayerStore
+from sqllite import CREATE_TABLE_QUERY
+from team_optimizer import optimize_store
+
+AGENTS = ("Jett", "Reyna", "Sage", "Killjoy", "Omen", "Brimstone", "Sova", "Skye")
+ORGS = ("Ascend", "Mystic", "Legion", "Phantom", "Rising", "Nebula", "OrgZ", "T1A")
+REGIONS = ("NA", "EU", "Japan", "Russia", "China", "ME", "LATAM")
+
+
+@pytest.fixture
+def conn(tmp_path):
+    rng = np.random.default_rng(1)
+    conn = sqlite3.connect(tmp_path / "players.db")
+    conn.execute(CREATE_TABLE_QUERY)
+    columns = ("player", "org", "agent", "region", "map_id") + STAT_COLUMNS
+    n = 600
+    values = [
+        [f"player{row % 300}" for row in range(n)],
+        rng.choice(ORGS, size=n).tolist(),
+        rng.choice(AGENTS, size=n).tolist(),
+        rng.choice(REGIONS, size=n).tolist(),
+        rng.integers(1, 8, size=n).tolist(),
+    ] + [(rng.random(n) * 100).round(2).tolist() for _ in STAT_COLUMNS]
+    conn.executemany(
+        f"INSERT INTO players ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        list(zip(*values)),
+    )
+    conn.commit()
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("team_type", list(TEAM_FILTERS))
+def test_indexed_roster_matches_store_roster(conn, team_type):
+    store = PlayerStore.from_rows(conn.execute(*TEAM_QUERIES[team_type]).fetchall())
+    direct = optimize_store(store, team_type)
+
+    index = CandidateIndex.from_database(conn, filters=TEAM_FILTERS[team_type])
+    indexed = index.optimize(
+        lambda ids: fetch_players_by_id(conn, ids),
+        team_type,
+        TEAM_FILTERS[team_type],
+    )
+
+    assert [player["id"] for player in indexed] == [player["id"] for player in direct]
+    # Both rate over the team type's pool, so the ratings agree as well
+    assert [player["rating"] for player in indexed] == pytest.approx(
+        [player["rating"] for player in direct], abs=1e-3
+    )
+
+
+def test_index_keeps_only_its_pool(conn):
+    index = CandidateIndex.from_database(conn, filters={"org": ("OrgZ",)})
+    assert index.orgs() == ["OrgZ"]
+
+    # A row moved out of the pool leaves the index on update
+    row = dict(conn.execute("SELECT * FROM players WHERE org = 'OrgZ'").fetchone())
+    size = len(index)
+    index.update([dict(row, org="Ascend")])
+    assert len(index) == size - 1
+    assert index.orgs() == ["OrgZ"]
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from db import TEAM_QUERIES, ConnectionPool, full_table_scans
+from sqllite import CREATE_TABLE_QUERY, migrate_schema
+
+
+# Most rows fall outside every rule's filters, as in a full-sized database, so
+# the planner's statistics favour the indexes
+ORGS = ["Rising", "OrgZ", "Ascend"] + [f"Org{n}" for n in range(20)]
+REGIONS = ["Japan", "LATAM"] + [f"Region{n}" for n in range(20)]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "players.db")
+    conn.execute(CREATE_TABLE_QUERY)
+    conn.executemany(
+        "INSERT INTO players (player, org, agent, region, map_id) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (
+                f"player{row}",
+                ORGS[row % len(ORGS)],
+                "Jett",
+                REGIONS[row % len(REGIONS)],
+                row % 3,
+            )
+            for row in range(500)
+        ],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_unindexed_filters_are_reported(conn):
+    assert set(full_table_scans(conn)) == {
+        team_type for team_type, (sql, _) in TEAM_QUERIES.items() if " WHERE " in sql
+    }
+
+
+def test_team_queries_use_indexes_after_migration(conn):
+    migrate_schema(conn)
+    assert full_table_scans(conn) == {}
+
+
+@pytest.fixture
+def pool(conn, tmp_path):
+    pool = ConnectionPool(str(tmp_path / "players.db"), size=1)
+    yield pool
+    pool.close()
+
+
+def test_connection_returned_after_other_errors(pool):
+    with pytest.raises(ValueError):
+        with pool.connection() as borrowed:
+            borrowed.execute("BEGIN")
+            raise ValueError
+    with pool.connection() as conn:
+        assert conn is borrowed
+        assert not conn.in_transaction
+
+
+def test_connection_returned_when_generator_closed(pool):
+    def rows():
+        with pool.connection() as conn:
+            yield from conn.execute("SELECT id FROM players")
+
+    reader = rows()
+    next(reader)
+    reader.close()
+    assert pool._idle.qsize() == 1
+
+
+def test_connection_closed_after_sqlite_error(pool):
+    with pytest.raises(sqlite3.Error):
+        with pool.connection() as borrowed:
+            borrowed.execute("SELECT missing FROM players")
+    with pool.connection() as conn:
+        assert conn is not borrowed
@@ -0,0 +1,10 @@
+from benchmarks.import_time import DEFAULT_BUDGETS, check
+
+
+def test_app_import_within_budget():
+    # Each run imports app in a fresh interpreter with -X importtime
+    result = check("app", DEFAULT_BUDGETS["app"], repeat=3, top=5)
+    assert result["ok"], (
+        f"import app took {result['median_ms']} ms, over its "
+        f"{result['budget_ms']} ms budget; slowest: {result['slowest']}"
+    )
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from pareto import pareto_front
+from player_store import STAT_COLUMNS, PlayerStore
+from submission_rules import RULES
+
+AGENTS = ("Jett", "Reyna", "Sage", "Killjoy", "Omen", "Brimstone", "Sova", "Skye")
+ORGS = ("Ascend", "Mystic", "Legion", "Phantom", "Rising", "Nebula", "T1A")
+REGIONS = ("NA", "EU", "Japan", "Russia", "China", "ME", "LATAM")
+
+
+def _store(n=400, quota_players=8, seed=0):
+    """
+    Random players where only a few belong to OrgZ, so unconstrained
+    fronts are mostly rosters without one.
+    """
+    rng = np.random.default_rng(seed)
+    orgs = list(rng.choice(ORGS, size=n))
+    for row in range(quota_players):
+        orgs[row] = "OrgZ"
+    data = {
+        "id": np.arange(1, n + 1),
+        "player": [f"player{row}" for row in range(n)],
+        "org": orgs,
+        "region": list(rng.choice(REGIONS, size=n)),
+        "agent": list(rng.choice(AGENTS, size=n)),
+        "map_id": rng.integers(1, 8, size=n),
+    }
+    for column in STAT_COLUMNS:
+        data[column] = rng.random(n)
+    # The OrgZ players are the weakest, so only the quota puts them on a roster
+    data["average_combat_score"] = 150 + 150 * rng.random(n)
+    data["average_combat_score"][:quota_players] = 100
+    return PlayerStore.from_columns(data)
+
+
+def _meets(rule, players):
+    orgs = [player["org"] for player in players]
+    roles = [player["role"] for player in players]
+    regions = {player["region"].upper() for player in players}
+    return (
+        len(regions) >= rule.min_regions
+        and all(orgs.count(org) >= n for org, n in rule.min_org_players.items())
+        and all(roles.count(role) >= n for role, n in rule.min_role_players.items())
+    )
+
+
+@pytest.mark.parametrize("team_type", list(RULES))
+def test_front_meets_team_type_quotas(team_type):
+    rule = RULES[team_type]
+    store = _store()
+    front = pareto_front(
+        store.select(store.mask(**rule.filters)),
+        time_budget=0.3,
+        workers=1,
+        team_type=team_type,
+    )
+    assert front
+    for entry in front:
+        assert _meets(rule, entry["players"]), entry
+
+
+def test_front_meets_explicit_quotas():
+    front = pareto_front(
+        _store(),
+        time_budget=0.3,
+        workers=1,
+        min_regions=4,
+        min_org_players={"OrgZ": 2},
+        min_role_players={"Duelist": 2},
+    )
+    assert front
+    for entry in front:
+        players = entry["players"]
+        assert len({player["region"] for player in players}) >= 4
+        assert sum(player["org"] == "OrgZ" for player in players) >= 2
+        assert sum(player["role"] == "Duelist" for player in players) >= 2
+
+
+@pytest.mark.parametrize("team_size", [3, 7])
+def test_front_rosters_have_team_size(team_size):
+    front = pareto_front(_store(), time_budget=0.3, workers=1, team_size=team_size)
+    assert front
+    for entry in front:
+        assert len({player["player"] for player in entry["players"]}) == team_size
@@ -0,0 +1,55 @@
+import pytest
+
+from player_store import STAT_COLUMNS
+from prompt_encoding import encode_players, estimate_tokens
+
+AGENTS = ("Jett", "Sage", "Omen", "Sova", "Killjoy")
+
+
+def _players(count, prefix):
+    return [
+        dict(
+            {column: float(row % 7) for column in STAT_COLUMNS},
+            id=row,
+            player=f"{prefix}{row}",
+            org="OrgZ",
+            region="EU",
+            agent=AGENTS[row % len(AGENTS)],
+            map_id=1,
+        )
+        for row in range(count)
+    ]
+
+
+@pytest.mark.parametrize("encoding", ["verbose", "csv"])
+@pytest.mark.parametrize("budget", [1, 400])
+def test_budget_never_drops_selected_players(encoding, budget):
+    roster = _players(5, "roster")
+    candidates = roster + _players(60, "candidate")
+    text = encode_players(
+        candidates, encoding, top_n_per_role=3, token_budget=budget, selected=roster
+    )
+    for player in roster:
+        assert player["player"] in text
+
+
+def test_budget_trims_other_candidates():
+    roster = _players(5, "roster")
+    others = _players(60, "candidate")
+    full = encode_players(roster + others, "csv", selected=roster)
+    budget = estimate_tokens(encode_players(roster, "csv")) + 200
+    text = encode_players(roster + others, "csv", token_budget=budget, selected=roster)
+    assert estimate_tokens(text) <= budget < estimate_tokens(full)
+    assert "candidate" in text
+
+
+def test_preselected_prompt_keeps_roster(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from app import build_prompt
+
+    roster = _players(5, "roster")
+    prompt = build_prompt(
+        "Professional Team Submission", "", roster, preselected=True, token_budget=1
+    )
+    for player in roster:
+        assert player["player"] in prompt
@@ -0,0 +1,49 @@
+import numpy as np
+
+from player_store import STAT_COLUMNS, PlayerStore
+from roles import agent_roles, assign_role
+from submission_rules import SubmissionRule
+from synergy import agent_indices, role_coverage
+from team_optimizer import optimize_store
+
+# One Controller-only agent; the Vipers can also play Controller
+AGENTS = ["Omen", "Viper", "Viper", "Sage", "Jett", "Reyna", "Sova", "Skye"]
+
+
+def _store():
+    n = len(AGENTS)
+    data = {
+        "player": [f"player{row}" for row in range(n)],
+        "org": ["OrgZ"] * n,
+        "region": ["EU"] * n,
+        "agent": AGENTS,
+        "map_id": [1] * n,
+    }
+    for column in STAT_COLUMNS:
+        data[column] = np.linspace(0, 1, n)
+    return PlayerStore.from_columns(data)
+
+
+def test_multi_role_agent_is_assigned_its_first_role():
+    assert agent_roles("Viper") == ("Sentinel", "Controller")
+    assert assign_role("Viper") == "Sentinel"
+
+
+def test_role_quotas_count_the_first_role_only():
+    store = _store()
+    quota = {"Controller": 2}
+    assert optimize_store(store, min_role_players=quota) is None
+    assert "Controller" in SubmissionRule(
+        "Two controllers", min_role_players=quota
+    ).check(store)
+
+    # Three Sentinels plus one of each other role present
+    roster = optimize_store(store, team_size=6, min_role_players={"Sentinel": 3})
+    sentinels = [player["agent"] for player in roster if player["role"] == "Sentinel"]
+    assert sorted(sentinels) == ["Sage", "Viper", "Viper"]
+
+
+def test_role_coverage_counts_every_role():
+    # Viper covers Controller next to a Sentinel when the quotas would not
+    agents = agent_indices(["Viper", "Sage", "Jett", "Sova", "Reyna"])[None, :]
+    assert role_coverage(agents)[0] == 4
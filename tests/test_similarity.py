@@ -0,0 +1,50 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from similarity import FEATURE_COLUMNS, SimilarityIndex
+from sqllite import CREATE_TABLE_QUERY
+
+
+@pytest.fixture
+def index(tmp_path):
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(tmp_path / "players.db")
+    conn.execute(CREATE_TABLE_QUERY)
+    columns = ("player", "org", "agent", "region", "map_id") + FEATURE_COLUMNS
+    conn.executemany(
+        f"INSERT INTO players ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        [
+            (f"player{row}", "OrgZ", "Jett", "EU", 1)
+            + tuple(float(value) for value in rng.random(len(FEATURE_COLUMNS)))
+            for row in range(50)
+        ],
+    )
+    conn.commit()
+    conn.row_factory = sqlite3.Row
+    index = SimilarityIndex.from_database(conn)
+    conn.close()
+    return index
+
+
+@pytest.mark.parametrize("k", [0, -5])
+def test_search_clamps_k_below_one(index, k):
+    matches = index.similar("player0", k)
+    assert len(matches) == 1
+    assert matches[0].player != "player0"
+
+
+def test_search_clamps_k_to_table_size(index):
+    assert len(index.similar("player0", 10**6)) == 49
+
+
+@pytest.mark.parametrize("k", ["0", "-5"])
+def test_similar_endpoint_rejects_k_below_one(tmp_path, monkeypatch, k):
+    monkeypatch.chdir(tmp_path)
+    from app import app
+
+    response = app.test_client().get("/similar", query_string={"player": "a", "k": k})
+    assert response.status_code == 400
+    assert "k" in response.get_json()["error"]
@@ -0,0 +1,51 @@
+import sqlite3
+
+from snapshot import load_snapshot, write_snapshot
+from sqllite import CREATE_TABLE_QUERY, create_database
+
+
+def _players_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_TABLE_QUERY)
+    conn.executemany(
+        "INSERT INTO players (player, org, agent, region, map_id, "
+        "average_combat_score) VALUES (?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    return conn
+
+
+def test_snapshot_keeps_null_org(tmp_path):
+    conn = _players_database(
+        tmp_path / "players.db",
+        [
+            ("Alpha", "OrgZ", "Jett", "EU", 1, 250.0),
+            ("Bravo", None, "Sova", None, 2, 210.0),
+        ],
+    )
+    path = str(tmp_path / "players.snapshot")
+    assert write_snapshot(conn, path) == 1
+    conn.close()
+
+    snapshot = load_snapshot(path)
+    store = snapshot.store
+    assert list(store.column("player")) == ["Alpha", "Bravo"]
+    assert list(store.column("org")) == ["OrgZ", None]
+    assert None in list(store.categories["org"])
+    assert store.mask(org="OrgZ").tolist() == [True, False]
+    assert store.records([1])[0]["org"] is None
+
+
+def test_csv_load_with_empty_org_writes_snapshot(tmp_path):
+    csv_file = tmp_path / "players.csv"
+    csv_file.write_text(
+        "player,org,agent,region,map_id,average_combat_score\n"
+        "Alpha,OrgZ,Jett,EU,1,250\n"
+        "Bravo,,Sova,NA,2,210\n"
+    )
+    db_file = str(tmp_path / "players.db")
+    assert create_database(str(csv_file), db_file) == 2
+
+    store = load_snapshot(str(tmp_path / "players.snapshot")).store
+    assert set(store.column("org")) == {"OrgZ", None}
@@ -0,0 +1,25 @@
+from team_cache import TeamCache
+
+TEAM_TYPE = "Game Changers Team Submission"
+
+
+def test_key_keeps_team_type_case():
+    assert TeamCache.make_key(TEAM_TYPE, "", 1) != TeamCache.make_key(
+        TEAM_TYPE.lower(), "", 1
+    )
+    assert TeamCache.make_key(TEAM_TYPE, " Two  duelists", 1) == TeamCache.make_key(
+        TEAM_TYPE, "two duelists ", 1
+    )
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    key = TeamCache.make_key(TEAM_TYPE, "", 1)
+    TeamCache(disk_path=path).set(key, "report", cost=2.0)
+
+    cache = TeamCache(disk_path=path)
+    assert cache.get(key) == "report"
+    assert cache.get(key) == "report"
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)